@@ -0,0 +1,34 @@
+# backend/app/api/v1/admin.py
+
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from app.core.bulk import export_ndjson, gzip_chunks, parse_tables
+from app.core.security import get_current_superuser
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(get_current_superuser)])
+
+# --- 1. 匯出論壇資料 ---
+@router.get("/export")
+async def export_data(tables: Optional[str] = None, redact: bool = False):
+    """
+    以 gzip 壓縮的 NDJSON 串流匯出資料 (一行一列：{"table": ..., "row": {...}})
+
+    - `tables=users,posts,...`：只匯出指定的資料表 (users / boards / posts / comments / votes)，預設全部
+    - `redact=true`：不匯出使用者的 email 與密碼雜湊 (分析 / staging 用)
+    - 邊讀邊送，記憶體用量與資料量無關；匯入請用 `python -m app.cli import-data`
+    - 封存的討論串從快照還原後匯出；快照讀不到時中途中止 (下載不完整，匯入時會被拒絕)
+    """
+    try:
+        selected = parse_tables(tables)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # 串流期間自己開 session (依賴注入的 session 在回應開始前就會關閉)
+    filename = f"acg-export-{datetime.utcnow():%Y%m%d-%H%M%S}.ndjson.gz"
+    return StreamingResponse(
+        gzip_chunks(export_ndjson(selected, redact=redact)),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -7,6 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import RedirectResponse
 from app.core.config import settings
 from app.core.db import get_session
+from app.core.http import http_client
 from app.models.user import User 
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
@@ -15,9 +16,7 @@ from jose import jwt
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-# Google API URLs
-GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
-GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v1/userinfo?alt=json"
+# Google API URLs 在 settings (GOOGLE_TOKEN_URL / GOOGLE_USERINFO_URL)，測試時可指向本機的假 OAuth 伺服器
 # GOOGLE_AUTH_URL = ... (前端會發起這個 URL)
 
 # ----------------- JWT TOKEN GENERATION -----------------
@@ -38,8 +37,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 @router.get("/google/callback")
 async def google_callback(code: str, session: AsyncSession = Depends(get_session)):
     
-    # 1. 向 Google 請求 Access Token
-    async with httpx.AsyncClient() as client:
+    # 兩次呼叫都走共用的連線池 (keep-alive / HTTP2)，有逾時、重試與斷路器 (app/core/http.py)
+    try:
+        # 1. 向 Google 請求 Access Token
         token_data = {
             "client_id": settings.GOOGLE_CLIENT_ID,
             "client_secret": settings.GOOGLE_CLIENT_SECRET,
@@ -48,25 +48,31 @@ async def google_callback(code: str, session: AsyncSession = Depends(get_session
             "grant_type": "authorization_code",
         }
         
-        response = await client.post(GOOGLE_TOKEN_URL, data=token_data)
+        response = await http_client.post(settings.GOOGLE_TOKEN_URL, data=token_data)
+        if response.status_code >= 500:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Google login is temporarily unavailable")
         if response.status_code != 200:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Google Token Exchange Failed")
             
         token_info = response.json()
         access_token = token_info.get("access_token")
 
-    # 2. 使用 Access Token 取得使用者資訊
-    async with httpx.AsyncClient() as client:
-        userinfo_response = await client.get(
-            GOOGLE_USERINFO_URL, 
+        # 2. 使用 Access Token 取得使用者資訊
+        userinfo_response = await http_client.get(
+            settings.GOOGLE_USERINFO_URL, 
             headers={"Authorization": f"Bearer {access_token}"}
         )
+        if userinfo_response.status_code >= 500:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Google login is temporarily unavailable")
         if userinfo_response.status_code != 200:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Google User Info Fetch Failed")
+    except httpx.HTTPError:
+        # 逾時 / 連線失敗 / 斷路中：Google 暫時無法使用，請使用者稍後再試
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Google login is temporarily unavailable")
             
-        user_info = userinfo_response.json()
-        google_email = user_info.get("email")
-        google_name = user_info.get("name")
+    user_info = userinfo_response.json()
+    google_email = user_info.get("email")
+    google_name = user_info.get("name")
         
     # 3. 處理資料庫 (登入/註冊)
     
@@ -1,18 +1,38 @@
 from typing import List
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import JSONResponse
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
-from app.core.db import get_session
-from app.models.board import Board
+from app.core.cache import cache, BOARDS_SCOPE
+from app.core.http_cache import cache_headers, is_not_modified, make_etag, not_modified
+from app.core.replica import get_read_session, reads_primary
+from app.models.board import Board, BoardStats
+from app.schemas.board import BoardRead
 
 # 這一行非常重要，main.py 就是在找這個變數！
 router = APIRouter(prefix="/boards", tags=["Boards"])
 
-@router.get("/", response_model=List[Board])
-async def read_boards(session: AsyncSession = Depends(get_session)):
+@router.get("/", response_model=List[BoardRead])
+async def read_boards(request: Request, session: AsyncSession = Depends(get_read_session)):
     """
-    取得所有看板列表
+    取得所有看板列表與統計 (文章數、留言數、24 小時內的文章數、最新文章)
+
+    統計來自預先計算的 board_stats，和看板一起以一次 JOIN 取回，不對 posts 做彙總。
+    經過快取，看板或統計異動時 bump "boards" 版本；版本號同時當 ETag。
     """
-    statement = select(Board).order_by(Board.id)
-    result = await session.exec(statement)
-    return result.all()
\ No newline at end of file
+    async def load():
+        statement = select(Board, BoardStats).outerjoin(BoardStats, BoardStats.board_id == Board.id).order_by(Board.id)
+        result = await session.exec(statement)
+        return [
+            BoardRead.model_validate({**board.model_dump(), "stats": stats.model_dump() if stats else None})
+            .model_dump(mode="json")
+            for board, stats in result.all()
+        ]
+
+    stamp = await cache.stamp(BOARDS_SCOPE)
+    etag = make_etag(stamp)
+    fresh = reads_primary(request)
+    if not fresh and is_not_modified(request, etag):
+        return not_modified(etag)
+    boards = await cache.get_or_load(f"boards:v{stamp}", load, refresh=fresh) if stamp else await load()
+    return JSONResponse(boards, headers=cache_headers(etag))
@@ -0,0 +1,53 @@
+# backend/app/api/v1/events.py
+
+from typing import List
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from app.core.pubsub import event_bus, post_channel, board_channels
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+KEEPALIVE_SECONDS = 15.0  # 定期送註解行，避免閒置連線被 proxy 切斷
+
+def _stream(channels: List[str]) -> StreamingResponse:
+    """
+    Server-Sent Events 串流：訂閱後只等待匯流排推送，不查資料庫
+
+    事件格式為 `event: <type>` + `data: <JSON>`；
+    收到 `resync` 代表連線落後漏了事件，前端應重新讀取一次列表。
+    """
+    async def events():
+        subscription = event_bus.subscribe(channels)
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                message = await subscription.get(timeout=KEEPALIVE_SECONDS)
+                if subscription.lagged:
+                    yield b"event: resync\ndata: {}\n\n"
+                    return
+                if message is None:
+                    yield b": ping\n\n"
+                    continue
+                yield message
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},  # nginx 不要緩衝
+    )
+
+# --- 1. 單篇文章：新留言、分數 / 留言數變化、文章刪除 ---
+@router.get("/posts/{post_id}")
+async def post_events(post_id: int):
+    return _stream([post_channel(post_id)])
+
+# --- 2. 看板 (不帶 board_id 時為全站)：新文章、分數 / 留言數變化、文章刪除 ---
+@router.get("/boards")
+async def all_board_events():
+    return _stream(board_channels(None))
+
+@router.get("/boards/{board_id}")
+async def board_events(board_id: int):
+    return _stream(board_channels(board_id)[:1])
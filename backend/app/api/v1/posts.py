@@ -1,12 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse
+from datetime import datetime
 from typing import List, Optional
 from sqlmodel import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.core import board_stats, user_stats
+from app.core.archive import archived_comments, fill_archived_content, page_archived_comments
+from app.core.cache import cache, board_scope, post_scope, user_scope, BOARDS_SCOPE, USERS_SCOPE
+from app.core.comments import ancestor_id, child_path, subtree_bounds
+from app.core.config import settings
 from app.core.db import get_session
-from app.core.security import get_current_user
-from app.models.post import Post, Vote, Comment
+from app.core.http_cache import cache_headers, is_not_modified, make_etag, not_modified
+from app.core.counters import write_vote, apply_vote_delta, increment_comment_count
+from app.core.pubsub import event_bus, post_channel, board_channels, post_updated_event
+from app.core.pagination import encode_cursor, decode_cursor, encode_path_cursor, decode_path_cursor
+from app.core.post_fields import make_excerpt, parse_fields, post_items, select_posts
+from app.core.purge import schedule_purge
+from app.core.ranking import ranking, RANKED_SORTS
+from app.core.replica import get_read_session, reads_primary
+from app.core.rate_limit import rate_limit
+from app.core.search import post_document, comment_document
+from app.core.security import get_current_user, get_current_user_id
+from app.core.vote_buffer import vote_buffer
+from app.models.post import Post, Comment
 from app.models.user import User
 # 記得匯入 PostCreate
 from app.schemas.post import PostRead, CommentRead, PostCreate 
@@ -21,76 +41,210 @@ async def delete_post(
     session: AsyncSession = Depends(get_session)
 ):
     post = await session.get(Post, post_id)
-    if not post:
+    if not post or post.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Post not found")
     
     if post.owner_id != current_user.id and not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Not authorized to delete this post")
-        
-    await session.delete(post)
+
+    # 只標記刪除 (一個很小的 UPDATE)，留言 / 投票 / 文章本身由背景工作分批清除
+    post.deleted_at = datetime.utcnow()
+    session.add(post)
+    await board_stats.post_deleted(session, post)
+    affected_users = await user_stats.post_removed(session, post)
     await session.commit()
+    await cache.bump(
+        board_scope(post.board_id), board_scope(None), post_scope(post.id), BOARDS_SCOPE,
+        *[user_scope(user_id) for user_id in affected_users],
+    )
+    await ranking.remove_post(post.id, post.board_id)
+    await event_bus.publish(
+        [post_channel(post.id), *board_channels(post.board_id)],
+        {"type": "post.deleted", "post_id": post.id, "board_id": post.board_id},
+    )
+    await schedule_purge(post.id)
     return None
 
 # --- 2. 投票功能 ---
-@router.post("/{post_id}/vote")
+@router.post("/{post_id}/vote", dependencies=[Depends(rate_limit("vote_post"))])
 async def vote_post(
     post_id: int,
     dir: int,
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
     session: AsyncSession = Depends(get_session)
 ):
-    statement = select(Vote).where(Vote.user_id == current_user.id, Vote.post_id == post_id)
-    result = await session.exec(statement)
-    existing_vote = result.first()
+    if dir not in (1, -1):
+        raise HTTPException(status_code=400, detail="dir must be 1 or -1")
 
-    if existing_vote:
-        if existing_vote.dir == dir:
-            await session.delete(existing_vote)
-        else:
-            existing_vote.dir = dir
-            session.add(existing_vote)
-    else:
-        new_vote = Vote(user_id=current_user.id, post_id=post_id, dir=dir)
-        session.add(new_vote)
-    
+    if settings.VOTE_BUFFER_ENABLED:
+        # 緩衝模式：只記下新狀態，計數由背景 flusher 批次寫回後以 post.updated 事件推送
+        result = await vote_buffer.vote(session, post_id, current_user_id, dir)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Post not found")
+        return {"message": "Vote recorded", "dir": result[1]}
+
+    # 一次原子寫入投票 + 一次計數增量更新，同一個交易
+    try:
+        old, new = await write_vote(session, post_id, current_user_id, dir)
+        counters = await apply_vote_delta(session, post_id, old, new)
+    except IntegrityError:
+        counters = None
+    if counters is None:
+        await session.rollback()
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    await user_stats.votes_received(session, counters.owner_id, (new == 1) - (old == 1), (new == -1) - (old == -1))
     await session.commit()
-    return {"message": "Vote updated"}
+    await cache.bump(board_scope(counters.board_id), board_scope(None))
+    await ranking.update_post(counters)
+    await event_bus.publish([post_channel(post_id), *board_channels(counters.board_id)], post_updated_event(counters))
+    return {
+        "message": "Vote updated",
+        "dir": new,
+        "score": counters.score,
+        "upvotes": counters.upvotes,
+        "downvotes": counters.downvotes,
+    }
 
 # --- 3. 取得留言 (修正回傳模型) ---
 @router.get("/{post_id}/comments", response_model=List[CommentRead]) # [修正] 使用 CommentRead
 async def read_comments(
+    request: Request,
     post_id: int,
-    session: AsyncSession = Depends(get_session)
+    limit: Optional[int] = Query(None, ge=1, le=settings.COMMENT_PAGE_MAX),
+    cursor: Optional[str] = None,
+    parent_id: Optional[int] = None,
+    max_depth: Optional[int] = Query(None, ge=1),
+    session: AsyncSession = Depends(get_read_session)
 ):
-    # 使用 selectinload 預先加載 user 資訊
-    statement = select(Comment).where(Comment.post_id == post_id).options(selectinload(Comment.user)).order_by(Comment.created_at)
-    result = await session.exec(statement)
-    return result.all()
+    """
+    讀取留言
+
+    - 不帶任何分頁參數時回傳整篇的所有留言 (依時間排序)，相容舊版前端
+    - 帶 `limit` / `cursor` / `parent_id` 時依討論串順序 (深度優先) 分頁，一頁只有一次查詢
+    - `parent_id`：只讀某則留言底下的回覆 (「載入更多回覆」)
+    - `max_depth`：只往下讀幾層 (1 = 只有根留言，或指定 parent_id 時只有直接回覆)，
+      被截掉的回覆可從 `reply_count` 得知數量，再用 `parent_id` 載入
+    - 下一頁的游標放在 `X-Next-Cursor` header (沒有下一頁時不回傳)
+    - 回應帶 ETag (這篇的留言版本)，`If-None-Match` 相符時不查資料庫直接回 304
+    """
+    etag = make_etag(await cache.stamp(post_scope(post_id), USERS_SCOPE))
+    # 剛寫入過的人讀主庫，不用 304 (同版本號的內容可能是副本讀到的舊資料)
+    if not reads_primary(request) and is_not_modified(request, etag):
+        return not_modified(etag)
+
+    # 已刪除 (等待清除) 的文章不顯示留言，條件併在同一個查詢裡
+    post_visible = select(Post.id).where(Post.id == post_id, Post.deleted_at.is_(None)).exists()
+
+    if limit is None and cursor is None and parent_id is None and max_depth is None:
+        # 使用 selectinload 預先加載 user 資訊
+        statement = select(Comment).where(Comment.post_id == post_id, post_visible).options(selectinload(Comment.user)).order_by(Comment.created_at)
+        comments = (await session.exec(statement)).all()
+        if not comments:
+            # 已封存的討論串：留言在快照裡
+            archived = await archived_comments(session, post_id)
+            if archived is not None:
+                comments = sorted(archived, key=lambda comment: (comment.created_at, comment.id))
+        return ORJSONResponse(
+            [CommentRead.model_validate(comment).model_dump(mode="json") for comment in comments],
+            headers=cache_headers(etag),
+        )
+
+    limit = limit or settings.COMMENT_PAGE_MAX
+    # 每則留言只對應一個作者，用 JOIN 一起取回，整頁只要一次查詢
+    statement = select(Comment).where(Comment.post_id == post_id, post_visible).options(joinedload(Comment.user))
+
+    base_depth = 0
+    if parent_id:
+        # 子孫留言的 path 落在 (parent.path + "/", parent.path + "0") 之間
+        parent = select(Comment).where(Comment.id == parent_id, Comment.post_id == post_id).subquery()
+        lower, upper = subtree_bounds(select(parent.c.path).scalar_subquery())
+        statement = statement.where(Comment.path > lower, Comment.path < upper)
+        base_depth = select(parent.c.depth).scalar_subquery() + 1
+    if max_depth:
+        statement = statement.where(Comment.depth < base_depth + max_depth)
+    if cursor:
+        statement = statement.where(Comment.path > decode_path_cursor(cursor))
+
+    statement = statement.order_by(Comment.path).limit(limit)
+    comments = (await session.exec(statement)).all()
+    if not comments:
+        archived = await archived_comments(session, post_id)
+        if archived is not None:
+            after_path = decode_path_cursor(cursor) if cursor else None
+            comments = page_archived_comments(archived, limit, after_path, parent_id, max_depth)
+
+    headers = cache_headers(etag)
+    if comments and len(comments) == limit:
+        headers["X-Next-Cursor"] = encode_path_cursor(comments[-1].path)
+    return ORJSONResponse(
+        [CommentRead.model_validate(comment).model_dump(mode="json") for comment in comments],
+        headers=headers,
+    )
 
 # --- 4. 新增留言 (修正回傳模型與填充 User) ---
-@router.post("/{post_id}/comments", response_model=CommentRead) # [修正] 使用 CommentRead
+@router.post("/{post_id}/comments", response_model=CommentRead, dependencies=[Depends(rate_limit("create_comment"))]) # [修正] 使用 CommentRead
 async def create_comment(
     post_id: int,
     content: str, 
     is_spoiler: bool = False,
+    parent_id: Optional[int] = None,
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
+    parent = None
+    if parent_id:
+        parent = await session.get(Comment, parent_id)
+        if not parent or parent.post_id != post_id:
+            raise HTTPException(status_code=404, detail="Parent comment not found")
+        if parent.depth >= settings.COMMENT_MAX_DEPTH:
+            # 太深的回覆改掛在最深一層的祖先底下，path 長度有上限
+            parent = await session.get(Comment, ancestor_id(parent.path, settings.COMMENT_MAX_DEPTH - 1))
+
     comment = Comment(
         content=content, 
         user_id=current_user.id, 
         post_id=post_id,
-        is_spoiler=is_spoiler
+        is_spoiler=is_spoiler,
+        parent_id=parent.id if parent else None,
+        depth=parent.depth + 1 if parent else 0,
     )    
     session.add(comment)
+    try:
+        counters = await increment_comment_count(session, post_id)
+    except IntegrityError:
+        counters = None
+    if counters is None:
+        await session.rollback()
+        raise HTTPException(status_code=404, detail="Post not found")
+    # path 需要自己的 id，INSERT 之後在同一個交易內補上
+    comment.path = child_path(parent.path if parent else "", comment.id)
+    if parent:
+        await session.exec(
+            update(Comment).where(Comment.id == parent.id).values(reply_count=Comment.reply_count + 1)
+        )
+    session.add(comment_document(comment, counters.board_id))
+    await board_stats.comments_added(session, counters.board_id)
+    await user_stats.comments_added(session, current_user.id)
     await session.commit()
+    await cache.bump(
+        board_scope(counters.board_id), board_scope(None), post_scope(post_id), BOARDS_SCOPE, user_scope(current_user.id)
+    )
+    await ranking.update_post(counters)
     await session.refresh(comment)
     comment.user = current_user 
+
+    await event_bus.publish([post_channel(post_id)], {
+        "type": "comment.created",
+        "post_id": post_id,
+        "comment": CommentRead.model_validate(comment).model_dump(mode="json"),
+    })
+    await event_bus.publish([post_channel(post_id), *board_channels(counters.board_id)], post_updated_event(counters))
     
     return comment
 
 # --- 5. 建立文章 (修正輸入/輸出模型) ---
-@router.post("/", response_model=PostRead, status_code=status.HTTP_201_CREATED) # [修正] 回傳 PostRead
+@router.post("/", response_model=PostRead, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit("create_post"))]) # [修正] 回傳 PostRead
 async def create_post(
     post_in: PostCreate, 
     current_user: User = Depends(get_current_user),
@@ -101,36 +255,122 @@ async def create_post(
     """
     db_post = Post(
         **post_in.model_dump(), 
-        owner_id=current_user.id
+        owner_id=current_user.id,
+        excerpt=make_excerpt(post_in.content),
     )
     
     session.add(db_post)
+    await session.flush()
+    session.add(post_document(db_post))
+    await board_stats.post_created(session, db_post)
+    await user_stats.posts_added(session, current_user.id)
     await session.commit()
+    await cache.bump(board_scope(db_post.board_id), board_scope(None), BOARDS_SCOPE, user_scope(current_user.id))
     await session.refresh(db_post)
+    await ranking.update_post(db_post)
     
     # [關鍵] 手動填充 owner 屬性，讓前端發完文能馬上顯示作者名
     db_post.owner = current_user
+
+    await event_bus.publish(board_channels(db_post.board_id), {
+        "type": "post.created",
+        "post": PostRead.model_validate(db_post).model_dump(mode="json"),
+    })
     
     return db_post
 
 # --- 6. 讀取文章列表 (修正回傳模型) ---
 @router.get("/", response_model=List[PostRead]) # [修正] 回傳 List[PostRead]
 async def read_posts(
+    request: Request,
     board_id: Optional[int] = None,
     user_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
-    session: AsyncSession = Depends(get_session)
+    cursor: Optional[str] = None,
+    sort: str = "new",
+    fields: Optional[str] = None,
+    excerpt: bool = False,
+    session: AsyncSession = Depends(get_read_session)
 ):
-    statement = select(Post).options(selectinload(Post.owner))
-    
-    if board_id:
-        statement = statement.where(Post.board_id == board_id)
-    
-    if user_id:
-        statement = statement.where(Post.owner_id == user_id)
+    """
+    讀取文章列表
+
+    - `sort=new` (預設) 新到舊；`hot` / `top_day` / `top_week` 讀預先排好的排行，以 `skip` 翻頁
+
+    - 帶 `cursor` 時使用 keyset 分頁，從上一頁最後一筆之後接著讀，不受新文章插入影響
+    - 不帶 `cursor` 時維持舊的 `skip` 分頁，相容舊版前端
+    - 下一頁的游標放在 `X-Next-Cursor` header (沒有下一頁時不回傳)
+    - 前幾頁 (skip < CACHE_POSTS_MAX_SKIP) 會經過快取，看板有新文章 / 投票 / 留言時失效
+    - 同一個版本號也當 ETag，`If-None-Match` 相符時不查資料庫直接回 304
+
+    - `fields=id,title,excerpt,owner,...` 只回傳 (也只查詢) 指定的欄位
+    - `excerpt=true` 以截斷的 `excerpt` 取代完整的 `content` (列表頁用)
+    """
+    selected = parse_fields(fields, excerpt)
+    if sort != "new" and sort not in RANKED_SORTS:
+        raise HTTPException(status_code=400, detail="sort must be one of: new, hot, top_day, top_week")
+    if sort != "new" and (user_id or cursor):
+        raise HTTPException(status_code=400, detail="Ranked sorts do not support user_id or cursor")
+
+    async def load_ranked():
+        # 排行只給出 id，再用主鍵一次取回文章並照排行順序排列
+        post_ids = await ranking.page(board_id, sort, skip, limit)
+        statement = select_posts(selected).where(Post.id.in_(post_ids))
+        rows_by_id = {row.id: row for row in (await session.exec(statement)).all()}
+        rows = [rows_by_id[post_id] for post_id in post_ids if post_id in rows_by_id]
+        items = post_items(rows, selected)
+        if "content" in selected:
+            await fill_archived_content(rows, items)
+        return {"items": items, "next_cursor": None}
+
+    async def load():
+        # 只查需要的欄位，結果列直接組成 dict，不建立 ORM 物件也不經過 PostRead 驗證
+        statement = select_posts(selected)
         
-    statement = statement.offset(skip).limit(limit).order_by(Post.created_at.desc())
-    
-    result = await session.exec(statement)
-    return result.all()
\ No newline at end of file
+        if board_id:
+            statement = statement.where(Post.board_id == board_id)
+        
+        if user_id:
+            statement = statement.where(Post.owner_id == user_id)
+
+        if cursor:
+            # 走 (board_id/owner_id, created_at, id) 複合索引，直接定位到上一頁結尾
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            statement = statement.where(tuple_(Post.created_at, Post.id) < (cursor_created_at, cursor_id))
+        else:
+            statement = statement.offset(skip)
+
+        statement = statement.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit)
+        rows = (await session.exec(statement)).all()
+
+        next_cursor = None
+        if rows and len(rows) == limit:
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+        items = post_items(rows, selected)
+        if "content" in selected:
+            # 已封存的文章從快照補上內文
+            await fill_archived_content(rows, items)
+        return {"items": items, "next_cursor": next_cursor}
+
+    scope = board_scope(board_id)
+    stamp = await cache.stamp(scope, USERS_SCOPE)
+    etag = make_etag(stamp)
+    # 剛寫入過的人讀主庫：不回 304、不讀共用快取 (可能是副本在寫入後放進去的舊頁面)，查完覆寫快取
+    fresh = reads_primary(request)
+    if not fresh and is_not_modified(request, etag):
+        return not_modified(etag)
+
+    loader = load if sort == "new" else load_ranked
+    if stamp is not None and cursor is None and skip < settings.CACHE_POSTS_MAX_SKIP:
+        page = await cache.get_or_load(
+            f"posts:{scope}:v{stamp}:{sort}:u{user_id}:s{skip}:l{limit}:f{','.join(selected)}", loader,
+            refresh=fresh,
+        )
+    else:
+        page = await loader()
+
+    headers = cache_headers(etag)
+    if page["next_cursor"]:
+        headers["X-Next-Cursor"] = page["next_cursor"]
+    return ORJSONResponse(page["items"], headers=headers)
@@ -0,0 +1,24 @@
+# backend/app/api/v1/search.py
+
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.replica import get_read_session
+from app.core.search import search
+from app.schemas.search import SearchHit
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+@router.get("/", response_model=List[SearchHit])
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    board_id: Optional[int] = None,
+    author_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_read_session)
+):
+    """
+    搜尋文章與留言 (依相關度排序)，可用看板 / 作者篩選
+    """
+    return await search(session, q, board_id=board_id, author_id=author_id, limit=limit, offset=offset)
@@ -1,25 +1,233 @@
 # backend/app/api/v1/upload.py
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.core.minio import minio_handler
+import asyncio
+import hashlib
+import logging
 import uuid
+from typing import Optional
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from starlette.datastructures import Headers
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.config import settings
+from app.core.db import get_session
+from app.core.images import pick_variant
+from app.core.jobs import job_queue
+from app.core.minio import minio_handler
+from app.core.rate_limit import rate_limit
+from app.core.security import get_current_user_id
+from app.models.upload import UploadedImage
+from app.schemas.upload import PresignRequest, PresignResponse, UploadComplete
 
 router = APIRouter(prefix="/upload", tags=["Upload"])
 
-@router.post("/image")
-async def upload_image(file: UploadFile = File(...)):
-    # 驗證檔案類型
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="只允許上傳圖片")
-    
-    # 產生唯一檔名，避免重複
-    file_extension = file.filename.split(".")[-1]
-    file_name = f"{uuid.uuid4()}.{file_extension}"
-    
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+# 每個 worker 同時進行的上傳數上限，超過的請求排隊等待
+upload_slots = asyncio.Semaphore(settings.UPLOAD_MAX_CONCURRENCY)
+
+class FileTooLarge(Exception):
+    pass
+
+# 允許的圖片類型與存檔用的副檔名 (不採用客戶端的檔名，SVG 等可以夾帶腳本的格式不收)
+IMAGE_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "image/avif": "avif",
+}
+
+# multipart 表單除了檔案本身還有邊界與各段標頭
+FORM_OVERHEAD = 64 * 1024
+UPLOAD_PATH = f"{settings.API_V1_STR}/upload/image"
+
+class UploadSizeLimitMiddleware:
+    """
+    上傳圖片的請求在 body 收完 (寫進暫存檔) 之前就擋掉過大的
+
+    File(...) 參數會讓 FastAPI 在執行端點 (與 rate limit 等依賴) 前先收完整個表單，
+    端點內的大小檢查來不及：Content-Length 超過上限時直接回 413，沒有 Content-Length
+    (chunked) 時邊收邊計算，超過就中止。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != UPLOAD_PATH:
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = settings.UPLOAD_MAX_BYTES + FORM_OVERHEAD
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            response = JSONResponse({"detail": "圖片超過大小上限"}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def receive_wrapper():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # 表單解析中丟出的 HTTPException 會照原樣回給客戶端
+                    raise HTTPException(status_code=413, detail="圖片超過大小上限")
+            return message
+
+        await self.app(scope, receive_wrapper, send)
+
+def _hash_file(file_obj, max_bytes):
+    """分塊讀完檔案，回傳 (sha256, 大小)；超過上限時丟出 FileTooLarge"""
+    digest = hashlib.sha256()
+    size = 0
+    file_obj.seek(0)
+    while chunk := file_obj.read(CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_bytes:
+            raise FileTooLarge()
+        digest.update(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest(), size
+
+async def record_upload(session: AsyncSession, file_name: str, owner_id: Optional[int], content_type: str, size: int):
+    """記錄已上傳的圖片，並排入縮圖流程 (已記錄過的不會重複處理)"""
+    statement = select(UploadedImage).where(UploadedImage.object_name == file_name)
+    if (await session.exec(statement)).first():
+        return
+    session.add(UploadedImage(object_name=file_name, owner_id=owner_id, content_type=content_type, size=size))
     try:
-        # 讀取檔案並上傳
-        url = minio_handler.upload_file(file.file, file_name, file.content_type)
-        return {"url": url}
+        await session.commit()
+    except IntegrityError:
+        # 同一個物件被同時記錄
+        await session.rollback()
+        return
+    try:
+        await job_queue.enqueue("image.variants", {"object_name": file_name})
     except Exception as e:
-        print(f"Upload error: {e}")
-        raise HTTPException(status_code=500, detail="圖片上傳失敗")
\ No newline at end of file
+        # 佇列暫時無法使用時圖片仍可使用 (沒有縮圖時回傳原圖)
+        logger.warning("failed to enqueue thumbnails for %s: %s", file_name, e)
+
+@router.post("/image", dependencies=[Depends(rate_limit("upload_image"))])
+async def upload_image(file: UploadFile = File(...), session: AsyncSession = Depends(get_session)):
+    # 驗證檔案類型，副檔名由類型決定
+    file_extension = IMAGE_EXTENSIONS.get(file.content_type)
+    if file_extension is None:
+        raise HTTPException(status_code=400, detail="只允許上傳圖片")
+
+    async with upload_slots:
+        # 以內容的 SHA-256 當檔名：同一張圖重複上傳時直接回傳既有的物件
+        try:
+            digest, size = await run_in_threadpool(_hash_file, file.file, settings.UPLOAD_MAX_BYTES)
+        except FileTooLarge:
+            raise HTTPException(status_code=413, detail="圖片超過大小上限")
+        file_name = f"{digest}.{file_extension}"
+
+        try:
+            if not await minio_handler.object_exists_async(file_name):
+                # 讀取檔案並上傳 (在 threadpool 執行，不阻塞 event loop)
+                await minio_handler.upload_file_async(file.file, file_name, file.content_type, length=size)
+        except Exception:
+            logger.exception("upload of %s failed", file_name)
+            raise HTTPException(status_code=500, detail="圖片上傳失敗")
+
+    await record_upload(session, file_name, None, file.content_type, size)
+    return {"url": minio_handler.object_url(file_name)}
+
+
+# --- 直傳 MinIO：API 只負責簽章與確認，圖片本身不經過後端 ---
+@router.post("/presign", response_model=PresignResponse, dependencies=[Depends(rate_limit("upload_image"))])
+async def presign_upload(
+    upload_in: PresignRequest,
+    current_user_id: int = Depends(get_current_user_id)
+):
+    file_extension = IMAGE_EXTENSIONS.get(upload_in.content_type)
+    if file_extension is None:
+        raise HTTPException(status_code=400, detail="只允許上傳圖片")
+
+    # 檔名帶上使用者 id，complete 時用來確認是本人簽出的物件
+    file_name = f"{current_user_id}-{uuid.uuid4()}.{file_extension}"
+    try:
+        fields = await minio_handler.presigned_post_policy_async(
+            file_name, upload_in.content_type, settings.UPLOAD_MAX_BYTES, settings.UPLOAD_PRESIGN_EXPIRE_SECONDS
+        )
+    except Exception:
+        logger.exception("presign for %s failed", file_name)
+        raise HTTPException(status_code=500, detail="無法產生上傳簽章")
+
+    return PresignResponse(
+        url=f"/{minio_handler.bucket_name}",
+        fields=fields,
+        object_name=file_name,
+        max_bytes=settings.UPLOAD_MAX_BYTES,
+        expires_in=settings.UPLOAD_PRESIGN_EXPIRE_SECONDS,
+    )
+
+@router.post("/complete")
+async def complete_upload(
+    upload_in: UploadComplete,
+    current_user_id: int = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_session)
+):
+    file_name = upload_in.object_name
+    if not file_name.startswith(f"{current_user_id}-") or "/" in file_name:
+        raise HTTPException(status_code=403, detail="Not authorized to complete this upload")
+
+    statement = select(UploadedImage).where(UploadedImage.object_name == file_name)
+    existing = (await session.exec(statement)).first()
+    if existing:
+        return {"url": minio_handler.object_url(file_name)}
+
+    try:
+        stat = await minio_handler.stat_object_async(file_name)
+    except Exception:
+        logger.exception("stat of uploaded %s failed", file_name)
+        raise HTTPException(status_code=500, detail="無法確認上傳結果")
+    if stat is None:
+        raise HTTPException(status_code=404, detail="找不到上傳的圖片")
+
+    # policy 已限制類型與大小，這裡再檢查一次，不合格的物件直接刪掉
+    content_type = stat.content_type or ""
+    if content_type not in IMAGE_EXTENSIONS or stat.size > settings.UPLOAD_MAX_BYTES:
+        await minio_handler.remove_object_async(file_name)
+        raise HTTPException(status_code=400, detail="上傳的檔案不符合限制")
+
+    await record_upload(session, file_name, current_user_id, content_type, stat.size)
+    return {"url": minio_handler.object_url(file_name)}
+
+# --- 取得最適合的縮圖網址 ---
+@router.get("/variants/{file_name}")
+async def resolve_variant(
+    file_name: str,
+    request: Request,
+    width: int = Query(640, ge=1, le=4096),
+    format: Optional[str] = Query(None, pattern="^(webp|avif)$"),
+    redirect: bool = False,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    依顯示寬度與瀏覽器支援的格式 (Accept header 或 format 參數) 選出最小但夠用的版本
+
+    `redirect=true` 時直接 307 轉址，可以放在 <img src> 使用。
+    """
+    statement = select(UploadedImage).where(UploadedImage.object_name == file_name)
+    image = (await session.exec(statement)).first()
+    if image is None:
+        raise HTTPException(status_code=404, detail="找不到圖片")
+
+    if format:
+        formats = [format]
+    else:
+        formats = (["avif"] if "image/avif" in request.headers.get("accept", "") else []) + ["webp"]
+    url = minio_handler.object_url(pick_variant(file_name, image.variants, width, formats))
+    if redirect:
+        return RedirectResponse(url, status_code=307)
+    return {"url": url}
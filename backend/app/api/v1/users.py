@@ -1,10 +1,15 @@
 # backend/app/api/v1/users.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core import user_stats
+from app.core.cache import cache, user_scope, USERS_SCOPE
 from app.core.db import get_session
-from app.core.security import get_current_user
-from app.models.user import User
+from app.core.replica import get_read_session, reads_primary
+from app.core.security import get_current_user_id, user_cache
+from app.models.user import User, UserStats
+from app.schemas.user import UserProfile
 from pydantic import BaseModel
 from typing import Optional
 
@@ -18,17 +23,30 @@ class UserUpdate(BaseModel):
     bg_right: Optional[str] = None
 
 @router.get("/me", response_model=User)
-async def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(
+    current_user_id: int = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_session)
+):
+    # 快取的快照只有公開欄位 (不含 email)，完整資料從資料庫讀取
+    current_user = await session.get(User, current_user_id)
+    if current_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
     return current_user
 
 # [新增] 更新個人資料
 @router.patch("/me", response_model=User)
 async def update_user_me(
     user_in: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
     session: AsyncSession = Depends(get_session)
 ):
+    # 從資料庫重新讀取，避免以快取中的舊快照覆寫
+    current_user = await session.get(User, current_user_id)
+    if current_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
     # 更新欄位
+    nickname_changed = user_in.nickname is not None and user_in.nickname != current_user.nickname
     if user_in.nickname is not None:
         current_user.nickname = user_in.nickname
     if user_in.bg_left is not None:
@@ -41,4 +59,35 @@ async def update_user_me(
     session.add(current_user)
     await session.commit()
     await session.refresh(current_user)
-    return current_user
\ No newline at end of file
+    await user_cache.invalidate(current_user.id)
+    if nickname_changed:
+        # 文章 / 留言列表裡的作者暱稱跟著更新
+        await cache.bump(USERS_SCOPE)
+    return current_user
+
+# 公開個人頁 (放在 /me 之後，user_id 只接受整數)
+@router.get("/{user_id}", response_model=UserProfile)
+async def read_user_profile(request: Request, user_id: int, session: AsyncSession = Depends(get_read_session)):
+    """
+    公開個人頁：暱稱、統計 (文章數、留言數、文章收到的讚 / 倒讚) 與最近動態
+
+    - 統計來自預先計算的 user_stats，和使用者一起以一次主鍵 JOIN 取回，不做彙總
+    - 最近動態 (文章與留言合併，新到舊) 經過快取，這個人發文 / 留言 / 內容被移除時失效
+    """
+    statement = select(User, UserStats).outerjoin(UserStats, UserStats.user_id == User.id).where(User.id == user_id)
+    row = (await session.exec(statement)).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user, stats = row
+
+    async def load():
+        return await user_stats.recent_activity(session, user_id)
+
+    stamp = await cache.stamp(user_scope(user_id))
+    key = f"activity:{user_scope(user_id)}:v{stamp}"
+    activity = await cache.get_or_load(key, load, refresh=reads_primary(request)) if stamp else await load()
+    return UserProfile.model_validate({
+        **user.model_dump(include={"id", "username", "nickname", "created_at"}),
+        "stats": stats.model_dump() if stats else {},
+        "recent_activity": activity,
+    })
@@ -0,0 +1,197 @@
+# backend/app/cli.py
+#
+# 維運指令 (在 backend/ 目錄或容器的 /app 下執行)：
+#   python -m app.cli reconcile-counters [--batch-size 5000]
+#   python -m app.cli rebuild-rankings
+#   python -m app.cli rebuild-board-stats
+#   python -m app.cli rebuild-user-stats
+#   python -m app.cli reindex-search [--batch-size 2000]
+#   python -m app.cli backfill-comment-paths [--batch-size 5000]
+#   python -m app.cli backfill-post-excerpts [--batch-size 2000]
+#   python -m app.cli purge-deleted-posts [--older-than-minutes 60]
+#   python -m app.cli archive-threads [--older-than-days 365]
+#   python -m app.cli export-data --output forum.ndjson.gz [--tables users,posts] [--redact]
+#   python -m app.cli import-data --input forum.ndjson.gz
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import timedelta
+
+from sqlmodel import SQLModel
+
+import app.models  # noqa: F401  註冊所有資料表與關聯
+from app.core.db import async_session, engine
+
+
+async def reconcile_counters(args):
+    from app.core.counters import reconcile_post_counters
+
+    async with async_session() as session:
+        fixed = await reconcile_post_counters(session, batch_size=args.batch_size)
+    print(f"已修正 {fixed} 篇文章的計數")
+
+
+async def rebuild_rankings(args):
+    from app.core.ranking import ranking
+
+    async with async_session() as session:
+        await ranking.rebuild(session)
+    print("排行已重建")
+
+
+async def rebuild_board_stats(args):
+    from app.core.board_stats import rebuild
+
+    async with async_session() as session:
+        total = await rebuild(session)
+    print(f"已重算 {total} 個看板的統計")
+
+
+async def rebuild_user_stats(args):
+    from app.core.user_stats import rebuild
+
+    async with async_session() as session:
+        fixed = await rebuild(session)
+    print(f"已修正 {fixed} 位使用者的統計")
+
+
+async def reindex_search(args):
+    from app.core.search import reindex
+
+    async with async_session() as session:
+        total = await reindex(session, batch_size=args.batch_size)
+    print(f"已重建 {total} 筆搜尋索引")
+
+
+async def backfill_comment_paths(args):
+    from app.core.comments import backfill_paths
+
+    async with async_session() as session:
+        total = await backfill_paths(session, batch_size=args.batch_size)
+    print(f"已替 {total} 則留言補上討論串 path")
+
+
+async def backfill_post_excerpts(args):
+    from app.core.post_fields import backfill_excerpts
+
+    async with async_session() as session:
+        total = await backfill_excerpts(session, batch_size=args.batch_size)
+    print(f"已替 {total} 篇文章補上列表摘要")
+
+
+async def purge_deleted(args):
+    from app.core.purge import purge_deleted_posts
+
+    total = await purge_deleted_posts(timedelta(minutes=args.older_than_minutes))
+    print(f"已清除 {total} 篇已刪除的文章")
+
+
+async def archive_threads(args):
+    from app.core.archive import archive_threads
+
+    total = await archive_threads(args.older_than_days)
+    print(f"已封存 {total} 篇討論串")
+
+
+async def export_data(args):
+    from app.core.bulk import BulkExportError, export_ndjson, gzip_chunks, parse_tables
+
+    size = 0
+    try:
+        with open(args.output, "wb") as output:
+            async for chunk in gzip_chunks(export_ndjson(parse_tables(args.tables), redact=args.redact)):
+                output.write(chunk)
+                size += len(chunk)
+    except BulkExportError as e:
+        # 不留下不完整的備份
+        os.remove(args.output)
+        raise SystemExit(str(e))
+    print(f"已匯出到 {args.output} ({size / 1024 / 1024:.1f} MB)")
+
+
+async def import_data(args):
+    from app.core.bulk import BulkImportError, import_ndjson
+
+    async def read_file():
+        with open(args.input, "rb") as source:
+            while chunk := source.read(1024 * 1024):
+                yield chunk
+
+    # 全新的資料庫還沒有資料表
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    start = time.perf_counter()
+    try:
+        counts = await import_ndjson(read_file())
+    except BulkImportError as e:
+        raise SystemExit(str(e))
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    print(", ".join(f"{name} {count}" for name, count in counts.items()))
+    print(f"已匯入 {total} 列，耗時 {elapsed:.1f}s ({total / elapsed * 60:,.0f} 列/分鐘)")
+    print("搜尋索引不在匯出檔中，請接著執行 python -m app.cli reindex-search")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="ACG Forum 維運指令")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = commands.add_parser("reconcile-counters", help="從 votes / comments 重算文章的分數與留言數")
+    reconcile.add_argument("--batch-size", type=int, default=5000)
+    reconcile.set_defaults(handler=reconcile_counters)
+
+    rankings = commands.add_parser("rebuild-rankings", help="從資料庫重建 hot / top 排行")
+    rankings.set_defaults(handler=rebuild_rankings)
+
+    stats = commands.add_parser("rebuild-board-stats", help="從文章重算看板統計 (文章數、留言數、最新文章)")
+    stats.set_defaults(handler=rebuild_board_stats)
+
+    users = commands.add_parser("rebuild-user-stats", help="從文章 / 留言重算個人頁的統計 (文章數、留言數、收到的讚 / 倒讚)")
+    users.set_defaults(handler=rebuild_user_stats)
+
+    reindex = commands.add_parser("reindex-search", help="重建文章與留言的全文搜尋索引")
+    reindex.add_argument("--batch-size", type=int, default=2000)
+    reindex.set_defaults(handler=reindex_search)
+
+    backfill = commands.add_parser("backfill-comment-paths", help="替舊留言補上串狀留言需要的 path")
+    backfill.add_argument("--batch-size", type=int, default=5000)
+    backfill.set_defaults(handler=backfill_comment_paths)
+
+    excerpts = commands.add_parser("backfill-post-excerpts", help="替舊文章補上列表用的 excerpt 摘要")
+    excerpts.add_argument("--batch-size", type=int, default=2000)
+    excerpts.set_defaults(handler=backfill_post_excerpts)
+
+    purge = commands.add_parser("purge-deleted-posts", help="清除已刪除文章留下的留言、投票與文章本身")
+    purge.add_argument("--older-than-minutes", type=int, default=60,
+                       help="只清刪除超過幾分鐘的 (較新的通常還在佇列裡)")
+    purge.set_defaults(handler=purge_deleted)
+
+    archive = commands.add_parser("archive-threads", help="把舊討論串的內文與留言搬到 MinIO 快照，只留下文章 stub")
+    archive.add_argument("--older-than-days", type=int, help="發文與最後一則留言超過幾天 (預設 ARCHIVE_AFTER_DAYS)")
+    archive.set_defaults(handler=archive_threads)
+
+    export = commands.add_parser("export-data", help="匯出 users / boards / posts / comments / votes (gzip NDJSON)")
+    export.add_argument("--output", required=True)
+    export.add_argument("--tables", help="逗號分隔，預設全部")
+    export.add_argument("--redact", action="store_true", help="不匯出 email 與密碼雜湊")
+    export.set_defaults(handler=export_data)
+
+    load = commands.add_parser("import-data", help="把 export-data 的輸出匯入空的資料庫")
+    load.add_argument("--input", required=True)
+    load.set_defaults(handler=import_data)
+
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            await args.handler(args)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+# app/core/archive.py
+#
+# 舊討論串封存：posts / comments / votes 不再無限成長
+#
+# 發文與最後一則留言都超過 ARCHIVE_AFTER_DAYS 天的討論串：
+#   1. 文章與所有留言寫成一個 gzip 壓縮的 JSON 快照，放在不公開的 ARCHIVE_BUCKET：
+#      threads/{發文年}/{月}/{post_id}.json.gz
+#   2. 快照上傳成功後，在同一個交易內設定 posts.archived_at (討論串凍結，不能再留言 / 投票)、
+#      刪掉留言 (含搜尋索引)、投票，清空內文；文章列留下來當 stub
+#      (標題、摘要、作者、看板、最終的讚 / 倒讚 / 留言數)
+# 任何一步失敗 (包括行程中途結束) 資料庫都不會動，有 archived_at 的文章一定有快照。
+#
+# 讀取是透明的：read_posts 需要內文、read_comments 讀到空的討論串時才去載入快照 (lazy)，
+# 快照以行程內的 LRU 快取 (ARCHIVE_CACHE_SIZE)，同一份同時只會下載一次。
+# 由 `python -m app.cli archive-threads` 或 "posts.archive" 背景工作執行。
+
+import asyncio
+import gzip
+import io
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import orjson
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import user_stats
+from app.core.cache import cache, user_scope
+from app.core.comments import subtree_bounds
+from app.core.config import settings
+from app.core.db import async_session
+from app.core.jobs import job_queue
+from app.core.minio import MinioHandler
+from app.core.post_fields import make_excerpt
+from app.models.post import Comment, Post, Vote
+from app.models.search import SearchDocument
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_JOB = "posts.archive"
+SNAPSHOT_VERSION = 1
+
+archive_store = MinioHandler(settings.ARCHIVE_BUCKET, public=False)
+
+
+def snapshot_name(post_id: int, created_at: datetime) -> str:
+    return f"threads/{created_at:%Y/%m}/{post_id}.json.gz"
+
+
+class SnapshotCache:
+    """快照的行程內 LRU；miss 時在 threadpool 下載並解壓，同一份同時只下載一次"""
+
+    def __init__(self, store: MinioHandler, max_entries: int):
+        self.store = store
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _read(self, name: str) -> dict:
+        snapshot = orjson.loads(gzip.decompress(self.store.get_object_bytes(name)))
+        for comment in snapshot["comments"]:
+            comment["created_at"] = datetime.fromisoformat(comment["created_at"])
+        return snapshot
+
+    async def get(self, name: str) -> dict:
+        if name in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(name)
+            return self._entries[name]
+
+        self.misses += 1
+        future = self._loading.get(name)
+        if future is None:
+            future = asyncio.ensure_future(run_in_threadpool(self._read, name))
+            self._loading[name] = future
+            future.add_done_callback(lambda _: self._loading.pop(name, None))
+        # shield：某個請求被取消時不要連帶取消其他人也在等的下載
+        snapshot = await asyncio.shield(future)
+        self._entries[name] = snapshot
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return snapshot
+
+    async def fetch(self, name: str) -> dict:
+        """不經過 LRU 讀一份快照 (匯出這類一次性的大量讀取，不要把熱門的擠出去)"""
+        return await run_in_threadpool(self._read, name)
+
+    def discard(self, name: str):
+        self._entries.pop(name, None)
+
+
+snapshot_cache = SnapshotCache(archive_store, settings.ARCHIVE_CACHE_SIZE)
+
+
+# --- 封存 ---
+async def archive_thread(post_id: int) -> bool:
+    """封存一篇討論串；已封存 / 已刪除，或寫快照期間有新的留言 / 投票時回傳 False (下次再封存)"""
+    async with async_session() as session:
+        statement = select(Post).where(Post.id == post_id, Post.archived_at.is_(None), Post.deleted_at.is_(None))
+        post = (await session.exec(statement)).first()
+        if post is None:
+            return False
+
+        # 1. 先寫快照，資料庫還沒有任何變動；名稱固定，中途失敗 (或被放棄) 時下次直接覆寫
+        comments = (await session.exec(
+            select(*Comment.__table__.columns).where(Comment.post_id == post_id).order_by(Comment.path)
+        )).all()
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "post": post.model_dump(),
+            "comments": [dict(comment._mapping) for comment in comments],
+        }
+        data = await run_in_threadpool(lambda: gzip.compress(orjson.dumps(snapshot)))
+        name = snapshot_name(post.id, post.created_at)
+        await archive_store.upload_file_async(io.BytesIO(data), name, "application/gzip", length=len(data), kind="archive")
+
+        # 2. 同一個交易內凍結並刪掉資料庫裡的內容；條件帶上寫快照時的計數，
+        #    期間有新的留言 / 投票 (快照不完整) 就放棄。之後的留言 / 投票會因 archived_at 被拒絕
+        frozen = await session.exec(
+            update(Post)
+            .where(
+                Post.id == post_id, Post.archived_at.is_(None), Post.deleted_at.is_(None),
+                Post.comment_count == post.comment_count,
+                Post.upvotes == post.upvotes, Post.downvotes == post.downvotes,
+            )
+            .values(archived_at=datetime.utcnow(), content="", excerpt=post.excerpt or make_excerpt(post.content))
+            .execution_options(synchronize_session=False)
+        )
+        if frozen.rowcount == 0:
+            await session.rollback()
+            logger.info("post %s changed while archiving, skipped", post_id)
+            return False
+        commenters = await user_stats.thread_comments_removed(session, post_id)
+        await session.exec(delete(SearchDocument).where(SearchDocument.post_id == post_id, SearchDocument.kind == "comment"))
+        await session.exec(delete(Comment).where(Comment.post_id == post_id))
+        await session.exec(delete(Vote).where(Vote.post_id == post_id))
+        await session.commit()
+    # 留言者個人頁的最近動態少了這些留言
+    await cache.bump(*[user_scope(user_id) for user_id in commenters])
+    logger.info("archived post %s (%d comments, %d bytes)", post_id, len(comments), len(data))
+    return True
+
+
+@job_queue.handler(ARCHIVE_JOB)
+async def archive_threads(older_than_days: Optional[int] = None) -> int:
+    """封存所有發文與最後一則留言都超過 older_than_days 天的討論串，回傳封存的篇數"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days or settings.ARCHIVE_AFTER_DAYS)
+    recent_comment = select(Comment.id).where(Comment.post_id == Post.id, Comment.created_at >= cutoff).exists()
+    archived = 0
+    last_id = 0
+    while True:
+        async with async_session() as session:
+            statement = select(Post.id) \
+                .where(Post.id > last_id, Post.created_at < cutoff, Post.archived_at.is_(None), Post.deleted_at.is_(None)) \
+                .where(~recent_comment) \
+                .order_by(Post.id).limit(settings.ARCHIVE_BATCH_SIZE)
+            post_ids = (await session.exec(statement)).all()
+        if not post_ids:
+            break
+        for post_id in post_ids:
+            if await archive_thread(post_id):
+                archived += 1
+            await asyncio.sleep(settings.ARCHIVE_PAUSE_MS / 1000)
+        last_id = post_ids[-1]
+        logger.info("archiving threads older than %s: %d done", cutoff.date(), archived)
+    return archived
+
+
+async def remove_snapshot(post: Post):
+    """清除已刪除的封存文章時一併刪掉快照"""
+    name = snapshot_name(post.id, post.created_at)
+    snapshot_cache.discard(name)
+    await archive_store.remove_object_async(name)
+
+
+# --- 讀取 ---
+async def fill_archived_content(rows, items: List[dict]):
+    """select_posts() 的結果中，已封存的文章從快照補上 content (快照讀不到時保留摘要)"""
+    archived = [(row, item) for row, item in zip(rows, items) if row._mapping.get("archived_at") is not None]
+    if not archived:
+        return
+    snapshots = await asyncio.gather(
+        *[snapshot_cache.get(snapshot_name(row.id, row.created_at)) for row, _ in archived],
+        return_exceptions=True,
+    )
+    for (row, item), snapshot in zip(archived, snapshots):
+        if isinstance(snapshot, Exception):
+            logger.warning("failed to load archived post %s: %s", row.id, snapshot)
+            continue
+        item["content"] = snapshot["post"]["content"]
+
+
+async def archived_comments(session: AsyncSession, post_id: int) -> Optional[List[SimpleNamespace]]:
+    """已封存的討論串回傳快照中的留言 (依 path 排序，附上作者目前的公開資料)，否則回傳 None；快照讀不到時回 503"""
+    statement = select(Post.id, Post.created_at) \
+        .where(Post.id == post_id, Post.archived_at.is_not(None), Post.deleted_at.is_(None))
+    post = (await session.exec(statement)).first()
+    if post is None:
+        return None
+    try:
+        snapshot = await snapshot_cache.get(snapshot_name(post.id, post.created_at))
+    except Exception as e:
+        # 快照不見了或 MinIO 連不上：回 503 (不是空的討論串，不能讓它被當成正常回應快取)
+        logger.warning("failed to load archived comments of post %s: %s", post_id, e)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Archived comments are temporarily unavailable")
+
+    user_ids = {comment["user_id"] for comment in snapshot["comments"]}
+    users = {}
+    if user_ids:
+        rows = (await session.exec(select(User.id, User.username, User.nickname).where(User.id.in_(user_ids)))).all()
+        users = {row.id: SimpleNamespace(id=row.id, username=row.username, nickname=row.nickname) for row in rows}
+    return [SimpleNamespace(**comment, user=users.get(comment["user_id"])) for comment in snapshot["comments"]]
+
+
+def page_archived_comments(
+    comments: List[SimpleNamespace],
+    limit: int,
+    after_path: Optional[str] = None,
+    parent_id: Optional[int] = None,
+    max_depth: Optional[int] = None,
+) -> List[SimpleNamespace]:
+    """和 read_comments 的 SQL 相同的篩選 (討論串順序)，在快照上進行"""
+    base_depth = 0
+    if parent_id:
+        parent = next((comment for comment in comments if comment.id == parent_id), None)
+        if parent is None:
+            return []
+        lower, upper = subtree_bounds(parent.path)
+        comments = [comment for comment in comments if lower < comment.path < upper]
+        base_depth = parent.depth + 1
+    if max_depth:
+        comments = [comment for comment in comments if comment.depth < base_depth + max_depth]
+    if after_path:
+        comments = [comment for comment in comments if comment.path > after_path]
+    return comments[:limit]
@@ -0,0 +1,154 @@
+# app/core/board_stats.py
+#
+# 看板列表的統計 (board_stats)：文章數、留言數、24 小時內的文章數、最新文章
+#
+# 首頁每次載入都對 posts 做 GROUP BY 太貴，改成一個看板一列的預先計算表：
+# - 發文 / 留言 / 刪文在同一個交易內以原子的 UPDATE 增量更新 (和文章的計數一樣)
+# - 「24 小時內」是滑動視窗，無法只靠增量維護：每 BOARD_STATS_REFRESH_SECONDS 重算一次
+#   (每個看板一次 partial index 上的範圍計數)，順便校正最新文章
+# - rebuild() 從 posts 完整重算所有欄位 (python -m app.cli rebuild-board-stats，匯入資料或數字有偏差時使用)
+# 數值變動時呼叫端要 bump BOARDS_SCOPE，GET /boards 的快取與 ETag 跟著失效。
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import case, func, or_, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import cache, BOARDS_SCOPE
+from app.core.config import settings
+from app.core.db import dialect_insert
+from app.models.board import Board, BoardStats
+from app.models.post import Post
+
+logger = logging.getLogger(__name__)
+
+RECENT_WINDOW = timedelta(hours=24)
+
+
+def _live_posts():
+    # 同一個看板、未刪除的文章 (走 ix_posts_board_created_id 這個 partial index)
+    return (Post.board_id == BoardStats.board_id, Post.deleted_at.is_(None))
+
+
+def _recent_count(cutoff: datetime):
+    return select(func.count()).where(*_live_posts(), Post.created_at >= cutoff).scalar_subquery()
+
+
+def _latest(column):
+    return select(column).where(*_live_posts()) \
+        .order_by(Post.created_at.desc(), Post.id.desc()).limit(1).scalar_subquery()
+
+
+async def post_created(session: AsyncSession, post: Post):
+    # 兩篇同時發表時，晚 commit 的不一定比較新
+    newer = or_(BoardStats.last_post_at.is_(None), BoardStats.last_post_at <= post.created_at)
+    await session.exec(
+        update(BoardStats)
+        .where(BoardStats.board_id == post.board_id)
+        .values(
+            post_count=BoardStats.post_count + 1,
+            posts_24h=BoardStats.posts_24h + 1,
+            last_post_id=case((newer, post.id), else_=BoardStats.last_post_id),
+            last_post_at=case((newer, post.created_at), else_=BoardStats.last_post_at),
+        )
+    )
+
+
+async def post_deleted(session: AsyncSession, post: Post):
+    """post.deleted_at 已設定時呼叫：扣掉這篇與它的留言；它是最新文章時改指向前一篇"""
+    await session.flush()
+    recent = 1 if post.created_at >= datetime.utcnow() - RECENT_WINDOW else 0
+    was_latest = BoardStats.last_post_id == post.id
+    await session.exec(
+        update(BoardStats)
+        .where(BoardStats.board_id == post.board_id)
+        .values(
+            post_count=BoardStats.post_count - 1,
+            comment_count=BoardStats.comment_count - post.comment_count,
+            posts_24h=BoardStats.posts_24h - recent,
+            last_post_id=case((was_latest, _latest(Post.id)), else_=BoardStats.last_post_id),
+            last_post_at=case((was_latest, _latest(Post.created_at)), else_=BoardStats.last_post_at),
+        )
+    )
+
+
+async def comments_added(session: AsyncSession, board_id: int, delta: int = 1):
+    await session.exec(
+        update(BoardStats)
+        .where(BoardStats.board_id == board_id)
+        .values(comment_count=BoardStats.comment_count + delta)
+    )
+
+
+async def refresh_recent(session: AsyncSession) -> int:
+    """重算 24 小時內的文章數與最新文章，回傳有變動的看板數"""
+    recent = _recent_count(datetime.utcnow() - RECENT_WINDOW)
+    latest_id = _latest(Post.id)
+    result = await session.exec(
+        update(BoardStats)
+        .where(or_(
+            BoardStats.posts_24h != recent,
+            func.coalesce(BoardStats.last_post_id, 0) != func.coalesce(latest_id, 0),
+        ))
+        .values(
+            posts_24h=recent, last_post_id=latest_id, last_post_at=_latest(Post.created_at),
+            refreshed_at=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def rebuild(session: AsyncSession, board_ids: Optional[list] = None) -> int:
+    """從 posts 完整重算 (看板沒有統計列時先補上)，回傳重算的看板數"""
+    if board_ids is None:
+        board_ids = (await session.exec(select(Board.id))).all()
+    if not board_ids:
+        return 0
+    insert = dialect_insert(session)
+    await session.exec(
+        insert(BoardStats).values([{"board_id": board_id} for board_id in board_ids]).on_conflict_do_nothing()
+    )
+    post_count = select(func.count()).where(*_live_posts()).scalar_subquery()
+    comment_count = select(func.coalesce(func.sum(Post.comment_count), 0)).where(*_live_posts()).scalar_subquery()
+    await session.exec(
+        update(BoardStats)
+        .where(BoardStats.board_id.in_(board_ids))
+        .values(
+            post_count=post_count,
+            comment_count=comment_count,
+            posts_24h=_recent_count(datetime.utcnow() - RECENT_WINDOW),
+            last_post_id=_latest(Post.id),
+            last_post_at=_latest(Post.created_at),
+            refreshed_at=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    await cache.bump(BOARDS_SCOPE)
+    return len(board_ids)
+
+
+async def ensure(session: AsyncSession):
+    """啟動時替還沒有統計列的看板 (新看板 / 第一次部署) 重算統計"""
+    statement = select(Board.id).outerjoin(BoardStats, BoardStats.board_id == Board.id) \
+        .where(BoardStats.board_id.is_(None))
+    missing = (await session.exec(statement)).all()
+    if missing:
+        await rebuild(session, list(missing))
+
+
+async def run_refresh_loop(session_factory):
+    while True:
+        await asyncio.sleep(settings.BOARD_STATS_REFRESH_SECONDS)
+        try:
+            async with session_factory() as session:
+                if await refresh_recent(session):
+                    await cache.bump(BOARDS_SCOPE)
+        except Exception as e:
+            logger.warning("board stats refresh failed: %s", e)
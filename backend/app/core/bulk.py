@@ -0,0 +1,258 @@
+# app/core/bulk.py
+#
+# 論壇資料的大量匯出 / 匯入 (備份、搬遷、分析、建立 staging 環境)
+#
+# 格式是 gzip 壓縮的 NDJSON，一行一列：{"table": "posts", "row": {...欄位...}}
+# 資料表依外鍵順序輸出 (users → boards → posts → comments → votes)，各表依 id 排序 (封存的留言除外，見下)，
+# 回覆一定排在它回覆的留言後面，匯入時不需要關掉外鍵檢查。
+#
+# - 匯出：server-side cursor (yield_per) 逐批讀取、逐批壓縮後交給 StreamingResponse / 檔案，
+#   記憶體用量只跟 BULK_FETCH_SIZE 有關，與資料量無關
+# - 匯入：邊解壓邊解析，每 BULK_BATCH_SIZE 列寫入一次並 commit；PostgreSQL 用 COPY，
+#   SQLite 用多列 INSERT。只能匯入到空的資料庫 (預設看板除外，以 upsert 覆寫)
+# - 封存的討論串 (見 archive.py) 匯出時從快照還原成一般的討論串：文章帶回內文、archived_at 清空，
+#   快照裡的留言接在 comments 的最後 (依 path，回覆仍在被回覆的留言後面)；投票紀錄不在快照裡，
+#   只留下文章上最終的讚 / 倒讚數。快照讀不到時中止匯出，不產生缺內容的備份
+# - 搜尋索引、看板 / 使用者統計、排行是衍生資料，不匯出：匯入後重建統計與排行，
+#   搜尋索引另外執行 `python -m app.cli reindex-search`
+
+import asyncio
+import logging
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+import orjson
+from sqlalchemy import DateTime, insert, text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import board_stats, user_stats
+from app.core.archive import snapshot_cache, snapshot_name
+from app.core.cache import cache, board_scope, BOARDS_SCOPE, USERS_SCOPE
+from app.core.config import settings
+from app.core.db import async_read_session, async_session, dialect_insert
+from app.core.ranking import ranking
+from app.models.board import Board
+from app.models.post import Comment, Post, Vote
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# 依外鍵順序
+TABLES = {"users": User, "boards": Board, "posts": Post, "comments": Comment, "votes": Vote}
+# 匯入前必須是空的 (boards 有啟動時建立的預設看板，改用 upsert)
+MUST_BE_EMPTY = ("users", "posts", "comments", "votes")
+
+
+class BulkImportError(Exception):
+    pass
+
+
+class BulkExportError(Exception):
+    pass
+
+
+def parse_tables(tables: Optional[str]) -> List[str]:
+    """逗號分隔的資料表名稱 → 依外鍵順序排列的清單；未指定時為全部"""
+    if not tables:
+        return list(TABLES)
+    requested = {name.strip() for name in tables.split(",") if name.strip()}
+    unknown = requested - set(TABLES)
+    if unknown:
+        raise ValueError(f"Unknown tables: {', '.join(sorted(unknown))}")
+    return [name for name in TABLES if name in requested]
+
+
+def _redact_user(row: dict) -> dict:
+    # 給分析 / staging 用：不帶出可以登入或聯絡本人的資料
+    return {**row, "email": f"user{row['id']}@example.invalid", "hashed_password": ""}
+
+
+def _archived_posts():
+    # 封存且未刪除的文章 (刪除的看不到，快照也可能已經清掉)
+    return select(Post.id, Post.created_at) \
+        .where(Post.archived_at.is_not(None), Post.deleted_at.is_(None)).order_by(Post.id)
+
+
+async def _load_snapshot(post_id: int, created_at: datetime) -> dict:
+    try:
+        return await snapshot_cache.fetch(snapshot_name(post_id, created_at))
+    except Exception as e:
+        logger.error("failed to load archived post %s for export: %s", post_id, e)
+        raise BulkExportError(f"Snapshot of archived post {post_id} is unavailable; export aborted") from e
+
+
+async def _unarchive_posts(records: List[dict]):
+    """一批 posts 中封存的文章從快照帶回內文，匯入後是一般的討論串"""
+    archived = [record for record in records if record["archived_at"] is not None and record["deleted_at"] is None]
+    snapshots = await asyncio.gather(*[_load_snapshot(record["id"], record["created_at"]) for record in archived])
+    for record, snapshot in zip(archived, snapshots):
+        record["content"] = snapshot["post"]["content"]
+        record["archived_at"] = None
+
+
+async def _archived_comments(session: AsyncSession) -> AsyncIterator[bytes]:
+    """封存討論串的留言 (在快照裡)，一篇一批"""
+    result = await session.stream(_archived_posts().execution_options(yield_per=settings.BULK_FETCH_SIZE))
+    async for post in result:
+        snapshot = await _load_snapshot(post.id, post.created_at)
+        chunk = bytearray()
+        for comment in snapshot["comments"]:
+            chunk += orjson.dumps({"table": "comments", "row": comment})
+            chunk += b"\n"
+        if chunk:
+            yield bytes(chunk)
+
+
+async def export_ndjson(tables: Iterable[str], redact: bool = False) -> AsyncIterator[bytes]:
+    """逐批產生 NDJSON (未壓縮)，每次 yield 一批 BULK_FETCH_SIZE 列；封存的討論串還原成一般的討論串"""
+    async with async_read_session() as session:
+        for name in tables:
+            table = TABLES[name].__table__
+            statement = select(table).order_by(table.c.id).execution_options(yield_per=settings.BULK_FETCH_SIZE)
+            result = await session.stream(statement)
+            async for partition in result.partitions():
+                records = [dict(row._mapping) for row in partition]
+                if redact and name == "users":
+                    records = [_redact_user(record) for record in records]
+                if name == "posts":
+                    await _unarchive_posts(records)
+                chunk = bytearray()
+                for record in records:
+                    chunk += orjson.dumps({"table": name, "row": record})
+                    chunk += b"\n"
+                yield bytes(chunk)
+            if name == "comments":
+                async for chunk in _archived_comments(session):
+                    yield chunk
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip 格式
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """解壓 (gzip 或未壓縮皆可) 並切成一行一行"""
+    decompressor = None
+    pending = b""
+    first = True
+    async for chunk in chunks:
+        if first and chunk:
+            first = False
+            if chunk[:2] == b"\x1f\x8b":
+                decompressor = zlib.decompressobj(31)
+        if decompressor is not None:
+            chunk = decompressor.decompress(chunk)
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+    if decompressor is not None:
+        pending += decompressor.flush()
+        if not decompressor.eof:
+            # 匯出中途中止 (例如快照讀不到) 的檔案沒有 gzip 結尾
+            raise BulkImportError("Import file is truncated")
+    if pending.strip():
+        yield pending
+
+
+class _TableWriter:
+    def __init__(self, name: str):
+        self.name = name
+        self.table = TABLES[name].__table__
+        self.columns = [column.name for column in self.table.columns]
+        self.datetime_columns = [column.name for column in self.table.columns if isinstance(column.type, DateTime)]
+
+    def convert(self, row: dict) -> dict:
+        record = {column: row.get(column) for column in self.columns}
+        for column in self.datetime_columns:
+            if record[column] is not None:
+                record[column] = datetime.fromisoformat(record[column])
+        return record
+
+    async def write(self, session: AsyncSession, rows: List[dict]):
+        if self.name == "boards":
+            # 啟動時已建立預設看板，同 id 的以匯入的內容為準
+            upsert = dialect_insert(session)(self.table)
+            await session.exec(upsert.on_conflict_do_update(
+                index_elements=["id"],
+                set_={column: upsert.excluded[column] for column in self.columns if column != "id"},
+            ), params=rows)
+        elif session.get_bind().dialect.name == "postgresql":
+            connection = await session.connection()
+            raw = await connection.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                self.table.name,
+                records=[tuple(row[column] for column in self.columns) for row in rows],
+                columns=self.columns,
+            )
+        else:
+            await session.exec(insert(self.table), params=rows)
+        await session.commit()
+
+
+async def _check_empty(session: AsyncSession):
+    for name in MUST_BE_EMPTY:
+        table = TABLES[name].__table__
+        if (await session.exec(select(table.c.id).limit(1))).first() is not None:
+            raise BulkImportError(f"Table {table.name} is not empty; import only into a fresh database")
+
+
+async def _reset_sequences(session: AsyncSession, names: Iterable[str]):
+    # COPY / 指定 id 的 INSERT 不會推進 PostgreSQL 的 sequence
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    for name in names:
+        table = TABLES[name].__table__.name
+        await session.exec(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT COALESCE(MAX(id), 0) + 1 FROM {table}), false)"
+        ))
+    await session.commit()
+
+
+async def import_ndjson(chunks: AsyncIterator[bytes]) -> Dict[str, int]:
+    """讀取 export_ndjson 的輸出 (可為 gzip)，分批寫入，回傳每個資料表匯入的列數"""
+    counts: Dict[str, int] = {}
+    writers: Dict[str, _TableWriter] = {}
+    async with async_session() as session:
+        await _check_empty(session)
+
+        writer: Optional[_TableWriter] = None
+        batch: List[dict] = []
+
+        async def flush():
+            if batch:
+                await writer.write(session, batch)
+                counts[writer.name] = counts.get(writer.name, 0) + len(batch)
+                batch.clear()
+
+        async for line in _lines(chunks):
+            item = orjson.loads(line)
+            name = item.get("table")
+            if name not in TABLES:
+                raise BulkImportError(f"Unknown table in import: {name!r}")
+            if writer is None or writer.name != name or len(batch) >= settings.BULK_BATCH_SIZE:
+                await flush()
+                if writer is None or writer.name != name:
+                    if name not in writers:
+                        writers[name] = _TableWriter(name)
+                        logger.info("importing %s", name)
+                    writer = writers[name]
+            batch.append(writer.convert(item["row"]))
+        await flush()
+
+        await _reset_sequences(session, counts)
+        # 衍生資料
+        await board_stats.rebuild(session)
+        await user_stats.rebuild(session)
+        await ranking.rebuild(session)
+        board_ids = (await session.exec(select(Board.id))).all()
+    await cache.bump(BOARDS_SCOPE, USERS_SCOPE, board_scope(None), *[board_scope(board_id) for board_id in board_ids])
+    return counts
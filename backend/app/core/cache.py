@@ -0,0 +1,260 @@
+# app/core/cache.py
+#
+# 列表回應的 read-through 快取
+#
+# - 鍵帶版本號：寫入時只要 bump() 對應範圍 (例如某個看板) 的版本，
+#   舊版本的鍵自然不會再被讀到，等 TTL 到期即可。
+# - 同一個鍵同時 miss 時只會有一個請求去查資料庫 (single-flight)，其餘等待結果。
+# - 版本號第一次使用時以目前的毫秒時間起算，重啟或 Redis 被清空後也不會重複用到舊的版本號，
+#   因此也能直接當 HTTP ETag (見 app/core/http_cache.py)。
+# - 版本號 CACHE_VERSION_TTL_SECONDS 沒有 bump 就過期 (行程內另有數量上限)，已刪除 / 封存的文章不會永遠
+#   佔著版本號；過期後重新以目前時間起算，一樣不會和舊的鍵撞號。
+# - 有 REDIS_URL 時使用 Redis，否則使用行程內 LRU (測試 / 單機)。
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.redis import redis_handler
+
+logger = logging.getLogger(__name__)
+
+USERS_SCOPE = "users"  # 使用者公開資料 (暱稱等) 異動，所有帶作者資訊的列表都受影響
+BOARDS_SCOPE = "boards"  # 看板列表 (含 board_stats 統計)
+
+
+def _initial_version() -> int:
+    return int(time.time() * 1000)
+
+
+class MemoryCacheBackend:
+    """行程內 LRU + TTL"""
+
+    def __init__(self, max_entries: int, max_versions: int, version_ttl: int):
+        self.max_entries = max_entries
+        self.max_versions = max_versions
+        self.version_ttl = version_ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()      # key -> (expires_at, value)
+        self._counters: "OrderedDict[str, tuple]" = OrderedDict()  # 版本號另外淘汰，不和快取內容互相擠掉
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._data.pop(key, None)
+
+    def _counter(self, key: str, bump: bool) -> int:
+        now = time.monotonic()
+        entry = self._counters.get(key)
+        if entry is None or entry[0] < now:
+            entry = (now + self.version_ttl, _initial_version())
+        if bump:
+            entry = (now + self.version_ttl, entry[1] + 1)
+        self._counters[key] = entry
+        self._counters.move_to_end(key)
+        while len(self._counters) > self.max_versions:
+            self._counters.popitem(last=False)
+        return entry[1]
+
+    async def incr(self, key: str) -> int:
+        return self._counter(key, bump=True)
+
+    async def get_counters(self, keys: List[str]) -> List[int]:
+        return [self._counter(key, bump=False) for key in keys]
+
+
+# 版本號不存在時先以 ARGV[1] (毫秒時間) 建立，ARGV[2] 秒沒有 bump 就過期
+_INCR_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2])
+local version = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return version
+"""
+# 只讀不 bump 時不延長期限：很久沒有寫入的範圍到期後重新起算，只會讓快取 / ETag 失效一次
+_COUNTERS_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    redis.call('SET', key, ARGV[1], 'NX', 'EX', ARGV[2])
+end
+return redis.call('MGET', unpack(KEYS))
+"""
+
+
+class RedisCacheBackend:
+    """多個 worker 共用的 Redis 快取"""
+
+    def __init__(self, client, version_ttl: int):
+        self.client = client
+        self.version_ttl = version_ttl
+        self._incr = client.register_script(_INCR_SCRIPT)
+        self._counters = client.register_script(_COUNTERS_SCRIPT)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        await self.client.set(key, value, ex=ttl)
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*keys)
+
+    async def incr(self, key: str) -> int:
+        return await self._incr(keys=[key], args=[_initial_version(), self.version_ttl])
+
+    async def get_counters(self, keys: List[str]) -> List[int]:
+        return [int(value) for value in await self._counters(keys=keys, args=[_initial_version(), self.version_ttl])]
+
+
+class _Flight:
+    """一次進行中的載入，讓同鍵的其他請求等待同一份結果"""
+
+    def __init__(self):
+        self.done = asyncio.Event()
+        self.ok = False
+        self.value: Any = None
+
+
+class Cache:
+    def __init__(self, backend, ttl: int, prefix: str = "acg:cache:"):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self._inflight: Dict[str, _Flight] = {}
+
+    # --- 版本號 ---
+    async def version(self, scope: str) -> int:
+        try:
+            return (await self.backend.get_counters([f"{self.prefix}ver:{scope}"]))[0]
+        except Exception as e:
+            logger.warning("cache version read failed: %s", e)
+            return -1
+
+    async def stamp(self, *scopes: str) -> Optional[str]:
+        """
+        多個範圍的版本號組成的字串 (一次往返)，任一範圍異動時就會改變
+
+        可同時當快取鍵的一部分與 ETag；讀取失敗時回傳 None (呼叫端應略過快取)。
+        """
+        try:
+            versions = await self.backend.get_counters([f"{self.prefix}ver:{scope}" for scope in scopes])
+        except Exception as e:
+            logger.warning("cache version read failed: %s", e)
+            return None
+        return ".".join(str(version) for version in versions)
+
+    async def bump(self, *scopes: str):
+        """讓 scope 底下的所有快取鍵失效"""
+        for scope in scopes:
+            try:
+                await self.backend.incr(f"{self.prefix}ver:{scope}")
+            except Exception as e:
+                logger.warning("cache bump failed for %s: %s", scope, e)
+
+    # --- 讀寫 ---
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = await self.backend.get(self.prefix + key)
+        except Exception as e:
+            logger.warning("cache read failed: %s", e)
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        try:
+            await self.backend.set(self.prefix + key, json.dumps(value).encode(), ttl or self.ttl)
+        except Exception as e:
+            logger.warning("cache write failed: %s", e)
+
+    async def delete(self, *keys: str):
+        try:
+            await self.backend.delete(*(self.prefix + key for key in keys))
+        except Exception as e:
+            logger.warning("cache delete failed: %s", e)
+
+    async def get_or_load(
+        self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[int] = None, refresh: bool = False
+    ) -> Any:
+        """
+        讀取快取，miss 時呼叫 loader() 並寫回
+
+        loader 的回傳值必須可以 JSON 序列化。Redis 失效時直接退回 loader()，不影響請求。
+        refresh=True 時不讀既有的值，一律呼叫 loader() 並覆寫 (讀主庫的 recent writer 用)。
+        """
+        if refresh:
+            value = await loader()
+            await self.set(key, value, ttl)
+            return value
+
+        value = await self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        flight = self._inflight.get(key)
+        if flight is not None:
+            await flight.done.wait()
+            if flight.ok:
+                self.hits += 1
+                return flight.value
+            return await loader()
+
+        self.misses += 1
+        flight = self._inflight[key] = _Flight()
+        try:
+            value = await loader()
+            flight.value, flight.ok = value, True
+            await self.set(key, value, ttl)
+            return value
+        finally:
+            del self._inflight[key]
+            flight.done.set()
+
+
+def _create_cache() -> Cache:
+    client = redis_handler.get_client()
+    if client is not None:
+        backend = RedisCacheBackend(client, settings.CACHE_VERSION_TTL_SECONDS)
+    else:
+        backend = MemoryCacheBackend(
+            settings.CACHE_MAX_ENTRIES, settings.CACHE_MAX_VERSIONS, settings.CACHE_VERSION_TTL_SECONDS
+        )
+    return Cache(backend, ttl=settings.CACHE_TTL_SECONDS)
+
+
+cache = _create_cache()
+
+
+def board_scope(board_id: Optional[int]) -> str:
+    """文章列表的快取範圍：單一看板，或不分看板的 board:all"""
+    return f"board:{board_id}" if board_id else "board:all"
+
+
+def post_scope(post_id: int) -> str:
+    """單篇文章的留言"""
+    return f"post:{post_id}"
+
+
+def user_scope(user_id: int) -> str:
+    """個人頁的最近動態 (這個人的文章與留言)"""
+    return f"user:{user_id}"
@@ -0,0 +1,58 @@
+# app/core/comments.py
+#
+# 串狀留言的 materialized path
+#
+# 每則留言的 path 是「根留言 id / ... / 自己的 id」，id 補零到固定寬度，
+# 因此字串排序就是深度優先的討論串順序 (同層依發表先後)：
+#   0000000012
+#   0000000012/0000000015
+#   0000000012/0000000015/0000000020
+#   0000000013
+# 某則留言的所有子孫落在 (path + "/", path + "0") 這個區間 ("0" 在 ASCII 中緊接在 "/" 之後)。
+
+from typing import Tuple
+
+from sqlalchemy import update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.post import Comment
+
+PATH_WIDTH = 10
+SEPARATOR = "/"
+
+
+def child_path(parent_path: str, comment_id: int) -> str:
+    segment = str(comment_id).zfill(PATH_WIDTH)
+    return f"{parent_path}{SEPARATOR}{segment}" if parent_path else segment
+
+
+def subtree_bounds(path: str) -> Tuple[str, str]:
+    """回傳 (下界, 上界)，子孫留言滿足 下界 < path < 上界"""
+    return path + SEPARATOR, path + chr(ord(SEPARATOR) + 1)
+
+
+def ancestor_id(path: str, depth: int) -> int:
+    """path 上第 depth 層 (根為 0) 的留言 id"""
+    return int(path.split(SEPARATOR)[depth])
+
+
+async def backfill_paths(session: AsyncSession, batch_size: int = 5000) -> int:
+    """
+    替還沒有 path 的舊留言補上 path (依 id 分批，每批一個交易)，回傳處理筆數
+
+    舊留言都沒有 parent_id，一律視為根留言。
+    """
+    total = 0
+    while True:
+        statement = select(Comment.id).where(Comment.path == "").order_by(Comment.id).limit(batch_size)
+        comment_ids = (await session.exec(statement)).all()
+        if not comment_ids:
+            return total
+        # 依主鍵的批次 UPDATE (executemany)
+        await session.exec(
+            update(Comment),
+            params=[{"id": comment_id, "path": child_path("", comment_id), "depth": 0} for comment_id in comment_ids],
+        )
+        await session.commit()
+        total += len(comment_ids)
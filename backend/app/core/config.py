@@ -1,9 +1,25 @@
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     PROJECT_NAME: str
     API_V1_STR: str
     DATABASE_URL: str
+    DATABASE_REPLICA_URL: Optional[str] = None  # 唯讀副本，設定後列表類端點改讀副本
+
+    # 資料庫連線池
+    DB_ECHO: bool = False                      # 印出每一條 SQL (只在本機除錯時打開)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800        # 早於資料庫 / 防火牆的閒置斷線時間
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100         # asyncpg prepared statement 快取，經過 pgbouncer 時設為 0
+    READ_YOUR_WRITES_SECONDS: int = 5          # 使用者寫入後多久內的讀取仍走主庫 (需大於副本延遲)
+
+    # 監控 (/metrics)
+    SLOW_QUERY_MS: int = 200                   # 超過此時間的 SQL 記 warning log
+    N_PLUS_ONE_THRESHOLD: int = 10             # 同一條 SQL 在一個請求內重複幾次視為疑似 N+1
     
     class Config:
         env_file = ".env"
@@ -12,9 +28,108 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_ID: str
     GOOGLE_CLIENT_SECRET: str
     GOOGLE_REDIRECT_URI: str
+    GOOGLE_TOKEN_URL: str = "https://oauth2.googleapis.com/token"                       # 測試時可指向本機的假 OAuth 伺服器
+    GOOGLE_USERINFO_URL: str = "https://www.googleapis.com/oauth2/v1/userinfo?alt=json"
     
     SECRET_KEY: str = "A_VERY_SECRET_KEY_AND_CHANGE_ME" # 正式環境一定要用強密鑰
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24
+
+    # Redis (未設定時改用行程內的替代實作，適合測試與單機)
+    REDIS_URL: Optional[str] = None
+
+    # 列表快取
+    CACHE_TTL_SECONDS: int = 30
+    CACHE_MAX_ENTRIES: int = 2048     # 行程內 LRU 的上限
+    CACHE_VERSION_TTL_SECONDS: int = 7 * 86400  # 版本號多久沒有 bump 就過期 (要遠大於 CACHE_TTL_SECONDS)
+    CACHE_MAX_VERSIONS: int = 100000  # 行程內保留的版本號上限
+    CACHE_POSTS_MAX_SKIP: int = 100   # 只快取前幾頁 (skip 小於此值)
+    HTTP_CACHE_MAX_AGE: int = 0         # 列表回應在瀏覽器的有效秒數 (0 = 每次以 ETag 重新確認)
+    HTTP_CACHE_SHARED_MAX_AGE: int = 5  # nginx 等共用快取可直接重用的秒數 (s-maxage)
+    POST_EXCERPT_LENGTH: int = 200      # 文章列表摘要 (excerpt) 的字數上限
+
+    # 登入使用者快取 (get_current_user)
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_TOKENS: int = 10000  # 行程內保留的已解碼 token 上限
+
+    # hot / top 排行
+    RANKING_FEED_SIZE: int = 1000              # 每個排行保留的文章數
+    RANKING_DECAY_INTERVAL_SECONDS: int = 300  # 多久整理一次過期的排行
+
+    # 圖片上傳
+    UPLOAD_MAX_BYTES: int = 10 * 1024 * 1024
+    UPLOAD_MAX_CONCURRENCY: int = 8            # 每個 worker 同時進行的上傳數
+    UPLOAD_PRESIGN_EXPIRE_SECONDS: int = 600   # 直傳 MinIO 的簽章有效時間
+
+    # 縮圖 (衍生圖) 產生
+    IMAGE_VARIANT_WIDTHS: List[int] = [320, 640, 1280]
+    IMAGE_VARIANT_FORMATS: List[str] = ["webp", "avif"]
+    IMAGE_WORKERS: int = 2                     # 縮圖 process pool 的行程數
+
+    # 資料大量匯出 / 匯入 (/admin/export、/admin/import 與 CLI)
+    BULK_FETCH_SIZE: int = 2000                # 匯出時 server-side cursor 每次取回的列數
+    BULK_BATCH_SIZE: int = 5000                # 匯入時每個交易寫入的列數
+
+    # 舊討論串封存 (內文與留言移到 MinIO 的快照，資料庫只留文章列)
+    ARCHIVE_BUCKET: str = "acg-archive"        # 不公開的 bucket
+    ARCHIVE_AFTER_DAYS: int = 365              # 發文與最後一則留言都超過幾天的討論串才封存
+    ARCHIVE_BATCH_SIZE: int = 100              # 每次查詢幾篇候選
+    ARCHIVE_PAUSE_MS: int = 100                # 每封存一篇後暫停，讓出資料庫給線上請求
+    ARCHIVE_CACHE_SIZE: int = 256              # 行程內 LRU 保留的快照數
+
+    # 看板統計 (board_stats)
+    BOARD_STATS_REFRESH_SECONDS: int = 300     # 多久重算一次 24 小時內的文章數
+
+    # 個人頁 (user_stats 與最近動態)
+    USER_ACTIVITY_LIMIT: int = 20              # 最近動態的筆數 (文章與留言合併)
+    USER_STATS_BATCH_SIZE: int = 5000          # 重算統計時每個交易處理的使用者數
+
+    # 串狀留言
+    COMMENT_MAX_DEPTH: int = 8                 # 超過此深度的回覆掛在最深一層的祖先底下
+    COMMENT_PAGE_MAX: int = 200                # 分頁模式每頁最多幾則
+
+    # 投票 write-behind 緩衝 (預設關閉，每次投票直接寫資料庫)
+    VOTE_BUFFER_ENABLED: bool = False
+    VOTE_BUFFER_FLUSH_MS: int = 500            # 多久寫回一次
+    VOTE_BUFFER_BATCH_SIZE: int = 1000         # 每個交易最多寫幾票
+    VOTE_BUFFER_STATE_TTL_SECONDS: int = 86400 # Redis 中每人每篇的投票狀態保留多久
+    VOTE_BUFFER_MAX_STATES: int = 100000       # 行程內模式保留的投票狀態上限
+
+    # 寫入端點限流 (token bucket，每個使用者 / 未登入時每個 IP 各一桶)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: Dict[str, str] = {
+        "create_post": "5/minute",
+        "create_comment": "20/minute",
+        "vote_post": "120/minute",
+        "upload_image": "20/minute",           # /upload/image 與 /upload/presign 共用
+    }
+    RATE_LIMIT_TRUST_PROXY: bool = False       # 以反向代理 (nginx) 設定的 X-Real-IP 作為來源 IP
+    RATE_LIMIT_TRUSTED_PROXIES: List[str] = ["127.0.0.1/32", "::1/128"]  # 只有來自這些位址 (CIDR) 的 X-Real-IP 才採用
+    RATE_LIMIT_MAX_KEYS: int = 100000          # 行程內模式保留的桶數上限
+
+    # 對外 HTTP 呼叫 (Google OAuth 等) 共用的連線池
+    HTTP_CLIENT_HTTP2: bool = True             # 需要 h2 套件，沒有安裝時退回 HTTP/1.1
+    HTTP_CLIENT_MAX_CONNECTIONS: int = 100
+    HTTP_CLIENT_MAX_KEEPALIVE: int = 100       # 閒置時保留的 keep-alive 連線數
+    HTTP_CLIENT_CONNECT_TIMEOUT: float = 3.0
+    HTTP_CLIENT_TIMEOUT: float = 10.0          # 讀取 / 寫入 / 等待連線池的逾時 (秒)
+    HTTP_CLIENT_RETRIES: int = 2               # 失敗後最多重試幾次 (只重試安全的情況)
+    HTTP_CLIENT_RETRY_BACKOFF: float = 0.2     # 第 n 次重試前等待 backoff * 2^(n-1) 秒
+    HTTP_CIRCUIT_FAILURE_THRESHOLD: int = 5    # 同一個主機連續失敗幾次後斷路
+    HTTP_CIRCUIT_RESET_SECONDS: int = 30       # 斷路多久後放行一個試探請求
+
+    # 背景工作佇列 (有 REDIS_URL 時由 `python -m app.worker` 執行，否則在 API 行程內執行)
+    JOB_WORKER_CONCURRENCY: int = 4            # 每個 worker 行程同時執行的工作數
+    JOB_MAX_ATTEMPTS: int = 5                  # 失敗幾次後移到 dead letter
+    JOB_RETRY_BACKOFF_SECONDS: float = 2.0     # 第 n 次失敗後等待 backoff * 2^(n-1) 秒再重試
+    JOB_RETRY_MAX_DELAY_SECONDS: int = 600
+    JOB_TIMEOUT_SECONDS: int = 300             # 單一工作的執行時間上限
+    JOB_VISIBILITY_TIMEOUT_SECONDS: int = 600  # 取出後多久沒有完成視為 worker 已經掛掉，交給其他 worker
+    JOB_METRICS_INTERVAL_SECONDS: int = 15     # 多久記錄一次佇列深度 / 認領逾時的工作
+    JOB_WORKER_METRICS_PORT: int = 9100        # worker 行程的 /metrics 埠
+
+    # 已刪除文章的背景清除
+    PURGE_BATCH_SIZE: int = 1000               # 每個交易最多刪幾列
+    PURGE_BATCH_PAUSE_MS: int = 50             # 批與批之間暫停，讓出資料庫給線上請求
     
 settings = Settings()
\ No newline at end of file
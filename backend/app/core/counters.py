@@ -0,0 +1,127 @@
+# app/core/counters.py
+#
+# 文章反正規化計數 (score / upvotes / downvotes / comment_count) 的維護。
+# 所有函式都只在傳入的 session 上執行語句，由呼叫端決定何時 commit，
+# 讓計數與投票 / 留言寫在同一個交易裡。
+
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, func, or_, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import dialect_insert
+from app.models.post import Comment, Post, Vote
+
+# vote_post / create_comment 需要的計數欄位 (也足以重算排行分數)
+POST_COUNTER_COLUMNS = (
+    Post.id, Post.board_id, Post.owner_id, Post.created_at,
+    Post.score, Post.upvotes, Post.downvotes, Post.comment_count,
+)
+
+
+async def write_vote(session: AsyncSession, post_id: int, user_id: int, dir: int) -> Tuple[int, int]:
+    """
+    寫入一次投票點擊，回傳 (舊狀態, 新狀態)，狀態為 1 / -1 / 0 (未投票)
+
+    - 同方向再按一次 = 收回 (DELETE ... WHERE dir = :dir)
+    - 尚未投票 = INSERT ... ON CONFLICT DO NOTHING
+    - 反方向 = UPDATE ... WHERE dir <> :dir
+    每一步都是單一原子語句，搭配 (user_id, post_id) 唯一約束，併發點擊不會產生重複票。
+    """
+    removed = await session.exec(
+        delete(Vote)
+        .where(Vote.user_id == user_id, Vote.post_id == post_id, Vote.dir == dir)
+        .returning(Vote.id)
+    )
+    if removed.first():
+        return dir, 0
+
+    insert = dialect_insert(session)
+    inserted = await session.exec(
+        insert(Vote)
+        .values(user_id=user_id, post_id=post_id, dir=dir)
+        .on_conflict_do_nothing(index_elements=["user_id", "post_id"])
+        .returning(Vote.id)
+    )
+    if inserted.first():
+        return 0, dir
+
+    flipped = await session.exec(
+        update(Vote)
+        .where(Vote.user_id == user_id, Vote.post_id == post_id, Vote.dir != dir)
+        .values(dir=dir)
+        .returning(Vote.id)
+    )
+    if flipped.first():
+        return -dir, dir
+
+    # 另一個併發請求剛好寫入了相同結果
+    return dir, dir
+
+
+async def apply_vote_delta(session: AsyncSession, post_id: int, old: int, new: int):
+    """依投票狀態變化更新文章計數，回傳更新後的計數列；文章不存在時回傳 None"""
+    return await add_vote_counts(session, post_id, (new == 1) - (old == 1), (new == -1) - (old == -1))
+
+
+async def add_vote_counts(session: AsyncSession, post_id: int, up: int, down: int):
+    """讚 +up、倒讚 +down (可為負)，回傳更新後的計數列；文章不存在時回傳 None"""
+    result = await session.exec(
+        update(Post)
+        .where(Post.id == post_id, Post.deleted_at.is_(None), Post.archived_at.is_(None))
+        .values(
+            upvotes=Post.upvotes + up,
+            downvotes=Post.downvotes + down,
+            score=Post.score + up - down,
+        )
+        .returning(*POST_COUNTER_COLUMNS)
+    )
+    return result.first()
+
+
+async def increment_comment_count(session: AsyncSession, post_id: int, delta: int = 1):
+    """留言數 +delta，回傳更新後的計數列；文章不存在時回傳 None"""
+    result = await session.exec(
+        update(Post)
+        .where(Post.id == post_id, Post.deleted_at.is_(None), Post.archived_at.is_(None))
+        .values(comment_count=Post.comment_count + delta)
+        .returning(*POST_COUNTER_COLUMNS)
+    )
+    return result.first()
+
+
+async def reconcile_post_counters(session: AsyncSession, batch_size: int = 5000) -> int:
+    """
+    從 votes / comments 重新計算所有文章的計數 (依 id 區間分批，每批一個交易)
+
+    只會改寫數值有偏差的列，回傳被修正的文章數；已封存的文章不重算。
+    """
+    max_id: Optional[int] = (await session.exec(select(func.max(Post.id)))).first()
+    if not max_id:
+        return 0
+
+    upvotes = select(func.count()).where(Vote.post_id == Post.id, Vote.dir == 1).scalar_subquery()
+    downvotes = select(func.count()).where(Vote.post_id == Post.id, Vote.dir == -1).scalar_subquery()
+    comments = select(func.count()).where(Comment.post_id == Post.id).scalar_subquery()
+
+    fixed = 0
+    for low in range(0, max_id + 1, batch_size):
+        statement = (
+            update(Post)
+            .where(Post.id >= low, Post.id < low + batch_size)
+            # 已封存的文章留言 / 投票已經搬走，保留封存時的計數
+            .where(Post.archived_at.is_(None))
+            .where(or_(
+                Post.upvotes != upvotes,
+                Post.downvotes != downvotes,
+                Post.score != upvotes - downvotes,
+                Post.comment_count != comments,
+            ))
+            .values(upvotes=upvotes, downvotes=downvotes, score=upvotes - downvotes, comment_count=comments)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.exec(statement)
+        await session.commit()
+        fixed += result.rowcount
+    return fixed
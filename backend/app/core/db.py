@@ -3,15 +3,52 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
-# 建立非同步引擎
-engine = create_async_engine(settings.DATABASE_URL, echo=True, future=True)
+def _engine_options(url: str) -> dict:
+    """連線池與驅動參數 (SQLite 只用於測試，維持預設)"""
+    options = {"echo": settings.DB_ECHO, "future": True}
+    if url.startswith("sqlite"):
+        return options
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if "+asyncpg" in url:
+        # asyncpg 本身與 SQLAlchemy 的 prepared statement 快取；經過 pgbouncer (transaction 模式) 時設為 0
+        options["connect_args"] = {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+# 建立非同步引擎 (主庫，所有寫入都在這裡)
+engine = create_async_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
+
+# 唯讀副本 (沒有設定 DATABASE_REPLICA_URL 時就是主庫)
+read_engine = (
+    create_async_engine(settings.DATABASE_REPLICA_URL, **_engine_options(settings.DATABASE_REPLICA_URL))
+    if settings.DATABASE_REPLICA_URL else engine
+)
 
 # 建立 Session 工廠
 async_session = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
+async_read_session = sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False
+)
 
 # Dependency (依賴注入): 給每一個 Request 一個獨立的 DB Session
 async def get_session() -> AsyncSession:
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+# 依資料庫方言取得支援 ON CONFLICT 的 insert() (PostgreSQL / SQLite)
+def dialect_insert(session: AsyncSession):
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
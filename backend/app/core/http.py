@@ -0,0 +1,166 @@
+# app/core/http.py
+#
+# 對外 HTTP 呼叫共用的 client (Google OAuth 等)
+#
+# - 整個行程共用一個 httpx.AsyncClient (lifespan 建立 / 關閉)：keep-alive 連線池，
+#   有安裝 h2 時對支援的主機使用 HTTP/2 (多個請求共用一條連線)
+# - 明確的逾時：連線 HTTP_CLIENT_CONNECT_TIMEOUT，讀取 / 寫入 / 等待連線池 HTTP_CLIENT_TIMEOUT
+# - 有上限的重試 (指數退避)：請求還沒送出的連線錯誤一律可重試；
+#   讀取逾時與 502/503/504 只有冪等方法 (GET 等) 才重試，避免重複送出 OAuth code 之類的一次性請求
+# - 每個主機一個斷路器：連續失敗 HTTP_CIRCUIT_FAILURE_THRESHOLD 次後直接拒絕 (CircuitOpenError)，
+#   HTTP_CIRCUIT_RESET_SECONDS 後放行一個試探請求，成功才恢復
+#
+# CircuitOpenError 是 httpx.TransportError 的子類別，呼叫端 except httpx.HTTPError 即可一併處理。
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import observe_outbound
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {502, 503, 504}
+# 這些錯誤發生時請求還沒送到對方，任何方法都可以安全重試
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class CircuitOpenError(httpx.TransportError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open" or self.trial_in_flight:
+            return False
+        # 半開：只放行一個試探請求
+        self.trial_in_flight = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class HttpClient:
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def start(self):
+        if self._client is not None:
+            return
+        http2 = settings.HTTP_CLIENT_HTTP2 and HTTP2_AVAILABLE
+        if settings.HTTP_CLIENT_HTTP2 and not HTTP2_AVAILABLE:
+            logger.warning("h2 is not installed, outbound HTTP falls back to HTTP/1.1")
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(settings.HTTP_CLIENT_TIMEOUT, connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE,
+            ),
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(
+                settings.HTTP_CIRCUIT_FAILURE_THRESHOLD, settings.HTTP_CIRCUIT_RESET_SECONDS
+            )
+        return self.breakers[host]
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        # lifespan 之外 (CLI、腳本) 第一次使用時才建立
+        self.start()
+        host = httpx.URL(url).host
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            observe_outbound(host, "circuit_open", 0.0)
+            raise CircuitOpenError(f"circuit open for {host}")
+
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        start = time.perf_counter()
+        attempt = 0
+        settled = False
+        try:
+            while True:
+                try:
+                    response = await self._client.request(method, url, **kwargs)
+                except httpx.TransportError as e:
+                    if attempt < settings.HTTP_CLIENT_RETRIES and (idempotent or isinstance(e, NOT_SENT_ERRORS)):
+                        attempt += 1
+                        await asyncio.sleep(settings.HTTP_CLIENT_RETRY_BACKOFF * 2 ** (attempt - 1))
+                        continue
+                    breaker.record_failure()
+                    settled = True
+                    observe_outbound(host, "error", time.perf_counter() - start)
+                    logger.warning("%s %s failed after %d attempt(s): %r", method, host, attempt + 1, e)
+                    raise
+
+                if response.status_code in RETRY_STATUSES and idempotent and attempt < settings.HTTP_CLIENT_RETRIES:
+                    attempt += 1
+                    await asyncio.sleep(settings.HTTP_CLIENT_RETRY_BACKOFF * 2 ** (attempt - 1))
+                    continue
+
+                # 4xx 是請求本身的問題 (例如過期的 OAuth code)，不代表對方故障
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                settled = True
+                observe_outbound(host, f"{response.status_code // 100}xx", time.perf_counter() - start)
+                return response
+        finally:
+            if not settled:
+                # 請求被取消：釋放半開狀態的試探名額，不計成功或失敗
+                breaker.trial_in_flight = False
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+
+http_client = HttpClient()
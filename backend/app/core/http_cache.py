@@ -0,0 +1,44 @@
+# app/core/http_cache.py
+#
+# 列表端點的 HTTP 條件式快取
+#
+# - ETag 直接取自 cache.stamp() 的版本號 (只讀計數器，不查資料表)，
+#   客戶端帶 If-None-Match 且版本沒變時，在執行主查詢之前就回 304
+# - Cache-Control：瀏覽器每次重新確認 (max-age=0)，nginx 等共用快取可直接重用 s-maxage 秒
+# - 版本號讀不到 (Redis 故障) 時不給 ETag，並要求不要快取
+
+from typing import Dict, Optional
+
+from fastapi import Request
+from starlette.responses import Response
+
+from app.core.config import settings
+
+
+def make_etag(stamp: Optional[str]) -> Optional[str]:
+    # 弱 ETag：內容相同即可，不保證位元組完全一致 (例如壓縮與否)
+    return f'W/"{stamp}"' if stamp is not None else None
+
+
+def cache_headers(etag: Optional[str]) -> Dict[str, str]:
+    if etag is None:
+        return {"Cache-Control": "no-cache"}
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, s-maxage={settings.HTTP_CACHE_SHARED_MAX_AGE}",
+    }
+
+
+def is_not_modified(request: Request, etag: Optional[str]) -> bool:
+    """If-None-Match 是否含有目前的 ETag (弱比較，忽略 W/ 前綴)"""
+    header = request.headers.get("if-none-match")
+    if etag is None or not header:
+        return False
+    if header.strip() == "*":
+        return True
+    current = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == current for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
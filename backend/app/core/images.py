@@ -0,0 +1,98 @@
+# app/core/images.py
+#
+# 上傳後的縮圖流程：下載原圖 → 在 process pool 產生 WebP / AVIF 縮圖 → 上傳回同一個 bucket
+# → 把產生了哪些版本記在 uploaded_images.variants。
+# 解碼與編碼都在子行程執行，不會佔用 API 的 event loop 或 threadpool。
+# 上傳端點排入 "image.variants" 背景工作 (app/core/jobs.py)，失敗時由佇列重試。
+
+import asyncio
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
+
+from sqlmodel import select
+
+from app.core.config import settings
+from app.core.db import async_session
+from app.core.jobs import job_queue
+from app.core.minio import minio_handler
+from app.core.thumbnails import render_variants
+from app.models.upload import UploadedImage
+
+MIME_TYPES = {"webp": "image/webp", "avif": "image/avif"}
+
+
+def variant_name(object_name: str, width: int, fmt: str) -> str:
+    """abc.png 的 640 寬 WebP 版本 → abc_w640.webp"""
+    stem = object_name.rsplit(".", 1)[0]
+    return f"{stem}_w{width}.{fmt}"
+
+
+def pick_variant(object_name: str, variants: Optional[Sequence[str]], width: int, formats: Sequence[str]) -> str:
+    """
+    選出最適合的版本：依 formats 的偏好順序，取寬度 >= width 中最小的縮圖；
+    都不夠寬 (或還沒有縮圖) 時回傳原圖。
+    """
+    available = {}
+    for entry in variants or []:
+        variant_width, fmt = entry.split(".", 1)
+        available.setdefault(fmt, []).append(int(variant_width))
+    for fmt in formats:
+        wide_enough = [w for w in available.get(fmt, []) if w >= width]
+        if wide_enough:
+            return variant_name(object_name, min(wide_enough), fmt)
+    return object_name
+
+
+class ImagePipeline:
+    def __init__(self, widths: Sequence[int], formats: Sequence[str], workers: int):
+        self.widths = list(widths)
+        self.formats = list(formats)
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn：不要把 event loop / 連線池等狀態 fork 進子行程
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def process(self, object_name: str) -> List[str]:
+        """產生並上傳一張圖的所有縮圖 (重複執行會覆蓋同名的檔案)；失敗時拋出例外"""
+        data = await minio_handler.get_object_bytes_async(object_name)
+        loop = asyncio.get_running_loop()
+        rendered = await loop.run_in_executor(
+            self._get_pool(), render_variants, data, self.widths, self.formats
+        )
+        variants = []
+        for width, fmt, content in rendered:
+            await minio_handler.upload_file_async(
+                io.BytesIO(content), variant_name(object_name, width, fmt), MIME_TYPES[fmt],
+                length=len(content), kind="variant",
+            )
+            variants.append(f"{width}.{fmt}")
+
+        async with async_session() as session:
+            statement = select(UploadedImage).where(UploadedImage.object_name == object_name)
+            image = (await session.exec(statement)).first()
+            if image is not None:
+                image.variants = variants
+                session.add(image)
+                await session.commit()
+        return variants
+
+    async def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+image_pipeline = ImagePipeline(settings.IMAGE_VARIANT_WIDTHS, settings.IMAGE_VARIANT_FORMATS, settings.IMAGE_WORKERS)
+
+
+@job_queue.handler("image.variants")
+async def generate_variants(object_name: str):
+    await image_pipeline.process(object_name)
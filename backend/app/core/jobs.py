@@ -0,0 +1,316 @@
+# app/core/jobs.py
+#
+# 背景工作佇列：把慢的、可以重試的副作用 (縮圖、清理、重算統計...) 移出請求路徑
+#
+#   @job_queue.handler("image.variants")
+#   async def generate_variants(object_name: str): ...
+#
+#   await job_queue.enqueue("image.variants", {"object_name": name})   # 任何 router 都可以呼叫
+#
+# - 有 REDIS_URL 時使用 Redis Stream + consumer group：worker 取出的工作在 XACK 之前都留在 pending，
+#   worker 當掉時超過 JOB_VISIBILITY_TIMEOUT_SECONDS 會被其他 worker 認領並計為一次失敗
+# - 失敗的工作以指數退避延後重試 (sorted set，到期時由 Lua 原子地搬回 stream)，
+#   超過 JOB_MAX_ATTEMPTS 次移到 dead letter stream (acg:jobs:dead) 留待人工處理
+# - 沒有 REDIS_URL 時使用行程內的佇列，由 API 行程自己的 worker 執行 (測試 / 單機；重啟會遺失未完成的工作)
+# - 工作處理由 `python -m app.worker` (docker-compose 的 worker 服務) 執行，
+#   吞吐量、等待時間與佇列深度輸出為 Prometheus 指標，用來決定 worker 數量
+#
+# handler 以關鍵字參數接收 payload，必須可以重複執行 (at-least-once)。
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import JOB_QUEUE_DEPTH, observe_job, observe_job_enqueued
+from app.core.redis import redis_handler
+
+logger = logging.getLogger(__name__)
+
+Job = Dict  # {"id", "name", "payload", "attempts", "enqueued_at"}
+Handler = Callable[..., Awaitable[None]]
+
+
+class MemoryJobBackend:
+    """行程內的佇列 (同一個行程內的 JobWorker 執行)"""
+
+    def __init__(self):
+        self.ready: Deque[Job] = deque()
+        self.delayed: List[Tuple[float, int, Job]] = []  # (run_at, 序號, job) 的 heap
+        self.running: Dict[str, Job] = {}
+        self.dead: Deque[Job] = deque(maxlen=1000)
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+
+    def _promote(self):
+        now = time.time()
+        while self.delayed and self.delayed[0][0] <= now:
+            self.ready.append(heapq.heappop(self.delayed)[2])
+
+    async def push(self, job: Job, run_at: Optional[float] = None):
+        if run_at is not None and run_at > time.time():
+            heapq.heappush(self.delayed, (run_at, next(self._seq), job))
+        else:
+            self.ready.append(job)
+        self._wakeup.set()
+
+    async def fetch(self, consumer: str, count: int, block_ms: int) -> List[Tuple[str, Job]]:
+        self._promote()
+        if not self.ready:
+            self._wakeup.clear()
+            timeout = block_ms / 1000
+            if self.delayed:
+                timeout = min(timeout, max(0.0, self.delayed[0][0] - time.time()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._promote()
+        batch = []
+        while self.ready and len(batch) < count:
+            job = self.ready.popleft()
+            self.running[job["id"]] = job
+            batch.append((job["id"], job))
+        return batch
+
+    async def ack(self, receipt: str):
+        self.running.pop(receipt, None)
+
+    async def retry(self, receipt: str, job: Job, run_at: float):
+        self.running.pop(receipt, None)
+        await self.push(job, run_at)
+
+    async def bury(self, receipt: str, job: Job):
+        self.running.pop(receipt, None)
+        self.dead.append(job)
+
+    async def reclaim(self, consumer: str, idle_ms: int) -> List[Tuple[str, Job]]:
+        # 同一個行程內執行，工作不會落在已經掛掉的 worker 上
+        return []
+
+    async def depth(self) -> Dict[str, int]:
+        return {"ready": len(self.ready), "delayed": len(self.delayed), "running": len(self.running), "dead": len(self.dead)}
+
+
+# KEYS: delayed zset, stream；ARGV: 現在時間。到期的工作搬回 stream (多個 worker 同時執行也只會搬一次)
+_PROMOTE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, job in ipairs(due) do
+    redis.call('XADD', KEYS[2], '*', 'job', job)
+    redis.call('ZREM', KEYS[1], job)
+end
+return #due
+"""
+
+
+class RedisJobBackend:
+    STREAM = "acg:jobs:stream"
+    DELAYED = "acg:jobs:delayed"
+    DEAD = "acg:jobs:dead"
+    GROUP = "workers"
+
+    def __init__(self, client):
+        self.client = client
+        self._promote = client.register_script(_PROMOTE_SCRIPT)
+        self._group_ready = False
+
+    async def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            await self.client.xgroup_create(self.STREAM, self.GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def push(self, job: Job, run_at: Optional[float] = None):
+        data = json.dumps(job)
+        if run_at is not None and run_at > time.time():
+            await self.client.zadd(self.DELAYED, {data: run_at})
+        else:
+            await self.client.xadd(self.STREAM, {"job": data})
+
+    @staticmethod
+    def _decode(entries) -> List[Tuple[str, Job]]:
+        return [(message_id, json.loads(fields[b"job"])) for message_id, fields in entries if fields]
+
+    async def fetch(self, consumer: str, count: int, block_ms: int) -> List[Tuple[str, Job]]:
+        await self._ensure_group()
+        await self._promote(keys=[self.DELAYED, self.STREAM], args=[time.time()])
+        try:
+            response = await self.client.xreadgroup(
+                self.GROUP, consumer, {self.STREAM: ">"}, count=count, block=block_ms
+            )
+        except Exception as e:
+            if "NOGROUP" in str(e):
+                # Redis 被清空，下次重新建立 consumer group
+                self._group_ready = False
+            raise
+        return self._decode(response[0][1]) if response else []
+
+    async def ack(self, receipt):
+        # 處理完就刪掉，stream 的長度 = 還沒完成的工作數
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.xack(self.STREAM, self.GROUP, receipt)
+            pipe.xdel(self.STREAM, receipt)
+            await pipe.execute()
+
+    async def retry(self, receipt, job: Job, run_at: float):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zadd(self.DELAYED, {json.dumps(job): run_at})
+            pipe.xack(self.STREAM, self.GROUP, receipt)
+            pipe.xdel(self.STREAM, receipt)
+            await pipe.execute()
+
+    async def bury(self, receipt, job: Job):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.xadd(self.DEAD, {"job": json.dumps(job)}, maxlen=10000, approximate=True)
+            pipe.xack(self.STREAM, self.GROUP, receipt)
+            pipe.xdel(self.STREAM, receipt)
+            await pipe.execute()
+
+    async def reclaim(self, consumer: str, idle_ms: int) -> List[Tuple[str, Job]]:
+        """認領閒置太久 (worker 可能已經掛掉) 的 pending 工作"""
+        await self._ensure_group()
+        response = await self.client.xautoclaim(self.STREAM, self.GROUP, consumer, idle_ms, count=100)
+        return self._decode(response[1])
+
+    async def depth(self) -> Dict[str, int]:
+        await self._ensure_group()
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.xlen(self.STREAM)
+            pipe.xpending(self.STREAM, self.GROUP)
+            pipe.zcard(self.DELAYED)
+            pipe.xlen(self.DEAD)
+            length, pending, delayed, dead = await pipe.execute()
+        running = pending["pending"]
+        return {"ready": length - running, "delayed": delayed, "running": running, "dead": dead}
+
+
+class JobQueue:
+    def __init__(self, backend):
+        self.backend = backend
+        self.handlers: Dict[str, Handler] = {}
+
+    @property
+    def in_process(self) -> bool:
+        """行程內佇列只能由 API 行程自己的 worker 處理"""
+        return isinstance(self.backend, MemoryJobBackend)
+
+    def handler(self, name: str):
+        """註冊工作的處理函式"""
+        def register(fn: Handler) -> Handler:
+            self.handlers[name] = fn
+            return fn
+        return register
+
+    async def enqueue(self, name: str, payload: Optional[dict] = None, delay: float = 0) -> str:
+        """排入一個工作 (delay 秒後才執行)，回傳工作 id；payload 必須可以 JSON 序列化"""
+        job = {
+            "id": uuid.uuid4().hex,
+            "name": name,
+            "payload": payload or {},
+            "attempts": 0,
+            "enqueued_at": time.time() + delay,
+        }
+        await self.backend.push(job, job["enqueued_at"] if delay else None)
+        observe_job_enqueued(name)
+        return job["id"]
+
+
+class JobWorker:
+    """從佇列取出工作並執行，concurrency 個迴圈同時處理"""
+
+    def __init__(self, queue: JobQueue, concurrency: int):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.consumer = f"worker-{uuid.uuid4().hex[:8]}"
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    def start(self):
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._loop()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._maintenance_loop()))
+
+    async def stop(self, timeout: float = 30):
+        """不再取新工作，等執行中的工作完成 (超過 timeout 就取消，未 ack 的工作之後會被重新認領)"""
+        self._stopping = True
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+
+    async def _loop(self):
+        while not self._stopping:
+            try:
+                batch = await self.queue.backend.fetch(self.consumer, 1, block_ms=1000)
+            except Exception as e:
+                logger.warning("job fetch failed: %s", e)
+                await asyncio.sleep(1)
+                continue
+            for receipt, job in batch:
+                await self.run_job(receipt, job)
+
+    async def _maintenance_loop(self):
+        # 認領掛掉的 worker 留下的工作，並記錄佇列深度
+        while not self._stopping:
+            try:
+                idle_ms = settings.JOB_VISIBILITY_TIMEOUT_SECONDS * 1000
+                for receipt, job in await self.queue.backend.reclaim(self.consumer, idle_ms):
+                    await self._failed(receipt, job, "visibility timeout exceeded")
+                for state, count in (await self.queue.backend.depth()).items():
+                    JOB_QUEUE_DEPTH.labels(state).set(count)
+            except Exception as e:
+                logger.warning("job queue maintenance failed: %s", e)
+            await asyncio.sleep(settings.JOB_METRICS_INTERVAL_SECONDS)
+
+    async def run_job(self, receipt, job: Job):
+        handler = self.queue.handlers.get(job["name"])
+        if handler is None:
+            logger.error("no handler registered for job %s", job["name"])
+            await self.queue.backend.bury(receipt, job)
+            observe_job(job["name"], "dead", 0.0, 0.0)
+            return
+
+        waited = max(0.0, time.time() - job["enqueued_at"])
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(handler(**job["payload"]), settings.JOB_TIMEOUT_SECONDS)
+        except Exception as e:
+            await self._failed(receipt, job, repr(e), time.perf_counter() - start, waited)
+            return
+        await self.queue.backend.ack(receipt)
+        observe_job(job["name"], "done", time.perf_counter() - start, waited)
+
+    async def _failed(self, receipt, job: Job, error: str, seconds: float = 0.0, waited: float = 0.0):
+        job["attempts"] += 1
+        job["last_error"] = error
+        if job["attempts"] >= settings.JOB_MAX_ATTEMPTS:
+            logger.error("job %s %s failed %d times, moved to dead letters: %s",
+                         job["name"], job["id"], job["attempts"], error)
+            await self.queue.backend.bury(receipt, job)
+            observe_job(job["name"], "dead", seconds, waited)
+            return
+        delay = min(settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (job["attempts"] - 1), settings.JOB_RETRY_MAX_DELAY_SECONDS)
+        logger.warning("job %s %s failed (attempt %d), retrying in %.1fs: %s",
+                       job["name"], job["id"], job["attempts"], delay, error)
+        job["enqueued_at"] = time.time() + delay
+        await self.queue.backend.retry(receipt, job, job["enqueued_at"])
+        observe_job(job["name"], "retry", seconds, waited)
+
+
+def _create_job_queue() -> JobQueue:
+    client = redis_handler.get_client()
+    return JobQueue(RedisJobBackend(client) if client is not None else MemoryJobBackend())
+
+
+job_queue = _create_job_queue()
@@ -0,0 +1,241 @@
+# app/core/metrics.py
+#
+# Prometheus 指標與每個請求的 SQL 統計
+#
+# - MetricsMiddleware：每個路由 (以路徑樣板為標籤，例如 /api/v1/posts/{post_id}) 的延遲直方圖、
+#   狀態碼計數、進行中的請求數
+# - SQLAlchemy 事件：每條語句計時，累加到目前請求的 RequestStats (contextvar)；
+#   請求結束時記錄查詢數與 DB 時間，同一條語句重複超過 N_PLUS_ONE_THRESHOLD 次視為疑似 N+1
+# - 超過 SLOW_QUERY_MS 的語句記一筆 warning log (附上 SQL)
+# - MinIO 上傳耗時 / 位元組數由 MinioHandler 呼叫 observe_minio()
+# - 對外 HTTP 呼叫 (app/core/http.py) 的耗時與結果由 observe_outbound() 記錄，斷路器狀態在輸出時收集
+# - 背景工作 (app/core/jobs.py) 的排入 / 完成數、執行與等待時間、佇列深度
+# - 已刪除文章的清除進度 (app/core/purge.py)
+# - 快取命中率、限流等既有的行程內統計在輸出 /metrics 時一併收集
+#
+# 多個 uvicorn worker 時請設定 PROMETHEUS_MULTIPROC_DIR，/metrics 會合併所有行程的數值。
+
+import logging
+import os
+import time
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from starlette.responses import Response
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+HTTP_REQUESTS = Counter(
+    "acg_http_requests_total", "HTTP requests", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "acg_http_request_duration_seconds", "HTTP request latency", ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_IN_PROGRESS = Gauge(
+    "acg_http_requests_in_progress", "HTTP requests in progress", ["method"], multiprocess_mode="livesum"
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "acg_db_queries_per_request", "SQL statements per request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "acg_db_time_per_request_seconds", "Time spent in SQL per request", ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+DB_QUERY_LATENCY = Histogram(
+    "acg_db_query_duration_seconds", "SQL statement latency",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+DB_SLOW_QUERIES = Counter("acg_db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS")
+N_PLUS_ONE = Counter("acg_db_n_plus_one_total", "Requests with a statement repeated too often", ["route"])
+MINIO_UPLOAD_LATENCY = Histogram(
+    "acg_minio_upload_duration_seconds", "MinIO put_object latency", ["kind"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+MINIO_UPLOAD_BYTES = Counter("acg_minio_upload_bytes_total", "Bytes uploaded to MinIO", ["kind"])
+OUTBOUND_LATENCY = Histogram(
+    "acg_outbound_request_duration_seconds", "Outbound HTTP latency including retries", ["host", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+JOBS_ENQUEUED = Counter("acg_jobs_enqueued_total", "Background jobs enqueued", ["job"])
+JOBS_PROCESSED = Counter("acg_jobs_processed_total", "Background jobs processed", ["job", "outcome"])
+JOB_DURATION = Histogram(
+    "acg_job_duration_seconds", "Background job run time", ["job"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+JOB_WAIT = Histogram(
+    "acg_job_wait_seconds", "Time from a job becoming due to a worker picking it up", ["job"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+)
+JOB_QUEUE_DEPTH = Gauge(
+    "acg_jobs_queue_depth", "Background jobs by state", ["state"], multiprocess_mode="livemax"
+)
+PURGED_ROWS = Counter("acg_purged_rows_total", "Rows removed by the deleted post purger", ["table"])
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: StatementCounter = StatementCounter()
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("acg_request_stats", default=None)
+
+
+# --- SQLAlchemy ---
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("acg_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["acg_query_start"].pop()
+    DB_QUERY_LATENCY.observe(elapsed)
+    if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        DB_SLOW_QUERIES.inc()
+        logger.warning("slow query (%.1f ms): %s", elapsed * 1000, statement)
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        stats.statements[statement] += 1
+
+
+def instrument_engine(engine):
+    """替 AsyncEngine 掛上計時用的事件"""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- MinIO ---
+def observe_minio(kind: str, seconds: float, size: int):
+    MINIO_UPLOAD_LATENCY.labels(kind).observe(seconds)
+    if size > 0:
+        MINIO_UPLOAD_BYTES.labels(kind).inc(size)
+
+
+# --- 對外 HTTP ---
+def observe_outbound(host: str, outcome: str, seconds: float):
+    OUTBOUND_LATENCY.labels(host, outcome).observe(seconds)
+
+
+# --- 背景工作 ---
+def observe_job_enqueued(name: str):
+    JOBS_ENQUEUED.labels(name).inc()
+
+
+def observe_job(name: str, outcome: str, seconds: float, waited: float):
+    JOBS_PROCESSED.labels(name, outcome).inc()
+    JOB_DURATION.labels(name).observe(seconds)
+    JOB_WAIT.labels(name).observe(waited)
+
+
+def observe_purge(table: str, rows: int):
+    PURGED_ROWS.labels(table).inc(rows)
+
+
+# --- HTTP ---
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.labels(method).inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_PROGRESS.labels(method).dec()
+            _request_stats.reset(token)
+            # 以路徑樣板當標籤，避免每個 id 各自成為一組時間序列
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            HTTP_LATENCY.labels(method, route).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.queries)
+            DB_TIME_PER_REQUEST.labels(route).observe(stats.db_seconds)
+            if stats.statements:
+                statement, count = stats.statements.most_common(1)[0]
+                if count >= settings.N_PLUS_ONE_THRESHOLD:
+                    N_PLUS_ONE.labels(route).inc()
+                    logger.warning("possible N+1 on %s %s: %d x %s", method, route, count, statement)
+
+
+# --- 既有的行程內統計 ---
+class AppStatsCollector:
+    def describe(self):
+        # 有 describe() 時註冊不會先呼叫 collect()，匯入 metrics 時不必載入被統計的模組
+        return []
+
+    def collect(self):
+        from app.core.archive import snapshot_cache
+        from app.core.cache import cache
+        from app.core.http import http_client
+        from app.core.pubsub import event_bus
+        from app.core.rate_limit import rate_limiter
+        from app.core.security import user_cache
+
+        requests = CounterMetricFamily("acg_cache_requests", "List cache lookups", labels=["cache", "result"])
+        requests.add_metric(["list", "hit"], cache.hits)
+        requests.add_metric(["list", "miss"], cache.misses)
+        requests.add_metric(["user", "hit"], user_cache.hits)
+        requests.add_metric(["user", "miss"], user_cache.misses)
+        requests.add_metric(["archive", "hit"], snapshot_cache.hits)
+        requests.add_metric(["archive", "miss"], snapshot_cache.misses)
+        yield requests
+
+        limiter = rate_limiter.stats()
+        checks = CounterMetricFamily("acg_rate_limit_checks", "Rate limiter checks", labels=["result"])
+        checks.add_metric(["allowed"], limiter["calls"] - limiter["rejected"])
+        checks.add_metric(["rejected"], limiter["rejected"])
+        yield checks
+        yield CounterMetricFamily(
+            "acg_rate_limit_check_seconds", "Time spent in the rate limiter", value=rate_limiter.total_seconds
+        )
+        yield GaugeMetricFamily("acg_sse_subscribers", "Open SSE subscriptions", value=event_bus.subscriber_count)
+
+        circuits = GaugeMetricFamily("acg_outbound_circuit_open", "Outbound circuit breaker is open", labels=["host"])
+        for host, breaker in http_client.breakers.items():
+            circuits.add_metric([host], 1 if breaker.state == "open" else 0)
+        yield circuits
+
+
+REGISTRY.register(AppStatsCollector())
+
+
+def metrics_response() -> Response:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        # 行程內統計無法跨行程合併，這裡只回報處理這次請求的 worker
+        registry.register(AppStatsCollector())
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
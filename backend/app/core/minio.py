@@ -1,34 +1,50 @@
+from datetime import datetime, timedelta, timezone
 from minio import Minio
+from minio.datatypes import PostPolicy
+from minio.error import S3Error
+from fastapi.concurrency import run_in_threadpool
 import os
+import threading
+import time
+from app.core.metrics import observe_minio
 
 class MinioHandler:
-    def __init__(self):
+    def __init__(self, bucket_name="acg-images", public=True):
         self.minio_url = os.getenv("MINIO_URL", "minio:9000")
         self.access_key = os.getenv("MINIO_ROOT_USER", "minioadmin")
         self.secret_key = os.getenv("MINIO_ROOT_PASSWORD", "minioadmin")
-        self.bucket_name = "acg-images"
+        self.bucket_name = bucket_name
+        # public：任何人都可以 GET (圖片經由 nginx 的 /acg-images 直接提供)
+        self.public = public
         self.client = None 
+        # 上傳在 threadpool 執行，多個執行緒可能同時第一次連線
+        self._lock = threading.Lock()
 
     def get_client(self):
         if self.client is None:
-            try:
-                print(f"正在嘗試連線 MinIO: {self.minio_url}...")
-                self.client = Minio(
-                    self.minio_url,
-                    access_key=self.access_key,
-                    secret_key=self.secret_key,
-                    secure=False
-                )
-                self._check_bucket()
-                print("MinIO 連線成功！")
-            except Exception as e:
-                print(f"MinIO 連線失敗: {e}")
-                return None
+            with self._lock:
+                if self.client is None:
+                    try:
+                        print(f"正在嘗試連線 MinIO: {self.minio_url}...")
+                        client = Minio(
+                            self.minio_url,
+                            access_key=self.access_key,
+                            secret_key=self.secret_key,
+                            secure=False
+                        )
+                        self._check_bucket(client)
+                        self.client = client
+                        print("MinIO 連線成功！")
+                    except Exception as e:
+                        print(f"MinIO 連線失敗: {e}")
+                        return None
         return self.client
 
-    def _check_bucket(self):
-        if not self.client.bucket_exists(self.bucket_name):
-            self.client.make_bucket(self.bucket_name)
+    def _check_bucket(self, client):
+        if not client.bucket_exists(self.bucket_name):
+            client.make_bucket(self.bucket_name)
+            if not self.public:
+                return
             policy = """
             {
               "Version": "2012-10-17",
@@ -37,27 +53,95 @@ class MinioHandler:
                   "Effect": "Allow",
                   "Principal": {"AWS": "*"},
                   "Action": "s3:GetObject",
-                  "Resource": "arn:aws:s3:::acg-images/*"
+                  "Resource": "arn:aws:s3:::%s/*"
                 }
               ]
             }
-            """
-            self.client.set_bucket_policy(self.bucket_name, policy)
+            """ % self.bucket_name
+            client.set_bucket_policy(self.bucket_name, policy)
 
-    def upload_file(self, file_data, file_name, content_type):
+    def _require_client(self):
         client = self.get_client()
         if not client:
             raise Exception("MinIO 服務無法連線，請檢查 Docker logs")
+        return client
+
+    def object_url(self, file_name):
+        return f"/{self.bucket_name}/{file_name}"
+
+    def stat_object(self, file_name):
+        """回傳物件資訊 (size / content_type)，物件不存在時回傳 None"""
+        try:
+            return self._require_client().stat_object(self.bucket_name, file_name)
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return None
+            raise
+
+    def object_exists(self, file_name):
+        return self.stat_object(file_name) is not None
+
+    def get_object_bytes(self, file_name):
+        response = self._require_client().get_object(self.bucket_name, file_name)
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def remove_object(self, file_name):
+        self._require_client().remove_object(self.bucket_name, file_name)
+
+    def presigned_post_policy(self, file_name, content_type, max_bytes, expires_in):
+        """
+        產生讓瀏覽器直接 POST 到 bucket 的表單欄位
+
+        POST policy 的簽章不包含 Host，因此可以經由前端 nginx 的 /acg-images 轉送。
+        物件名稱、Content-Type 與大小上限都寫在 policy 裡，由 MinIO 驗證。
+        """
+        policy = PostPolicy(self.bucket_name, datetime.now(timezone.utc) + timedelta(seconds=expires_in))
+        policy.add_equals_condition("key", file_name)
+        policy.add_equals_condition("Content-Type", content_type)
+        policy.add_content_length_range_condition(1, max_bytes)
+        fields = self._require_client().presigned_post_policy(policy)
+        fields.update({"key": file_name, "Content-Type": content_type})
+        return fields
+
+    def upload_file(self, file_data, file_name, content_type, length=-1, kind="original"):
+        client = self._require_client()
+        start = time.perf_counter()
             
+        # 已知長度時直接單次上傳，未知 (-1) 時以 10MB 分段
         client.put_object(
             self.bucket_name,
             file_name,
             file_data,
-            length=-1,
+            length=length,
             part_size=10*1024*1024,
             content_type=content_type
         )
+        # kind: original (使用者上傳的原圖) / variant (縮圖) / archive (封存的討論串)
+        observe_minio(kind, time.perf_counter() - start, length)
         
-        return f"/acg-images/{file_name}"
+        return self.object_url(file_name)
+
+    # --- 非同步版本：在 threadpool 執行，不阻塞 event loop ---
+    async def object_exists_async(self, file_name):
+        return await run_in_threadpool(self.object_exists, file_name)
+
+    async def upload_file_async(self, file_data, file_name, content_type, length=-1, kind="original"):
+        return await run_in_threadpool(self.upload_file, file_data, file_name, content_type, length, kind)
+
+    async def stat_object_async(self, file_name):
+        return await run_in_threadpool(self.stat_object, file_name)
+
+    async def get_object_bytes_async(self, file_name):
+        return await run_in_threadpool(self.get_object_bytes, file_name)
+
+    async def remove_object_async(self, file_name):
+        return await run_in_threadpool(self.remove_object, file_name)
+
+    async def presigned_post_policy_async(self, file_name, content_type, max_bytes, expires_in):
+        return await run_in_threadpool(self.presigned_post_policy, file_name, content_type, max_bytes, expires_in)
 
-minio_handler = MinioHandler()
\ No newline at end of file
+minio_handler = MinioHandler()
@@ -0,0 +1,111 @@
+# app/core/post_fields.py
+#
+# 文章列表的欄位投影 (sparse fieldsets) 與內容摘要
+#
+# - `fields=id,title,excerpt,owner` 只 SELECT 需要的欄位 (作者以 LEFT JOIN 一起取回)，不建立 ORM 物件
+# - `excerpt` 是建立文章時預先算好的截斷預覽 (posts.excerpt)；舊文章還沒補上時以 SQL substr() 暫代
+# - 查詢結果是資料庫的欄位值，已經是可信的型別，直接組成 dict 交給 orjson，不再經過 Pydantic 驗證
+# 預設欄位與 PostRead 完全相同，舊版前端拿到的 JSON 不變。
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, func, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.models.post import Post
+from app.models.user import User
+
+# 輸出順序與 PostRead 相同，excerpt 放在 content 之後
+POST_FIELDS = (
+    "id", "title", "content", "excerpt", "owner_id", "board_id", "created_at", "is_spoiler",
+    "score", "upvotes", "downvotes", "comment_count", "owner",
+)
+DEFAULT_FIELDS = tuple(name for name in POST_FIELDS if name != "excerpt")
+SUMMARY_FIELDS = tuple(name for name in POST_FIELDS if name != "content")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def make_excerpt(content: str, length: Optional[int] = None) -> str:
+    """壓縮空白後截斷到 length 個字，被截斷時結尾加上 …"""
+    length = length or settings.POST_EXCERPT_LENGTH
+    text = _WHITESPACE.sub(" ", content).strip()
+    return text if len(text) <= length else text[:length - 1] + "…"
+
+
+def parse_fields(fields: Optional[str], excerpt: bool = False) -> Tuple[str, ...]:
+    """解析 `fields=` 參數 (依 POST_FIELDS 的順序輸出)；未指定時回傳完整欄位或摘要欄位"""
+    if fields is None:
+        return SUMMARY_FIELDS if excerpt else DEFAULT_FIELDS
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(POST_FIELDS)
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"fields must be a comma-separated subset of: {', '.join(POST_FIELDS)}",
+        )
+    return tuple(name for name in POST_FIELDS if name in requested)
+
+
+def select_posts(fields: Tuple[str, ...]):
+    """只選取 fields 需要的欄位；id / created_at 一律選取 (排序與游標要用)，已刪除的文章不列出"""
+    columns = {"id": Post.id, "created_at": Post.created_at}
+    for name in fields:
+        if name == "excerpt":
+            preview = func.substr(Post.content, 1, settings.POST_EXCERPT_LENGTH)
+            columns["excerpt"] = func.coalesce(Post.excerpt, preview)
+        elif name == "owner":
+            columns.update({"owner__id": User.id, "owner__username": User.username, "owner__nickname": User.nickname})
+        elif name == "content":
+            # 已封存的文章內文在快照裡 (app/core/archive.py 補上)，先以摘要代替
+            columns["content"] = case((Post.archived_at.is_(None), Post.content), else_=Post.excerpt)
+            columns["archived_at"] = Post.archived_at
+        elif name not in columns:
+            columns[name] = getattr(Post, name)
+
+    statement = select(*[column.label(name) for name, column in columns.items()]).select_from(Post) \
+        .where(Post.deleted_at.is_(None))
+    if "owner" in fields:
+        statement = statement.outerjoin(User, User.id == Post.owner_id)
+    return statement
+
+
+def post_items(rows, fields: Tuple[str, ...]) -> List[Dict]:
+    """把 select_posts() 的結果列組成可直接 JSON 序列化的 dict"""
+    items = []
+    for row in rows:
+        values = row._mapping
+        item = {}
+        for name in fields:
+            if name == "owner":
+                item["owner"] = None if values["owner__id"] is None else {
+                    "id": values["owner__id"],
+                    "username": values["owner__username"],
+                    "nickname": values["owner__nickname"],
+                }
+            elif name == "created_at":
+                item["created_at"] = values["created_at"].isoformat()
+            else:
+                item[name] = values[name]
+        items.append(item)
+    return items
+
+
+async def backfill_excerpts(session: AsyncSession, batch_size: int = 2000) -> int:
+    """替還沒有 excerpt 的舊文章補上摘要 (依 id 分批，每批一個交易)，回傳處理筆數"""
+    total = 0
+    while True:
+        statement = select(Post.id, Post.content).where(Post.excerpt.is_(None)).order_by(Post.id).limit(batch_size)
+        rows = (await session.exec(statement)).all()
+        if not rows:
+            return total
+        await session.exec(
+            update(Post),
+            params=[{"id": post_id, "excerpt": make_excerpt(content)} for post_id, content in rows],
+        )
+        await session.commit()
+        total += len(rows)
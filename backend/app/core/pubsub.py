@@ -0,0 +1,149 @@
+# app/core/pubsub.py
+#
+# 即時事件的 pub/sub 匯流排 (給 /events 的 SSE 串流使用)
+#
+# - 頻道：每篇文章一個 (post:{id})，每個看板一個 (board:{id})，另有不分看板的 board:all
+# - 每個 worker 只維持「一條」Redis 訂閱連線 (PSUBSCRIBE acg:events:*)，收到後再分送給
+#   本行程內訂閱該頻道的 asyncio.Queue；閒置的訂閱者只佔一個 Queue，不碰資料庫也不佔 Redis 連線
+# - 沒有 REDIS_URL 時直接在行程內分送 (測試 / 單機)
+# - 事件在發佈時就編碼成 SSE frame，分送給上千個訂閱者時不需要逐一序列化
+# - 發佈失敗只記 log，不影響原本的寫入請求
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.core.redis import redis_handler
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "acg:events:"
+SUBSCRIBER_QUEUE_SIZE = 100  # 來不及讀的訂閱者會被標記為落後，由前端重新整理
+
+
+def encode_event(event: Dict[str, Any]) -> bytes:
+    data = json.dumps(event, separators=(",", ":"), ensure_ascii=False, default=str)
+    return f"event: {event['type']}\ndata: {data}\n\n".encode()
+
+
+def post_updated_event(counters) -> Dict[str, Any]:
+    """分數 / 留言數變化的事件 (counters 為 app.core.counters.POST_COUNTER_COLUMNS 的 RETURNING 列)"""
+    return {
+        "type": "post.updated",
+        "post_id": counters.id,
+        "board_id": counters.board_id,
+        "score": counters.score,
+        "upvotes": counters.upvotes,
+        "downvotes": counters.downvotes,
+        "comment_count": counters.comment_count,
+    }
+
+
+def post_channel(post_id: int) -> str:
+    return f"post:{post_id}"
+
+
+def board_channels(board_id: Optional[int]) -> List[str]:
+    """看板事件同時發到該看板與 board:all"""
+    return [f"board:{board_id}", "board:all"] if board_id else ["board:all"]
+
+
+class Subscription:
+    def __init__(self, bus: "EventBus", channels: Iterable[str]):
+        self.bus = bus
+        self.channels = list(channels)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.lagged = False
+
+    def deliver(self, message: bytes):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+    async def get(self, timeout: float) -> Optional[bytes]:
+        """等待下一個事件 (已編碼的 SSE frame)，逾時回傳 None"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus._unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def subscribe(self, channels: Iterable[str]) -> Subscription:
+        subscription = Subscription(self, channels)
+        for channel in subscription.channels:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        if redis_handler.get_client() is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        for channel in subscription.channels:
+            subs = self._subscribers.get(channel)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscribers[channel]
+
+    async def publish(self, channels: Iterable[str], event: Dict[str, Any]):
+        message = encode_event(event)
+        client = redis_handler.get_client()
+        try:
+            if client is None:
+                for channel in channels:
+                    self._dispatch(channel, message)
+                return
+            pipe = client.pipeline(transaction=False)
+            for channel in channels:
+                pipe.publish(CHANNEL_PREFIX + channel, message)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning("event publish failed (%s): %s", event.get("type"), e)
+
+    def _dispatch(self, channel: str, message: bytes):
+        for subscription in list(self._subscribers.get(channel, ())):
+            subscription.deliver(message)
+
+    async def _listen(self):
+        # 整個 worker 共用一條訂閱連線，斷線時自動重連
+        while True:
+            pubsub = redis_handler.get_client().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+                async for message in pubsub.listen():
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    self._dispatch(channel[len(CHANNEL_PREFIX):], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("event listener disconnected: %s", e)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+event_bus = EventBus()
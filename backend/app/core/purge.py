@@ -0,0 +1,86 @@
+# app/core/purge.py
+#
+# 刪除文章 = 先設 deleted_at (馬上從所有列表 / 搜尋 / 排行消失)，再由背景工作分批清除
+#
+# 大的討論串可能有上萬則留言與投票，在請求裡一次刪完會是長時間持有鎖的大交易。
+# 這裡每批最多刪 PURGE_BATCH_SIZE 列、各自 commit，批與批之間暫停 PURGE_BATCH_PAUSE_MS，
+# 順序是搜尋索引 → 留言 (id 由大到小，回覆一定比它回覆的留言晚建立，先刪子留言) → 投票 → 文章本身。
+# 中途失敗時由佇列重試，已刪掉的部分不會重做；進度寫在 log 與 acg_purged_rows_total 指標。
+#
+# 佇列遺失工作時 (行程內模式重啟) 可以用 `python -m app.cli purge-deleted-posts` 清掉剩下的。
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict
+
+from sqlalchemy import delete
+from sqlmodel import select
+
+from app.core.archive import remove_snapshot
+from app.core.config import settings
+from app.core.db import async_session
+from app.core.jobs import job_queue
+from app.core.metrics import observe_purge
+from app.models.post import Comment, Post, Vote
+from app.models.search import SearchDocument
+
+logger = logging.getLogger(__name__)
+
+PURGE_JOB = "post.purge"
+
+# (名稱, 資料表, 刪除順序)
+_CHILDREN = (
+    ("search_documents", SearchDocument, SearchDocument.id),
+    ("comments", Comment, Comment.id.desc()),
+    ("votes", Vote, Vote.id),
+)
+
+
+async def schedule_purge(post_id: int):
+    """排入清除工作；排不進去時只記 log，之後由 purge-deleted-posts 補清"""
+    try:
+        await job_queue.enqueue(PURGE_JOB, {"post_id": post_id})
+    except Exception as e:
+        logger.warning("failed to enqueue purge for post %s: %s", post_id, e)
+
+
+@job_queue.handler(PURGE_JOB)
+async def purge_post(post_id: int) -> Dict[str, int]:
+    """分批清除一篇已刪除文章的留言、投票與文章本身，回傳各表刪掉的列數"""
+    totals = {name: 0 for name, _, _ in _CHILDREN}
+    pause = settings.PURGE_BATCH_PAUSE_MS / 1000
+    async with async_session() as session:
+        post = await session.get(Post, post_id)
+        if post is None or post.deleted_at is None:
+            return totals
+
+        for name, model, order in _CHILDREN:
+            while True:
+                batch = select(model.id).where(model.post_id == post_id).order_by(order).limit(settings.PURGE_BATCH_SIZE)
+                result = await session.exec(delete(model).where(model.id.in_(batch)))
+                await session.commit()
+                totals[name] += result.rowcount
+                observe_purge(name, result.rowcount)
+                if result.rowcount < settings.PURGE_BATCH_SIZE:
+                    break
+                logger.info("purging post %s: %d %s deleted so far", post_id, totals[name], name)
+                await asyncio.sleep(pause)
+
+        if post.archived_at is not None:
+            await remove_snapshot(post)
+        await session.exec(delete(Post).where(Post.id == post_id, Post.deleted_at.is_not(None)))
+        await session.commit()
+        observe_purge("posts", 1)
+    logger.info("purged post %s: %s", post_id, ", ".join(f"{count} {name}" for name, count in totals.items()))
+    return totals
+
+
+async def purge_deleted_posts(older_than: timedelta = timedelta(0)) -> int:
+    """清除所有刪除超過 older_than 的文章 (依刪除時間)，回傳篇數"""
+    async with async_session() as session:
+        statement = select(Post.id).where(Post.deleted_at < datetime.utcnow() - older_than).order_by(Post.deleted_at)
+        post_ids = (await session.exec(statement)).all()
+    for post_id in post_ids:
+        await purge_post(post_id)
+    return len(post_ids)
@@ -0,0 +1,249 @@
+# app/core/ranking.py
+#
+# 預先排好的 hot / top_day / top_week 文章排行 (每個看板一組，另有不分看板的 all)
+#
+# - 每個排行是一個 sorted set (member = post id)，有 REDIS_URL 時放在 Redis，否則在行程內
+# - vote_post / create_comment / create_post 後以最新計數重算該篇的分數 (ZADD，冪等不會漂移)
+# - 定期 decay()：把超過時間窗的文章移出 top_day / top_week，並把 hot 修剪到 RANKING_FEED_SIZE
+# 讀取一頁排行只要一次 ZREVRANGE + 一次主鍵查詢，成本與投票量無關。
+
+import asyncio
+import logging
+import math
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.redis import redis_handler
+from app.models.board import Board
+from app.models.post import Post
+
+logger = logging.getLogger(__name__)
+
+RANKED_SORTS = ("hot", "top_day", "top_week")
+TOP_WINDOWS = {"top_day": timedelta(days=1), "top_week": timedelta(weeks=1)}
+
+# hot 分數 (Reddit 公式)：每 12.5 小時的新鮮度 ≈ 分數多一個數量級，留言算半票
+HOT_EPOCH = 1134028003
+HOT_DECAY_SECONDS = 45000
+COMMENT_WEIGHT = 0.5
+
+
+def _epoch(created_at: datetime) -> float:
+    return created_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+def hot_score(score: int, comment_count: int, created_at: datetime) -> float:
+    weighted = score + comment_count * COMMENT_WEIGHT
+    order = math.log10(max(abs(weighted), 1))
+    sign = 1 if weighted > 0 else -1 if weighted < 0 else 0
+    return round(sign * order + (_epoch(created_at) - HOT_EPOCH) / HOT_DECAY_SECONDS, 7)
+
+
+class _SortedSet:
+    """行程內的 sorted set：dict 查分數 + 依 (score, member) 排序的 list"""
+
+    def __init__(self):
+        self.scores: Dict[int, float] = {}
+        self.order: List[Tuple[float, int]] = []
+
+    def add(self, member: int, score: float):
+        self.remove(member)
+        self.scores[member] = score
+        insort(self.order, (score, member))
+
+    def remove(self, member: int) -> bool:
+        old = self.scores.pop(member, None)
+        if old is not None:
+            del self.order[bisect_left(self.order, (old, member))]
+        return old is not None
+
+    def top(self, offset: int, limit: int) -> List[int]:
+        end = len(self.order) - offset
+        if end <= 0:
+            return []
+        return [member for _, member in reversed(self.order[max(end - limit, 0):end])]
+
+    def below(self, max_score: float) -> List[int]:
+        return [member for _, member in self.order[:bisect_left(self.order, (max_score,))]]
+
+    def trim(self, keep: int):
+        extra = len(self.order) - keep
+        if extra > 0:
+            for _, member in self.order[:extra]:
+                del self.scores[member]
+            del self.order[:extra]
+
+
+class MemoryRankingBackend:
+    def __init__(self):
+        self._sets: Dict[str, _SortedSet] = {}
+
+    def _get(self, key: str) -> _SortedSet:
+        if key not in self._sets:
+            self._sets[key] = _SortedSet()
+        return self._sets[key]
+
+    async def add_many(self, entries: Iterable[Tuple[str, int, float]]):
+        for key, member, score in entries:
+            self._get(key).add(member, score)
+
+    async def remove(self, keys: Iterable[str], member: int):
+        for key in keys:
+            if key in self._sets:
+                self._sets[key].remove(member)
+
+    async def top(self, key: str, offset: int, limit: int) -> List[int]:
+        return self._sets[key].top(offset, limit) if key in self._sets else []
+
+    async def below(self, key: str, max_score: float) -> List[int]:
+        return self._sets[key].below(max_score) if key in self._sets else []
+
+    async def remove_many(self, key: str, members: List[int]) -> int:
+        """回傳實際移除的數量"""
+        if key not in self._sets:
+            return 0
+        return sum(self._sets[key].remove(member) for member in members)
+
+    async def trim(self, key: str, keep: int):
+        if key in self._sets:
+            self._sets[key].trim(keep)
+
+    async def is_empty(self) -> bool:
+        return not any(s.scores for s in self._sets.values())
+
+
+class RedisRankingBackend:
+    def __init__(self, client):
+        self.client = client
+
+    async def add_many(self, entries: Iterable[Tuple[str, int, float]]):
+        pipe = self.client.pipeline(transaction=False)
+        for key, member, score in entries:
+            pipe.zadd(key, {member: score})
+        await pipe.execute()
+
+    async def remove(self, keys: Iterable[str], member: int):
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.zrem(key, member)
+        await pipe.execute()
+
+    async def top(self, key: str, offset: int, limit: int) -> List[int]:
+        return [int(m) for m in await self.client.zrevrange(key, offset, offset + limit - 1)]
+
+    async def below(self, key: str, max_score: float) -> List[int]:
+        return [int(m) for m in await self.client.zrangebyscore(key, "-inf", f"({max_score}")]
+
+    async def remove_many(self, key: str, members: List[int]) -> int:
+        if not members:
+            return 0
+        return await self.client.zrem(key, *members)
+
+    async def trim(self, key: str, keep: int):
+        await self.client.zremrangebyrank(key, 0, -(keep + 1))
+
+    async def is_empty(self) -> bool:
+        return not await self.client.exists(_key("all", "hot"))
+
+
+def _scope(board_id: Optional[int]) -> str:
+    return str(board_id) if board_id else "all"
+
+
+def _key(scope: str, feed: str) -> str:
+    return f"acg:feed:{scope}:{feed}"
+
+
+class Ranking:
+    def __init__(self, backend, feed_size: int):
+        self.backend = backend
+        self.feed_size = feed_size
+
+    async def update_post(self, post):
+        """post 需要 id / board_id / score / comment_count / created_at (ORM 物件或 RETURNING 列皆可)"""
+        now = datetime.utcnow()
+        entries = []
+        for scope in (_scope(post.board_id), _scope(None)):
+            entries.append((_key(scope, "hot"), post.id, hot_score(post.score, post.comment_count, post.created_at)))
+            entries.append((_key(scope, "created"), post.id, _epoch(post.created_at)))
+            for feed, window in TOP_WINDOWS.items():
+                if post.created_at >= now - window:
+                    entries.append((_key(scope, feed), post.id, post.score))
+        try:
+            await self.backend.add_many(entries)
+        except Exception as e:
+            logger.warning("ranking update failed for post %s: %s", post.id, e)
+
+    async def remove_post(self, post_id: int, board_id: int):
+        keys = [_key(scope, feed) for scope in (_scope(board_id), _scope(None))
+                for feed in RANKED_SORTS + ("created",)]
+        try:
+            await self.backend.remove(keys, post_id)
+        except Exception as e:
+            logger.warning("ranking removal failed for post %s: %s", post_id, e)
+
+    async def page(self, board_id: Optional[int], sort: str, offset: int, limit: int) -> List[int]:
+        """回傳排行中第 offset 名起的 limit 個 post id"""
+        return await self.backend.top(_key(_scope(board_id), sort), offset, limit)
+
+    async def decay(self, scopes: Iterable[str]):
+        """移出超過時間窗的文章，並修剪 hot"""
+        now = datetime.utcnow()
+        changed = []
+        for scope in scopes:
+            for feed, window in TOP_WINDOWS.items():
+                expired = await self.backend.below(_key(scope, "created"), _epoch(now - window))
+                removed = await self.backend.remove_many(_key(scope, feed), expired)
+                if removed and scope not in changed:
+                    changed.append(scope)
+            # created 只用來判斷時間窗，超過一週的就不用留了
+            await self.backend.trim(_key(scope, "hot"), self.feed_size)
+            stale = await self.backend.below(_key(scope, "created"), _epoch(now - TOP_WINDOWS["top_week"]))
+            await self.backend.remove_many(_key(scope, "created"), stale)
+        # top_day / top_week 的內容變了，列表快取與 ETag 跟著失效 (排行的 scope "1" / "all" 對應 board:1 / board:all)
+        await cache.bump(*[f"board:{scope}" for scope in changed])
+
+    async def rebuild(self, session: AsyncSession):
+        """從資料庫重建排行：每個看板 (與 all) 取最新的 RANKING_FEED_SIZE 篇"""
+        board_ids = (await session.exec(select(Board.id))).all()
+        for board_id in [None, *board_ids]:
+            statement = select(Post).where(Post.deleted_at.is_(None)) \
+                .order_by(Post.created_at.desc(), Post.id.desc()).limit(self.feed_size)
+            if board_id:
+                statement = statement.where(Post.board_id == board_id)
+            for post in (await session.exec(statement)).all():
+                await self.update_post(post)
+        await self.decay(await self._scopes(session))
+
+    async def warm_up(self, session: AsyncSession):
+        """啟動時若排行是空的 (行程內模式或 Redis 被清空) 就重建"""
+        if await self.backend.is_empty():
+            await self.rebuild(session)
+
+    async def run_decay_loop(self, session_factory):
+        while True:
+            await asyncio.sleep(settings.RANKING_DECAY_INTERVAL_SECONDS)
+            try:
+                async with session_factory() as session:
+                    await self.decay(await self._scopes(session))
+            except Exception as e:
+                logger.warning("ranking decay failed: %s", e)
+
+    async def _scopes(self, session: AsyncSession) -> List[str]:
+        board_ids = (await session.exec(select(Board.id))).all()
+        return [_scope(None)] + [_scope(board_id) for board_id in board_ids]
+
+
+def _create_ranking() -> Ranking:
+    client = redis_handler.get_client()
+    backend = RedisRankingBackend(client) if client is not None else MemoryRankingBackend()
+    return Ranking(backend, feed_size=settings.RANKING_FEED_SIZE)
+
+
+ranking = _create_ranking()
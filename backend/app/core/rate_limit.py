@@ -0,0 +1,183 @@
+# app/core/rate_limit.py
+#
+# 寫入端點的 token bucket 限流
+#
+# - 每個路由一組限制 (settings.RATE_LIMITS，例如 "create_post": "5/minute")，
+#   桶的容量 = 次數 (可連續打完)，之後依同樣的速率補回
+# - 已登入時以 user id 計算 (token 解碼走 user_cache 的行程內 LRU，不查資料庫)，否則以來源 IP 計算；
+#   X-Real-IP 只在 RATE_LIMIT_TRUST_PROXY 開啟且連線來自 RATE_LIMIT_TRUSTED_PROXIES 時採用，
+#   直接連到後端的人不能靠偽造 header 換桶
+# - 有 REDIS_URL 時每個請求只有一次 Lua 腳本呼叫 (讀取 + 扣除 + 設定過期一次完成)，
+#   否則使用行程內的桶；Redis 出錯時放行並記 log，不因限流拖垮整個論壇
+# - 超過限制回 429 並帶 Retry-After (秒)
+# - 限流本身的耗時記在 rate_limiter.stats()，可知道每個請求多花了多少時間
+
+import ipaddress
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+from app.core.redis import redis_handler
+from app.core.security import request_user_id
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+TRUSTED_PROXIES = [ipaddress.ip_network(network) for network in settings.RATE_LIMIT_TRUSTED_PROXIES]
+
+
+def _is_trusted_proxy(host: Optional[str]) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """ "20/minute" → (容量 20, 每秒補 20/60 個)"""
+    count, _, period = rate.partition("/")
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period.strip()]
+
+
+class MemoryRateLimitBackend:
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated_at)
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> Tuple[bool, int]:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+        allowed = tokens >= 1
+        retry_after = 0
+        if allowed:
+            tokens -= 1
+        else:
+            retry_after = math.ceil((1 - tokens) / refill_per_second)
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+# KEYS: 桶；ARGV: 容量, 每毫秒補充量。時間取 Redis 伺服器的 TIME，各 worker 時鐘不同步也沒關係
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed, retry = 0, 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry = math.ceil((1 - tokens) / rate / 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate))
+return {allowed, retry}
+"""
+
+
+class RedisRateLimitBackend:
+    def __init__(self, client):
+        self.client = client
+        self._take = client.register_script(_TAKE_SCRIPT)
+
+    async def take(self, key: str, capacity: int, refill_per_second: float) -> Tuple[bool, int]:
+        allowed, retry_after = await self._take(keys=[key], args=[capacity, refill_per_second / 1000])
+        return bool(allowed), int(retry_after)
+
+
+class RateLimiter:
+    def __init__(self, backend, limits: Dict[str, str], enabled: bool = True):
+        self.backend = backend
+        self.limits = {route: parse_rate(rate) for route, rate in limits.items()}
+        self.enabled = enabled
+        # 限流本身的耗時統計
+        self.calls = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "avg_ms": self.total_seconds / self.calls * 1000 if self.calls else 0.0,
+            "max_ms": self.max_seconds * 1000,
+        }
+
+    @staticmethod
+    def identity(request: Request) -> str:
+        user_id = request_user_id(request)
+        if user_id is not None:
+            return f"u{user_id}"
+        peer = request.client.host if request.client else None
+        if settings.RATE_LIMIT_TRUST_PROXY and _is_trusted_proxy(peer):
+            forwarded = request.headers.get("x-real-ip")
+            if forwarded:
+                return f"ip{forwarded}"
+        return f"ip{peer or 'unknown'}"
+
+    async def hit(self, route: str, identity: str) -> Optional[int]:
+        """扣一個 token，超過限制時回傳 Retry-After 秒數，否則回傳 None"""
+        limit = self.limits.get(route)
+        if not self.enabled or limit is None:
+            return None
+
+        start = time.perf_counter()
+        try:
+            allowed, retry_after = await self.backend.take(f"acg:rl:{route}:{identity}", *limit)
+        except Exception as e:
+            logger.warning("rate limiter unavailable, allowing request: %s", e)
+            allowed, retry_after = True, 0
+        elapsed = time.perf_counter() - start
+
+        self.calls += 1
+        self.total_seconds += elapsed
+        self.max_seconds = max(self.max_seconds, elapsed)
+        if allowed:
+            return None
+        self.rejected += 1
+        return max(retry_after, 1)
+
+
+def _create_rate_limiter() -> RateLimiter:
+    client = redis_handler.get_client()
+    backend = RedisRateLimitBackend(client) if client is not None \
+        else MemoryRateLimitBackend(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+    return RateLimiter(backend, settings.RATE_LIMITS, enabled=settings.RATE_LIMIT_ENABLED)
+
+
+rate_limiter = _create_rate_limiter()
+
+
+def rate_limit(route: str):
+    """
+    路由的限流 dependency：@router.post(..., dependencies=[Depends(rate_limit("create_post"))])
+
+    多個路由可共用同一個名稱，共用同一組額度。
+    """
+    async def dependency(request: Request):
+        retry_after = await rate_limiter.hit(route, rate_limiter.identity(request))
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(retry_after)},
+            )
+    return dependency
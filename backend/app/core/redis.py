@@ -0,0 +1,28 @@
+from typing import Optional
+from redis import asyncio as aioredis
+from app.core.config import settings
+
+class RedisHandler:
+    """
+    共用的 Redis 連線 (連線池在第一次使用時才建立)
+
+    沒有設定 REDIS_URL 時 get_client() 回傳 None，
+    各模組據此改用行程內的替代實作。
+    """
+    def __init__(self):
+        self.redis_url = settings.REDIS_URL
+        self.client: Optional[aioredis.Redis] = None
+
+    def get_client(self) -> Optional[aioredis.Redis]:
+        if not self.redis_url:
+            return None
+        if self.client is None:
+            self.client = aioredis.from_url(self.redis_url)
+        return self.client
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+redis_handler = RedisHandler()
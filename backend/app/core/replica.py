@@ -0,0 +1,80 @@
+# app/core/replica.py
+#
+# 讀寫分離：列表類的唯讀端點用 get_read_session 讀副本，寫入一律在主庫
+#
+# 副本有複寫延遲，剛發文 / 留言的人馬上重新整理可能看不到自己的內容。
+# 因此非 GET 請求成功後，ReadYourWritesMiddleware 會把該使用者標記 READ_YOUR_WRITES_SECONDS 秒
+# (記在共用快取，多個 worker 都看得到)，期間他的讀取仍走主庫。
+# 沒有設定 DATABASE_REPLICA_URL 時 get_read_session 等同 get_session，不做任何額外檢查。
+# 列表快取是共用的：寫入後第一個讀到的人若走副本，可能把寫入前的頁面放進新版本的鍵。
+# 因此讀主庫的 recent writer 不讀共用快取也不回 304 (reads_primary())，
+# 而是直接查主庫並把結果寫回快取，順便蓋掉副本放進去的舊頁面。
+# 標記在回應開始送出時 (http.response.start) 就寫入，客戶端收完回應後的下一個請求一定看得到。
+
+from typing import AsyncIterator
+
+from fastapi import Request
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.db import async_read_session, async_session, engine, read_engine
+from app.core.security import request_user_id
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def replica_enabled() -> bool:
+    return read_engine is not engine
+
+
+def _writer_key(user_id: int) -> str:
+    return f"ryw:u{user_id}"
+
+
+async def mark_recent_writer(user_id: int):
+    await cache.set(_writer_key(user_id), 1, settings.READ_YOUR_WRITES_SECONDS)
+
+
+async def is_recent_writer(user_id: int) -> bool:
+    return await cache.get(_writer_key(user_id)) is not None
+
+
+async def get_read_session(request: Request) -> AsyncIterator[AsyncSession]:
+    """唯讀端點的 DB Session：讀副本，剛寫入過的使用者讀主庫"""
+    factory = async_session
+    if replica_enabled():
+        user_id = request_user_id(request)
+        if user_id is None or not await is_recent_writer(user_id):
+            factory = async_read_session
+        else:
+            request.state.recent_writer = True
+    async with factory() as session:
+        yield session
+
+
+def reads_primary(request: Request) -> bool:
+    """這次讀取是否因為剛寫入過而改讀主庫 (要在 get_read_session 之後呼叫)；是的話應略過共用快取與 304"""
+    return getattr(request.state, "recent_writer", False)
+
+
+class ReadYourWritesMiddleware:
+    """非 GET 請求成功 (2xx / 3xx) 時標記該使用者，之後幾秒的讀取改走主庫"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not replica_enabled():
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            # 在回應開始送出前標記：客戶端一收到回應就發的下一個讀取也會走主庫
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                user_id = request_user_id(Request(scope))
+                if user_id is not None:
+                    await mark_recent_writer(user_id)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
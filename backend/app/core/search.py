@@ -0,0 +1,154 @@
+# app/core/search.py
+#
+# 文章 / 留言的全文搜尋
+#
+# 論壇內容以繁體中文為主，沒有空白斷詞，因此在 Python 端先把中日韓文字切成
+# 重疊的 bigram (索引時另加 unigram，支援單字查詢)，其他文字依單字切開，
+# 再交給資料庫的全文索引：PostgreSQL 用 tsvector + GIN，SQLite 用 FTS5。
+# 索引文件與文章 / 留言寫在同一個交易裡。
+
+import re
+import unicodedata
+from typing import List, Optional
+
+from sqlalchemy import and_, case, column, delete, func, insert, literal_column, table
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.post import Comment, Post
+from app.models.search import SearchDocument
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"  # 假名 / 漢字 / 韓文
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[^\W_{_CJK}]+")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+
+SNIPPET_LENGTH = 200
+
+# SQLite 的 FTS5 虛擬表 (見 app.models.search)
+_search_fts = table("search_fts", column("rowid"))
+
+
+def tokenize(content: str, for_query: bool = False) -> List[str]:
+    tokens: List[str] = []
+    for run in _TOKEN_RE.findall(unicodedata.normalize("NFKC", content).lower()):
+        if not _CJK_RE.match(run):
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            if not for_query:
+                tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _document(kind: str, ref_id: int, post_id: int, board_id: int, author_id: int, created_at, content: str):
+    return SearchDocument(
+        kind=kind,
+        ref_id=ref_id,
+        post_id=post_id,
+        board_id=board_id,
+        author_id=author_id,
+        created_at=created_at,
+        tokens=" ".join(tokenize(content)),
+    )
+
+
+def post_document(post: Post) -> SearchDocument:
+    # 已封存的文章內文只剩摘要 (app/core/archive.py)
+    return _document("post", post.id, post.id, post.board_id, post.owner_id, post.created_at,
+                     f"{post.title}\n{post.content or post.excerpt or ''}")
+
+
+def comment_document(comment: Comment, board_id: int) -> SearchDocument:
+    return _document("comment", comment.id, comment.post_id, board_id, comment.user_id, comment.created_at,
+                     comment.content)
+
+
+async def search(
+    session: AsyncSession,
+    query: str,
+    board_id: Optional[int] = None,
+    author_id: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0,
+):
+    terms = tokenize(query, for_query=True)
+    if not terms:
+        return []
+
+    # 已封存的文章內文清空了，摘要以 excerpt 代替
+    post_text = case((Post.archived_at.is_(None), Post.content), else_=Post.excerpt)
+    if session.get_bind().dialect.name == "postgresql":
+        config = literal_column("'simple'::regconfig")
+        document = func.to_tsvector(config, SearchDocument.tokens)  # 與 GIN 表達式索引一致
+        ts_query = func.plainto_tsquery(config, " ".join(terms))
+        rank = func.ts_rank_cd(document, ts_query)
+        statement = select(SearchDocument, Post.title, Comment.content, post_text, rank.label("rank")) \
+            .where(document.op("@@")(ts_query))
+    else:
+        rank = -func.bm25(literal_column("search_fts"))
+        match = " ".join('"%s"' % term for term in terms)
+        statement = select(SearchDocument, Post.title, Comment.content, post_text, rank.label("rank")) \
+            .join(_search_fts, _search_fts.c.rowid == SearchDocument.id) \
+            .where(literal_column("search_fts").op("MATCH")(match))
+
+    statement = statement \
+        .join(Post, and_(Post.id == SearchDocument.post_id, Post.deleted_at.is_(None))) \
+        .outerjoin(Comment, and_(SearchDocument.kind == "comment", Comment.id == SearchDocument.ref_id))
+    if board_id:
+        statement = statement.where(SearchDocument.board_id == board_id)
+    if author_id:
+        statement = statement.where(SearchDocument.author_id == author_id)
+    statement = statement.order_by(literal_column("rank").desc(), SearchDocument.id.desc()).offset(offset).limit(limit)
+
+    rows = (await session.exec(statement)).all()
+    return [
+        {
+            "kind": doc.kind,
+            "post_id": doc.post_id,
+            "comment_id": doc.ref_id if doc.kind == "comment" else None,
+            "board_id": doc.board_id,
+            "author_id": doc.author_id,
+            "created_at": doc.created_at,
+            "title": title,
+            "snippet": (comment_content if doc.kind == "comment" else post_content)[:SNIPPET_LENGTH],
+            "rank": float(score),
+        }
+        for doc, title, comment_content, post_content, score in rows
+    ]
+
+
+async def _insert_documents(session: AsyncSession, documents: List[SearchDocument]):
+    # 重建時走多列 INSERT，不經過 ORM 的逐筆 flush
+    await session.exec(insert(SearchDocument), params=[doc.model_dump(exclude={"id"}) for doc in documents])
+    await session.commit()
+
+
+async def reindex(session: AsyncSession, batch_size: int = 2000) -> int:
+    """清空並重建所有索引文件 (依 id 分批寫入)，回傳文件數"""
+    await session.exec(delete(SearchDocument))
+    await session.commit()
+
+    total = 0
+    last_id = 0
+    while True:
+        statement = select(Post).where(Post.id > last_id, Post.deleted_at.is_(None)).order_by(Post.id).limit(batch_size)
+        posts = (await session.exec(statement)).all()
+        if not posts:
+            break
+        await _insert_documents(session, [post_document(post) for post in posts])
+        total += len(posts)
+        last_id = posts[-1].id
+
+    last_id = 0
+    while True:
+        statement = select(Comment, Post.board_id).join(Post, Post.id == Comment.post_id) \
+            .where(Comment.id > last_id, Post.deleted_at.is_(None)).order_by(Comment.id).limit(batch_size)
+        rows = (await session.exec(statement)).all()
+        if not rows:
+            break
+        await _insert_documents(session, [comment_document(comment, board_id) for comment, board_id in rows])
+        total += len(rows)
+        last_id = rows[-1][0].id
+    return total
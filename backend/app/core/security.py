@@ -1,10 +1,14 @@
 # app/core/security.py
 
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import jwt, JWTError
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.orm import make_transient_to_detached
+from app.core.cache import cache
 from app.core.config import settings
 from app.core.db import AsyncSession, get_session
 from app.models.user import User
@@ -27,10 +31,79 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), 
-    session: AsyncSession = Depends(get_session)
-) -> User:
+# 快取的使用者快照欄位；需要其他欄位的端點請自己從資料庫讀取
+SNAPSHOT_FIELDS = {"id", "username", "nickname", "bg_left", "bg_middle", "bg_right", "is_active", "is_superuser"}
+
+class UserCache:
+    """
+    token → 使用者快照的快取，省掉每個已登入請求的 select(User)
+
+    - 解碼過的 token 只留在行程內 (有上限的 LRU)，直到 token 本身過期
+    - 使用者快照放在共用快取 (有 REDIS_URL 時跨 worker 共享)，TTL 為 USER_CACHE_TTL_SECONDS
+    - 快照只含 SNAPSHOT_FIELDS (驗證與公開顯示需要的欄位)，email / 密碼雜湊不會進快取
+    - 個人資料或 is_active 異動後必須呼叫 invalidate()
+    """
+    def __init__(self, max_tokens: int, ttl: int):
+        self.max_tokens = max_tokens
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._tokens: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()  # token -> (exp, user_id)
+
+    def decode(self, token: str) -> int:
+        """回傳 token 的 user id；無效或過期時丟出 JWTError / ValueError"""
+        entry = self._tokens.get(token)
+        if entry is not None and entry[0] > time.time():
+            self._tokens.move_to_end(token)
+            return entry[1]
+
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        user_id = int(payload["sub"]) if payload.get("sub") is not None else None
+        if user_id is None:
+            raise ValueError("token has no subject")
+
+        self._tokens[token] = (payload.get("exp", time.time() + self.ttl), user_id)
+        while len(self._tokens) > self.max_tokens:
+            self._tokens.popitem(last=False)
+        return user_id
+
+    async def get_snapshot(self, user_id: int, session: AsyncSession) -> Optional[dict]:
+        key = f"user:{user_id}"
+        snapshot = await cache.get(key)
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+
+        self.misses += 1
+        statement = select(User).where(User.id == user_id)
+        result = await session.exec(statement)
+        user = result.first()
+        if user is None:
+            return None
+        snapshot = user.model_dump(mode="json", include=SNAPSHOT_FIELDS)
+        await cache.set(key, snapshot, self.ttl)
+        return snapshot
+
+    async def invalidate(self, user_id: int):
+        await cache.delete(f"user:{user_id}")
+
+user_cache = UserCache(settings.USER_CACHE_MAX_TOKENS, settings.USER_CACHE_TTL_SECONDS)
+
+def request_user_id(request: Request) -> Optional[int]:
+    """
+    從 Authorization header 取出 user id (不查資料庫、不檢查帳號狀態)
+
+    給限流 / 讀寫分離這類只需要辨識身分的地方用；無效的 token 視為匿名，交給後續的驗證處理。
+    """
+    authorization = request.headers.get("authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        return user_cache.decode(authorization[7:])
+    except (JWTError, ValueError):
+        return None
+
+async def _get_active_snapshot(token: str, session: AsyncSession) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -38,21 +111,41 @@ async def get_current_user(
     )
     try:
         # 解碼 JWT
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+        user_id = user_cache.decode(token)
+    except (JWTError, ValueError):
         raise credentials_exception
     
-    # 從資料庫獲取使用者
-    statement = select(User).where(User.id == int(user_id))
-    result = await session.exec(statement)
-    user = result.first()
+    # 先查快取，miss 時才到資料庫獲取使用者
+    snapshot = await user_cache.get_snapshot(user_id, session)
     
-    if user is None:
+    if snapshot is None:
         raise credentials_exception
-    if not user.is_active:
+    if not snapshot["is_active"]:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
         
-    return user
\ No newline at end of file
+    return snapshot
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), 
+    session: AsyncSession = Depends(get_session)
+) -> User:
+    snapshot = await _get_active_snapshot(token, session)
+    # 從快照重建的物件視為 detached，可以掛到關聯上；只有 SNAPSHOT_FIELDS 有值，
+    # 讀取其他欄位 (email 等) 會丟出 DetachedInstanceError，不要 session.merge() 回資料庫
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+async def get_current_user_id(
+    token: str = Depends(oauth2_scheme), 
+    session: AsyncSession = Depends(get_session)
+) -> int:
+    """只需要使用者 id 的端點用這個，快取命中時完全不建立 ORM 物件"""
+    snapshot = await _get_active_snapshot(token, session)
+    return snapshot["id"]
+
+async def get_current_superuser(current_user: User = Depends(get_current_user)) -> User:
+    """管理端點用：不是管理員時回 403"""
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough privileges")
+    return current_user
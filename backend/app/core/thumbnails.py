@@ -0,0 +1,42 @@
+# app/core/thumbnails.py
+#
+# 圖片縮圖的純 CPU 運算，在 process pool 的子行程中執行。
+# 這個模組刻意只依賴 Pillow，子行程 import 時不會載入整個 app。
+
+import io
+from typing import List, Sequence, Tuple
+
+from PIL import Image, ImageOps, features
+
+# 原始尺寸上限 (像素數)，超過時 Pillow 會丟出 DecompressionBombError
+Image.MAX_IMAGE_PIXELS = 60_000_000
+
+QUALITY = {"webp": 80, "avif": 60}
+
+
+def supported_formats(formats: Sequence[str]) -> List[str]:
+    return [fmt for fmt in formats if features.check(fmt)]
+
+
+def render_variants(data: bytes, widths: Sequence[int], formats: Sequence[str]) -> List[Tuple[int, str, bytes]]:
+    """
+    把原圖縮成各個寬度與格式，回傳 [(寬度, 格式, 檔案內容)]
+
+    只產生比原圖窄的版本 (不放大)；動畫只取第一格。
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "P") else "RGB")
+
+        variants = []
+        for width in sorted(set(widths)):
+            if width >= image.width:
+                continue
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            for fmt in supported_formats(formats):
+                buffer = io.BytesIO()
+                resized.save(buffer, format=fmt.upper(), quality=QUALITY.get(fmt, 80))
+                variants.append((width, fmt, buffer.getvalue()))
+        return variants
@@ -0,0 +1,178 @@
+# app/core/user_stats.py
+#
+# 個人頁的統計 (user_stats)：文章數、留言數、自己的文章收到的讚 / 倒讚，以及最近動態
+#
+# 以前要看一個人的活動只能對 posts / comments 做彙總，改成一人一列的預先計算表：
+# - 發文 / 留言 / 投票 / 刪文在同一個交易內以原子的 upsert 增量更新 (新使用者第一次有動作時建立統計列)
+# - 只算看得到的內容：刪除的文章連同底下的留言一起扣掉；封存的討論串留言搬到快照，
+#   留言數跟著扣掉，文章數與收到的票保留 (文章列還在)
+# - rebuild() 依 id 分批從 posts / comments 重算，只改寫有偏差的列
+#   (python -m app.cli rebuild-user-stats 或 "users.rebuild_stats" 背景工作)
+# - 最近動態 (文章與留言合併、新到舊) 經過快取，這個人發文 / 留言 / 內容被移除時呼叫端 bump user_scope
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, or_, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.db import async_session, dialect_insert
+from app.core.jobs import job_queue
+from app.core.post_fields import make_excerpt
+from app.models.post import Comment, Post
+from app.models.user import User, UserStats
+
+logger = logging.getLogger(__name__)
+
+REBUILD_JOB = "users.rebuild_stats"
+
+
+async def _add(session: AsyncSession, user_id: int, **deltas: int):
+    insert = dialect_insert(session)
+    statement = insert(UserStats).values(user_id=user_id, **deltas)
+    await session.exec(statement.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={name: getattr(UserStats, name) + delta for name, delta in deltas.items()},
+    ))
+
+
+async def posts_added(session: AsyncSession, user_id: int, delta: int = 1):
+    await _add(session, user_id, post_count=delta)
+
+
+async def comments_added(session: AsyncSession, user_id: int, delta: int = 1):
+    await _add(session, user_id, comment_count=delta)
+
+
+async def votes_received(session: AsyncSession, user_id: int, up: int, down: int):
+    """文章作者收到的讚 +up、倒讚 +down (可為負)"""
+    if up or down:
+        await _add(session, user_id, upvotes_received=up, downvotes_received=down)
+
+
+async def thread_comments_removed(session: AsyncSession, post_id: int) -> List[int]:
+    """一篇文章的留言全部移除 (刪文 / 封存) 時扣掉每個留言者的留言數，回傳這些人的 id"""
+    user_ids = (await session.exec(select(Comment.user_id).where(Comment.post_id == post_id).distinct())).all()
+    if user_ids:
+        removed = select(func.count()).where(Comment.post_id == post_id, Comment.user_id == UserStats.user_id)
+        await session.exec(
+            update(UserStats)
+            .where(UserStats.user_id.in_(user_ids))
+            .values(comment_count=UserStats.comment_count - removed.scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+    return list(user_ids)
+
+
+async def post_removed(session: AsyncSession, post: Post) -> List[int]:
+    """post.deleted_at 已設定時呼叫：扣掉作者的這篇與它收到的票、留言者的留言，回傳受影響的使用者 id"""
+    await session.flush()
+    counts = select(Post.upvotes, Post.downvotes).where(Post.id == post.id).subquery()
+    await session.exec(
+        update(UserStats)
+        .where(UserStats.user_id == post.owner_id)
+        .values(
+            post_count=UserStats.post_count - 1,
+            upvotes_received=UserStats.upvotes_received - select(counts.c.upvotes).scalar_subquery(),
+            downvotes_received=UserStats.downvotes_received - select(counts.c.downvotes).scalar_subquery(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    commenters = await thread_comments_removed(session, post.id)
+    return sorted({post.owner_id, *commenters})
+
+
+# --- 重算 ---
+def _live_posts():
+    # 這個人未刪除的文章 (走 ix_posts_owner_created_id 這個 partial index)
+    return (Post.owner_id == UserStats.user_id, Post.deleted_at.is_(None))
+
+
+async def rebuild(session: AsyncSession) -> int:
+    """從 posts / comments 重算所有使用者 (沒有統計列的先補上)，依 id 分批，回傳被修正的人數"""
+    post_count = select(func.count()).where(*_live_posts()).scalar_subquery()
+    upvotes = select(func.coalesce(func.sum(Post.upvotes), 0)).where(*_live_posts()).scalar_subquery()
+    downvotes = select(func.coalesce(func.sum(Post.downvotes), 0)).where(*_live_posts()).scalar_subquery()
+    comment_count = select(func.count()).select_from(Comment).join(Post, Post.id == Comment.post_id) \
+        .where(Comment.user_id == UserStats.user_id, Post.deleted_at.is_(None)).scalar_subquery()
+
+    fixed = 0
+    last_id = 0
+    while True:
+        statement = select(User.id).where(User.id > last_id).order_by(User.id).limit(settings.USER_STATS_BATCH_SIZE)
+        user_ids = (await session.exec(statement)).all()
+        if not user_ids:
+            return fixed
+        insert = dialect_insert(session)
+        await session.exec(insert(UserStats).values([{"user_id": user_id} for user_id in user_ids]).on_conflict_do_nothing())
+        result = await session.exec(
+            update(UserStats)
+            .where(UserStats.user_id.in_(user_ids))
+            .where(or_(
+                UserStats.post_count != post_count,
+                UserStats.comment_count != comment_count,
+                UserStats.upvotes_received != upvotes,
+                UserStats.downvotes_received != downvotes,
+            ))
+            .values(
+                post_count=post_count, comment_count=comment_count,
+                upvotes_received=upvotes, downvotes_received=downvotes,
+                refreshed_at=datetime.utcnow(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        fixed += result.rowcount
+        last_id = user_ids[-1]
+
+
+@job_queue.handler(REBUILD_JOB)
+async def rebuild_all() -> int:
+    async with async_session() as session:
+        fixed = await rebuild(session)
+    logger.info("user stats rebuilt: %d users corrected", fixed)
+    return fixed
+
+
+async def ensure(session: AsyncSession):
+    """第一次部署 (user_stats 還是空的) 時從現有資料重算"""
+    if (await session.exec(select(UserStats.user_id).limit(1))).first() is not None:
+        return
+    if (await session.exec(select(User.id).limit(1))).first() is not None:
+        logger.info("user_stats is empty, rebuilding from posts and comments")
+        await rebuild(session)
+
+
+# --- 最近動態 ---
+async def recent_activity(session: AsyncSession, user_id: int, limit: Optional[int] = None) -> List[Dict]:
+    """這個人最近的文章與留言 (新到舊合併，各自走 owner / user 的複合索引)，可直接 JSON 序列化"""
+    limit = limit or settings.USER_ACTIVITY_LIMIT
+    preview = func.coalesce(Post.excerpt, func.substr(Post.content, 1, settings.POST_EXCERPT_LENGTH))
+    posts = (await session.exec(
+        select(Post.id, Post.board_id, Post.title, preview.label("excerpt"), Post.created_at)
+        .where(Post.owner_id == user_id, Post.deleted_at.is_(None))
+        .order_by(Post.created_at.desc(), Post.id.desc()).limit(limit)
+    )).all()
+    comments = (await session.exec(
+        select(Comment.id, Comment.post_id, Comment.content, Comment.created_at, Post.board_id, Post.title)
+        .join(Post, Post.id == Comment.post_id)
+        .where(Comment.user_id == user_id, Post.deleted_at.is_(None))
+        .order_by(Comment.created_at.desc(), Comment.id.desc()).limit(limit)
+    )).all()
+
+    items = [
+        {"kind": "post", "post_id": row.id, "comment_id": None, "board_id": row.board_id,
+         "title": row.title, "excerpt": row.excerpt, "created_at": row.created_at}
+        for row in posts
+    ] + [
+        {"kind": "comment", "post_id": row.post_id, "comment_id": row.id, "board_id": row.board_id,
+         "title": row.title, "excerpt": make_excerpt(row.content), "created_at": row.created_at}
+        for row in comments
+    ]
+    items.sort(key=lambda item: item["created_at"], reverse=True)
+    for item in items:
+        item["created_at"] = item["created_at"].isoformat()
+    return items[:limit]
@@ -0,0 +1,351 @@
+# app/core/vote_buffer.py
+#
+# 投票的 write-behind 緩衝 (VOTE_BUFFER_ENABLED=true 時啟用)
+#
+# 熱門文章被大量點擊時，每次投票都寫 votes + posts 會集中在同幾列上互相等待。
+# 緩衝模式下 vote_post 只在快取層記下「這個人對這篇目前的狀態」並立刻回應，
+# 背景的 flusher 每 VOTE_BUFFER_FLUSH_MS 把累積的變化一次寫回資料庫：
+#
+# - 同一人反覆點擊只保留 (flush 前的狀態, 最新狀態)，來回切換抵銷後不寫入
+# - votes 以多列 upsert / 一次 DELETE 寫入，posts 的計數每篇一次 UPDATE
+# - 寫入後更新排行、列表快取，並發出 post.updated 事件
+#
+# 有 REDIS_URL 時狀態放在 Redis (多個 worker 共用，Lua 保證單次點擊的原子性)，
+# 否則放在行程內。關機時 lifespan 會呼叫 stop()，把剩下的變化全部寫回。
+# 每個鍵是 (post_id, user_id)，值為 1 / -1 / 0 (未投票)。
+
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, tuple_
+from sqlmodel import select
+
+from app.core import user_stats
+from app.core.cache import board_scope, cache
+from app.core.config import settings
+from app.core.counters import add_vote_counts
+from app.core.db import async_session, dialect_insert
+from app.core.pubsub import board_channels, event_bus, post_channel, post_updated_event
+from app.core.ranking import ranking
+from app.core.redis import redis_handler
+from app.models.post import Post, Vote
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[int, int]            # (post_id, user_id)
+Change = Tuple[int, int]         # (資料庫中的狀態, 最新狀態)
+
+
+def _toggle(current: int, dir: int) -> int:
+    """同方向再按一次 = 收回，否則改成 dir (與 write_vote 相同的語意)"""
+    return 0 if current == dir else dir
+
+
+class MemoryVoteStore:
+    """
+    行程內的投票狀態
+
+    pending 是尚未寫回的變化，inflight 是 flusher 正在寫的那一批 (寫入成功的部分會立刻移除，
+    失敗的部分下次重試)。
+    states 只是已寫回狀態的 LRU 快取，被淘汰時再從資料庫讀即可。
+    """
+
+    def __init__(self, max_states: int):
+        self.max_states = max_states
+        self.states: "OrderedDict[Key, int]" = OrderedDict()
+        self.pending: Dict[Key, Change] = {}
+        self.inflight: Dict[Key, Change] = {}
+
+    async def current(self, key: Key) -> Optional[int]:
+        for changes in (self.pending, self.inflight):
+            if key in changes:
+                return changes[key][1]
+        return self.states.get(key)
+
+    async def toggle(self, key: Key, dir: int, db_state: int) -> Tuple[int, int]:
+        current = await self.current(key)
+        if current is None:
+            current = db_state
+        new = _toggle(current, dir)
+        base = self.pending[key][0] if key in self.pending else current
+        self.pending[key] = (base, new)
+        self.states[key] = new
+        self.states.move_to_end(key)
+        while len(self.states) > self.max_states:
+            self.states.popitem(last=False)
+        return current, new
+
+    async def acquire(self, timeout: int) -> bool:
+        return True  # 單一行程內由 VoteBuffer 的 asyncio.Lock 保證互斥
+
+    async def release(self):
+        pass
+
+    async def take(self) -> Dict[Key, Change]:
+        if not self.inflight:
+            self.inflight, self.pending = self.pending, {}
+        return dict(self.inflight)
+
+    async def done(self, keys: List[Key]):
+        for key in keys:
+            self.inflight.pop(key, None)
+
+    async def pending_count(self) -> int:
+        return len(self.pending) + len(self.inflight)
+
+
+# KEYS: pending hash, inflight hash, 狀態鍵；ARGV: 欄位, dir, 資料庫中的狀態, 狀態 TTL
+_TOGGLE_SCRIPT = """
+local function final(change)
+    return tonumber(string.sub(change, string.find(change, ':', 1, true) + 1))
+end
+local pending = redis.call('HGET', KEYS[1], ARGV[1])
+local base, current
+if pending then
+    base = string.sub(pending, 1, string.find(pending, ':', 1, true) - 1)
+    current = final(pending)
+else
+    local inflight = redis.call('HGET', KEYS[2], ARGV[1])
+    if inflight then
+        current = final(inflight)
+    else
+        current = tonumber(redis.call('GET', KEYS[3]) or ARGV[3])
+    end
+    base = current
+end
+local dir = tonumber(ARGV[2])
+local new = dir
+if current == dir then new = 0 end
+redis.call('HSET', KEYS[1], ARGV[1], base .. ':' .. new)
+redis.call('SET', KEYS[3], new, 'EX', ARGV[4])
+return {current, new}
+"""
+
+# 上一批還沒寫完 (例如寫入失敗) 就重試那一批，否則把 pending 整批換成 inflight
+_TAKE_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    if redis.call('EXISTS', KEYS[1]) == 0 then return {} end
+    redis.call('RENAME', KEYS[1], KEYS[2])
+end
+return redis.call('HGETALL', KEYS[2])
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+
+class RedisVoteStore:
+    PENDING = "acg:votes:pending"
+    INFLIGHT = "acg:votes:inflight"
+    LOCK = "acg:votes:flush-lock"
+
+    def __init__(self, client, state_ttl: int):
+        self.client = client
+        self.state_ttl = state_ttl
+        self._toggle = client.register_script(_TOGGLE_SCRIPT)
+        self._take = client.register_script(_TAKE_SCRIPT)
+        self._release = client.register_script(_RELEASE_SCRIPT)
+        self._lock_token: Optional[str] = None
+
+    @staticmethod
+    def _field(key: Key) -> str:
+        return f"{key[0]}:{key[1]}"
+
+    @staticmethod
+    def _state_key(key: Key) -> str:
+        return f"acg:votes:state:{key[0]}:{key[1]}"
+
+    async def current(self, key: Key) -> Optional[int]:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hget(self.PENDING, self._field(key))
+        pipe.hget(self.INFLIGHT, self._field(key))
+        pipe.get(self._state_key(key))
+        pending, inflight, state = await pipe.execute()
+        for change in (pending, inflight):
+            if change is not None:
+                return int(change.split(b":")[1])
+        return int(state) if state is not None else None
+
+    async def toggle(self, key: Key, dir: int, db_state: int) -> Tuple[int, int]:
+        current, new = await self._toggle(
+            keys=[self.PENDING, self.INFLIGHT, self._state_key(key)],
+            args=[self._field(key), dir, db_state, self.state_ttl],
+        )
+        return int(current), int(new)
+
+    async def acquire(self, timeout: int) -> bool:
+        """多個 worker 的 flusher 互斥，避免兩批變化以錯誤的順序寫回"""
+        token = uuid.uuid4().hex
+        if await self.client.set(self.LOCK, token, nx=True, ex=timeout):
+            self._lock_token = token
+            return True
+        return False
+
+    async def release(self):
+        if self._lock_token is not None:
+            await self._release(keys=[self.LOCK], args=[self._lock_token])
+            self._lock_token = None
+
+    async def take(self) -> Dict[Key, Change]:
+        raw = await self._take(keys=[self.PENDING, self.INFLIGHT])
+        changes = {}
+        for field, value in zip(raw[::2], raw[1::2]):
+            post_id, user_id = field.split(b":")
+            base, final = value.split(b":")
+            changes[(int(post_id), int(user_id))] = (int(base), int(final))
+        return changes
+
+    async def done(self, keys: List[Key]):
+        if keys:
+            await self.client.hdel(self.INFLIGHT, *[self._field(key) for key in keys])
+
+    async def pending_count(self) -> int:
+        return await self.client.hlen(self.PENDING) + await self.client.hlen(self.INFLIGHT)
+
+
+class VoteBuffer:
+    def __init__(self, store, flush_interval: float, batch_size: int):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def vote(self, session, post_id: int, user_id: int, dir: int) -> Optional[Tuple[int, int]]:
+        """
+        記下一次點擊，回傳 (舊狀態, 新狀態)；文章不存在時回傳 None
+
+        只有快取層沒有這個人的狀態時才讀一次資料庫 (文章是否存在 + 目前的票)，不寫資料庫。
+        """
+        key = (post_id, user_id)
+        db_state = await self.store.current(key)
+        if db_state is None:
+            statement = select(Post.id, Vote.dir) \
+                .outerjoin(Vote, and_(Vote.post_id == Post.id, Vote.user_id == user_id)) \
+                .where(Post.id == post_id, Post.deleted_at.is_(None), Post.archived_at.is_(None))
+            row = (await session.exec(statement)).first()
+            if row is None:
+                return None
+            db_state = row[1] or 0
+        return await self.store.toggle(key, dir, db_state)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止背景 flusher，並把剩下的變化全部寫回"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            while await self.flush():
+                pass
+        except Exception as e:
+            logger.error("vote flush on shutdown failed, %s changes left: %s", await self.pending_count(), e)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning("vote flush failed: %s", e)
+
+    async def flush(self) -> int:
+        """寫回一批變化，回傳寫入的投票數 (0 = 沒有待寫入的變化)"""
+        async with self._lock:
+            if not await self.store.acquire(timeout=60):
+                return 0  # 其他 worker 正在寫
+            try:
+                changes = await self.store.take()
+                if not changes:
+                    return 0
+                return await self._write(changes)
+            finally:
+                await self.store.release()
+
+    async def _write(self, changes: Dict[Key, Change]) -> int:
+        # 來回切換後與資料庫相同的就不用寫
+        await self.store.done([key for key, (base, final) in changes.items() if base == final])
+        items = [(key, change) for key, change in changes.items() if change[0] != change[1]]
+        updated = []
+        for start in range(0, len(items), self.batch_size):
+            batch = dict(items[start:start + self.batch_size])
+            updated.extend(await self._write_batch(batch))
+            # 每批 commit 後就移出 inflight，之後的批次失敗也不會重複套用計數
+            await self.store.done(list(batch))
+
+        for counters in updated:
+            await ranking.update_post(counters)
+            await event_bus.publish([post_channel(counters.id), *board_channels(counters.board_id)],
+                                    post_updated_event(counters))
+        board_ids = {counters.board_id for counters in updated}
+        if board_ids:
+            await cache.bump(*[board_scope(board_id) for board_id in board_ids], board_scope(None))
+        return len(changes)
+
+    async def _write_batch(self, changes: Dict[Key, Change]) -> List:
+        async with async_session() as session:
+            # 緩衝期間被刪除 / 封存的文章，它的票直接丟掉
+            post_ids = {post_id for post_id, _ in changes}
+            existing = set((await session.exec(select(Post.id).where(Post.id.in_(post_ids), Post.deleted_at.is_(None), Post.archived_at.is_(None)))).all())
+            changes = {key: change for key, change in changes.items() if key[0] in existing}
+            if not changes:
+                return []
+
+            removed = [(user_id, post_id) for (post_id, user_id), (_, final) in changes.items() if final == 0]
+            upserts = [
+                {"user_id": user_id, "post_id": post_id, "dir": final}
+                for (post_id, user_id), (_, final) in changes.items() if final != 0
+            ]
+            if removed:
+                await session.exec(delete(Vote).where(tuple_(Vote.user_id, Vote.post_id).in_(removed)))
+            if upserts:
+                insert = dialect_insert(session)
+                statement = insert(Vote).values(upserts)
+                await session.exec(statement.on_conflict_do_update(
+                    index_elements=["user_id", "post_id"], set_={"dir": statement.excluded.dir}
+                ))
+
+            deltas = defaultdict(lambda: [0, 0])
+            for (post_id, _), (base, final) in changes.items():
+                deltas[post_id][0] += (final == 1) - (base == 1)
+                deltas[post_id][1] += (final == -1) - (base == -1)
+            updated = []
+            for post_id, (up, down) in deltas.items():
+                if up or down:
+                    counters = await add_vote_counts(session, post_id, up, down)
+                    if counters is not None:
+                        await user_stats.votes_received(session, counters.owner_id, up, down)
+                    updated.append(counters)
+            await session.commit()
+            return [counters for counters in updated if counters is not None]
+
+    async def pending_count(self) -> int:
+        return await self.store.pending_count()
+
+
+def _create_vote_buffer() -> VoteBuffer:
+    client = redis_handler.get_client()
+    if client is not None:
+        store = RedisVoteStore(client, state_ttl=settings.VOTE_BUFFER_STATE_TTL_SECONDS)
+    else:
+        store = MemoryVoteStore(max_states=settings.VOTE_BUFFER_MAX_STATES)
+    return VoteBuffer(
+        store,
+        flush_interval=settings.VOTE_BUFFER_FLUSH_MS / 1000,
+        batch_size=settings.VOTE_BUFFER_BATCH_SIZE,
+    )
+
+
+vote_buffer = _create_vote_buffer()
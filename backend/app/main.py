@@ -1,22 +1,37 @@
+import asyncio
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from sqlmodel import SQLModel, select 
 from sqlmodel.ext.asyncio.session import AsyncSession 
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import engine, read_engine, async_session
+from app.core.metrics import MetricsMiddleware, instrument_engine, metrics_response
+from app.core import board_stats, user_stats
+from app.core.ranking import ranking
+from app.core.http import http_client
+from app.core.images import image_pipeline
+from app.core.jobs import JobWorker, job_queue
+from app.core.pubsub import event_bus
+from app.core.vote_buffer import vote_buffer
+from app.core.replica import ReadYourWritesMiddleware
 from app.api.v1.boards import router as boards_router
-from app.api.v1.upload import router as upload_router
+from app.api.v1.upload import router as upload_router, UploadSizeLimitMiddleware
 
 # 匯入 Models
 from app.models.user import User
 # [修正] 必須匯入 Vote 和 Comment，這樣資料庫才會建立對應的表
 from app.models.post import Post, Vote, Comment 
-from app.models.board import Board
+from app.models.board import Board, BoardStats
+from app.models.search import SearchDocument
+from app.models.upload import UploadedImage
 
 # 匯入 Routers
 from app.api.v1.auth import router as auth_router
 from app.api.v1.posts import router as posts_router
 from app.api.v1.users import router as users_router
+from app.api.v1.search import router as search_router
+from app.api.v1.events import router as events_router
+from app.api.v1.admin import router as admin_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -46,19 +61,68 @@ async def lifespan(app: FastAPI):
                 session.add(new_board)
         
         await session.commit()
+
+        # 3. 排行是空的 (行程內模式 / Redis 被清空) 就從資料庫重建
+        await ranking.warm_up(session)
+
+        # 4. 新看板 (或第一次部署) 補上看板統計
+        await board_stats.ensure(session)
+
+        # 5. 第一次部署時從現有的文章 / 留言算出使用者統計
+        await user_stats.ensure(session)
+
+    http_client.start()
+    decay_task = asyncio.create_task(ranking.run_decay_loop(async_session))
+    board_stats_task = asyncio.create_task(board_stats.run_refresh_loop(async_session))
+    if settings.VOTE_BUFFER_ENABLED:
+        vote_buffer.start()
+    # 沒有 Redis 時背景工作在 API 行程內執行 (有 Redis 時由 `python -m app.worker` 執行)
+    job_worker = JobWorker(job_queue, settings.JOB_WORKER_CONCURRENCY) if job_queue.in_process else None
+    if job_worker is not None:
+        job_worker.start()
     yield
+    decay_task.cancel()
+    board_stats_task.cancel()
+    if settings.VOTE_BUFFER_ENABLED:
+        # 關機前把緩衝中的投票全部寫回
+        await vote_buffer.stop()
+    await event_bus.close()
+    if job_worker is not None:
+        await job_worker.stop()
+    await image_pipeline.shutdown()
+    await http_client.close()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     lifespan=lifespan
 )
 
+# 過大的圖片上傳在收完 body 之前就回 413
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# 寫入後短時間內的讀取走主庫 (只有設定 DATABASE_REPLICA_URL 時才有作用)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# 延遲 / 狀態碼 / 每個請求的 SQL 數 (最外層，計時包含其他 middleware)
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+if read_engine is not engine:
+    instrument_engine(read_engine)
+
 app.include_router(auth_router, prefix=settings.API_V1_STR)
 app.include_router(posts_router, prefix=settings.API_V1_STR)
 app.include_router(users_router, prefix=settings.API_V1_STR)
 app.include_router(boards_router, prefix=settings.API_V1_STR)
 app.include_router(upload_router, prefix=settings.API_V1_STR)
+app.include_router(search_router, prefix=settings.API_V1_STR)
+app.include_router(events_router, prefix=settings.API_V1_STR)
+app.include_router(admin_router, prefix=settings.API_V1_STR)
 
 @app.get("/")
 async def root():
-    return {"message": "ACG Forum API is running!", "docs": "/docs"}
\ No newline at end of file
+    return {"message": "ACG Forum API is running!", "docs": "/docs"}
+
+# Prometheus 抓取用 (nginx 只轉發 /api，不會對外公開)
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
\ No newline at end of file
@@ -1,3 +1,5 @@
-from .user import User
+from .user import User, UserStats
 from .post import Post
-from .board import Board
\ No newline at end of file
+from .board import Board, BoardStats
+from .search import SearchDocument
+from .upload import UploadedImage
@@ -1,5 +1,6 @@
 # app/models/board.py (新增檔案)
 
+from datetime import datetime
 from typing import Optional, List
 from sqlmodel import Field, SQLModel, Relationship
 
@@ -16,3 +17,16 @@ class Board(SQLModel, table=True):
     # 關係屬性
     posts: List["Post"] = Relationship(back_populates="board")
     manager: Optional["User"] = Relationship(back_populates="managed_boards")
+
+
+class BoardStats(SQLModel, table=True):
+    """看板列表用的預先計算統計，由發文 / 留言 / 刪文在同一個交易內增量更新 (app/core/board_stats.py)"""
+    __tablename__ = "board_stats"
+
+    board_id: int = Field(foreign_key="boards.id", primary_key=True)
+    post_count: int = Field(default=0)
+    comment_count: int = Field(default=0)
+    posts_24h: int = Field(default=0)          # 每 BOARD_STATS_REFRESH_SECONDS 重算一次，之間滿 24 小時的文章還不會扣掉
+    last_post_id: Optional[int] = Field(default=None)
+    last_post_at: Optional[datetime] = Field(default=None)
+    refreshed_at: Optional[datetime] = Field(default=None)
@@ -1,21 +1,44 @@
 from typing import Optional, List
 from sqlmodel import Field, SQLModel, Relationship
+from sqlalchemy import Index, UniqueConstraint, text
 from datetime import datetime
 
 from app.models.user import User 
 
+# 軟刪除：列表只讀 deleted_at IS NULL 的文章，partial index 只包含這些列
+_NOT_DELETED = text("deleted_at IS NULL")
+
 class Post(SQLModel, table=True):
     __tablename__ = "posts"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        # 列表分頁 (keyset) 用的複合索引：看板 / 作者 + (created_at, id)，只索引未刪除的文章
+        Index("ix_posts_board_created_id", "board_id", "created_at", "id", postgresql_where=_NOT_DELETED, sqlite_where=_NOT_DELETED),
+        Index("ix_posts_owner_created_id", "owner_id", "created_at", "id", postgresql_where=_NOT_DELETED, sqlite_where=_NOT_DELETED),
+        # 等待清除的文章 (app/core/purge.py)
+        Index(
+            "ix_posts_deleted_at", "deleted_at",
+            postgresql_where=text("deleted_at IS NOT NULL"), sqlite_where=text("deleted_at IS NOT NULL"),
+        ),
+        {"extend_existing": True},
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     content: str
+    excerpt: Optional[str] = Field(default=None)  # 列表用的截斷預覽 (app/core/post_fields.py)，舊文章為 NULL
     owner_id: int = Field(foreign_key="users.id")
     owner: "User" = Relationship(back_populates="posts")
     board_id: int = Field(foreign_key="boards.id")
     is_spoiler: bool = Field(default=False) # 防雷標記
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    deleted_at: Optional[datetime] = Field(default=None)  # 已刪除 (隱藏)，留言 / 投票由背景工作分批清除
+    archived_at: Optional[datetime] = Field(default=None) # 已封存：內文與留言移到 MinIO 的快照 (app/core/archive.py)，只剩這一列
+
+    # 反正規化計數，由 vote_post / create_comment 在同一個交易內維護
+    score: int = Field(default=0)          # upvotes - downvotes
+    upvotes: int = Field(default=0)
+    downvotes: int = Field(default=0)
+    comment_count: int = Field(default=0)
     
     owner: "User" = Relationship(back_populates="posts")
     board: "Board" = Relationship(back_populates="posts")
@@ -23,7 +46,11 @@ class Post(SQLModel, table=True):
 # --- 新增：投票模型 ---
 class Vote(SQLModel, table=True):
     __tablename__ = "votes"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        # 每人每篇只能有一票，投票時靠它做原子的 upsert
+        UniqueConstraint("user_id", "post_id", name="uq_votes_user_post"),
+        {"extend_existing": True},
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="users.id")
     post_id: int = Field(foreign_key="posts.id")
@@ -32,11 +59,23 @@ class Vote(SQLModel, table=True):
 # --- 新增：留言模型 ---
 class Comment(SQLModel, table=True):
     __tablename__ = "comments"
-    __table_args__ = {"extend_existing": True}
+    __table_args__ = (
+        # 串狀留言依 path 排序 = 深度優先的討論串順序，分頁 / 展開子回覆都走這個索引
+        Index("ix_comments_post_path", "post_id", "path"),
+        # 個人頁的最近留言 / 重算留言數
+        Index("ix_comments_user_created_id", "user_id", "created_at", "id"),
+        {"extend_existing": True},
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     content: str
     user_id: int = Field(foreign_key="users.id")
     user: "User" = Relationship() 
     post_id: int = Field(foreign_key="posts.id")
     is_spoiler: bool = Field(default=False)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    # 回覆樹：path 是從根留言到自己的 id (補零) 以 "/" 串接，見 app.core.comments
+    parent_id: Optional[int] = Field(default=None, foreign_key="comments.id")
+    path: str = Field(default="")
+    depth: int = Field(default=0)
+    reply_count: int = Field(default=0)    # 直接回覆數，讓前端顯示「載入更多回覆」
\ No newline at end of file
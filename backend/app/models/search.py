@@ -0,0 +1,51 @@
+# app/models/search.py
+
+from typing import Optional
+from datetime import datetime
+from sqlalchemy import DDL, Column, Index, Text, event
+from sqlmodel import Field, SQLModel
+
+class SearchDocument(SQLModel, table=True):
+    """
+    全文搜尋的索引文件，每篇文章 / 每則留言一筆
+
+    tokens 是 app.core.search.tokenize() 切好、以空白分隔的詞 (中日韓文字切成 bigram)，
+    PostgreSQL 以 to_tsvector('simple', tokens) 建 GIN 索引，SQLite 則同步到 FTS5 虛擬表。
+    """
+    __tablename__ = "search_documents"
+    __table_args__ = (
+        Index("ix_search_documents_kind_ref", "kind", "ref_id", unique=True),
+        {"extend_existing": True},
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str                                   # "post" / "comment"
+    ref_id: int                                 # 文章或留言的 id
+    post_id: int = Field(index=True)
+    board_id: int = Field(index=True)
+    author_id: int = Field(index=True)
+    created_at: datetime
+    tokens: str = Field(sa_column=Column(Text, nullable=False))
+
+# PostgreSQL：tsvector 表達式索引
+event.listen(
+    SearchDocument.__table__,
+    "after_create",
+    DDL(
+        "CREATE INDEX IF NOT EXISTS ix_search_documents_tsv "
+        "ON search_documents USING GIN (to_tsvector('simple', tokens))"
+    ).execute_if(dialect="postgresql"),
+)
+
+# SQLite：外部內容的 FTS5 表，用 trigger 與 search_documents 保持同步
+for statement in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts "
+    "USING fts5(tokens, content='search_documents', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_fts(rowid, tokens) VALUES (new.id, new.tokens); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, tokens) VALUES ('delete', old.id, old.tokens); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, tokens) VALUES ('delete', old.id, old.tokens); "
+    "INSERT INTO search_fts(rowid, tokens) VALUES (new.id, new.tokens); END",
+):
+    event.listen(SearchDocument.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
@@ -0,0 +1,19 @@
+# app/models/upload.py
+
+from typing import List, Optional
+from datetime import datetime
+from sqlalchemy import JSON, Column
+from sqlmodel import Field, SQLModel
+
+class UploadedImage(SQLModel, table=True):
+    """已確認存在於 MinIO 的圖片 (由 /upload/image 與直傳流程的 /upload/complete 寫入)"""
+    __tablename__ = "uploaded_images"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    object_name: str = Field(index=True, unique=True)
+    owner_id: Optional[int] = Field(default=None, foreign_key="users.id", index=True)
+    content_type: str
+    size: int
+    # 已產生的縮圖，例如 ["320.webp", "320.avif", "640.webp"]；尚未處理時為 None
+    variants: Optional[List[str]] = Field(default=None, sa_column=Column(JSON))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -24,6 +24,17 @@ class User(SQLModel, table=True):
     posts: List["Post"] = Relationship(back_populates="owner")
     managed_boards: List["Board"] = Relationship(back_populates="manager")
 
+class UserStats(SQLModel, table=True):
+    """個人頁用的預先計算統計，由發文 / 留言 / 投票在同一個交易內增量更新 (app/core/user_stats.py)"""
+    __tablename__ = "user_stats"
+
+    user_id: int = Field(foreign_key="users.id", primary_key=True)
+    post_count: int = Field(default=0)
+    comment_count: int = Field(default=0)
+    upvotes_received: int = Field(default=0)    # 自己的文章收到的讚
+    downvotes_received: int = Field(default=0)
+    refreshed_at: Optional[datetime] = Field(default=None)  # 上次由 rebuild() 校正的時間
+
 class UserPublic(SQLModel):
     id: int
     username: str
@@ -0,0 +1,21 @@
+# backend/app/schemas/board.py
+
+from datetime import datetime
+from sqlmodel import SQLModel
+from typing import Optional
+
+
+class BoardStatsRead(SQLModel):
+    post_count: int = 0
+    comment_count: int = 0
+    posts_24h: int = 0
+    last_post_id: Optional[int] = None
+    last_post_at: Optional[datetime] = None
+
+
+class BoardRead(SQLModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    manager_id: Optional[int] = None
+    stats: Optional[BoardStatsRead] = None  # 還沒有統計列時為 null
@@ -20,6 +20,10 @@ class PostRead(SQLModel):
     board_id: int
     created_at: datetime
     is_spoiler: bool
+    score: int = 0
+    upvotes: int = 0
+    downvotes: int = 0
+    comment_count: int = 0
     owner: Optional[UserPublic] = None 
 
 
@@ -34,5 +38,8 @@ class CommentRead(SQLModel):
     post_id: int
     created_at: datetime
     is_spoiler: bool
+    parent_id: Optional[int] = None
+    depth: int = 0
+    reply_count: int = 0
     
     user: Optional[UserPublic] = None
\ No newline at end of file
@@ -0,0 +1,16 @@
+# backend/app/schemas/search.py
+
+from datetime import datetime
+from sqlmodel import SQLModel
+from typing import Optional
+
+class SearchHit(SQLModel):
+    kind: str                          # "post" / "comment"
+    post_id: int
+    comment_id: Optional[int] = None
+    board_id: int
+    author_id: int
+    created_at: datetime
+    title: str                         # 所屬文章的標題
+    snippet: str                       # 內文開頭
+    rank: float
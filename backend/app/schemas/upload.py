@@ -0,0 +1,18 @@
+# backend/app/schemas/upload.py
+
+from typing import Dict
+from sqlmodel import SQLModel
+
+class PresignRequest(SQLModel):
+    filename: str
+    content_type: str
+
+class PresignResponse(SQLModel):
+    url: str                 # 瀏覽器以 multipart/form-data POST 到這個網址
+    fields: Dict[str, str]   # 必須原樣放進表單，檔案欄位名稱為 "file" 且放在最後
+    object_name: str
+    max_bytes: int
+    expires_in: int
+
+class UploadComplete(SQLModel):
+    object_name: str
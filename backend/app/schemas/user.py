@@ -0,0 +1,29 @@
+# backend/app/schemas/user.py
+
+from datetime import datetime
+from sqlmodel import SQLModel
+from typing import List, Optional
+from app.models.user import UserPublic
+
+
+class UserStatsRead(SQLModel):
+    post_count: int = 0
+    comment_count: int = 0
+    upvotes_received: int = 0
+    downvotes_received: int = 0
+
+
+class ActivityRead(SQLModel):
+    kind: str                          # post / comment
+    post_id: int
+    comment_id: Optional[int] = None
+    board_id: int
+    title: str                         # 文章標題 (留言時為所在文章)
+    excerpt: str
+    created_at: datetime
+
+
+class UserProfile(UserPublic):
+    created_at: datetime
+    stats: UserStatsRead               # 還沒有統計列 (沒有任何動作) 時全部為 0
+    recent_activity: List[ActivityRead] = []
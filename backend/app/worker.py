@@ -0,0 +1,67 @@
+# backend/app/worker.py
+#
+# 背景工作的 worker 行程 (docker-compose 的 worker 服務)：
+#   python -m app.worker [--concurrency 4]
+#
+# 需要 REDIS_URL (沒有 Redis 時工作由 API 行程自己執行)。可以同時跑多個，
+# 吞吐量與佇列深度在 JOB_WORKER_METRICS_PORT 的 /metrics 輸出。
+# 收到 SIGTERM 時不再取新工作，等執行中的工作完成後才結束。
+
+import argparse
+import asyncio
+import logging
+import signal
+
+from prometheus_client import start_http_server
+
+import app.models  # noqa: F401  註冊所有資料表與關聯
+import app.core.images  # noqa: F401  註冊工作的處理函式
+import app.core.purge  # noqa: F401
+import app.core.archive  # noqa: F401
+import app.core.user_stats  # noqa: F401
+from app.core.config import settings
+from app.core.db import engine
+from app.core.http import http_client
+from app.core.images import image_pipeline
+from app.core.jobs import JobWorker, job_queue
+from app.core.metrics import instrument_engine
+from app.core.redis import redis_handler
+
+logger = logging.getLogger("app.worker")
+
+
+async def run(concurrency: int):
+    instrument_engine(engine)
+    http_client.start()
+    worker = JobWorker(job_queue, concurrency)
+    worker.start()
+    logger.info("%s started, handlers: %s", worker.consumer, ", ".join(sorted(job_queue.handlers)))
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    logger.info("%s stopping", worker.consumer)
+    await worker.stop()
+    await image_pipeline.shutdown()
+    await http_client.close()
+    await engine.dispose()
+    await redis_handler.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.worker", description="ACG Forum 背景工作 worker")
+    parser.add_argument("--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if job_queue.in_process:
+        raise SystemExit("REDIS_URL 未設定：沒有 Redis 時背景工作由 API 行程執行，不需要另外啟動 worker")
+    start_http_server(settings.JOB_WORKER_METRICS_PORT)
+    asyncio.run(run(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# backend/benchmarks/bench_bulk.py
+#
+# 大量匯出 / 匯入：以 datagen 產生資料 → export_ndjson + gzip 寫到檔案 → 清空資料庫 → import_ndjson
+# 比較不同資料量下的耗時、每分鐘列數，以及 Python 端的記憶體高峰 (tracemalloc)，
+# 匯出的記憶體高峰應該不隨資料量成長。
+#
+# python -m benchmarks.bench_bulk
+
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.common import create_app_tables
+from benchmarks.datagen import generate
+
+from sqlmodel import SQLModel
+
+from app.core.bulk import export_ndjson, gzip_chunks, import_ndjson
+from app.core.db import engine
+
+POST_COUNTS = [5_000, 20_000]
+
+
+async def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = await fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+
+async def main():
+    path = os.path.join(tempfile.mkdtemp(prefix="acg-bench-"), "export.ndjson.gz")
+    print(f"{'posts':>8}{'rows':>10}{'export s':>10}{'MB peak':>9}{'file MB':>9}"
+          f"{'import s':>10}{'rows/min':>12}{'MB peak':>9}")
+    for posts in POST_COUNTS:
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.drop_all)
+        await create_app_tables()
+        counts = await generate(engine, posts=posts, users=max(100, posts // 20), votes_per_post=5, comments_per_post=5)
+        rows = sum(counts[name] for name in ("users", "boards", "posts", "comments", "votes"))
+
+        async def export():
+            with open(path, "wb") as output:
+                async for chunk in gzip_chunks(export_ndjson(["users", "boards", "posts", "comments", "votes"])):
+                    output.write(chunk)
+
+        _, export_seconds, export_peak = await measure(export)
+
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.drop_all)
+        await create_app_tables()
+
+        async def read_file():
+            with open(path, "rb") as source:
+                while chunk := source.read(1024 * 1024):
+                    yield chunk
+
+        imported, import_seconds, import_peak = await measure(lambda: import_ndjson(read_file()))
+        assert sum(imported.values()) == rows, (imported, counts)
+        print(f"{posts:>8}{rows:>10}{export_seconds:>10.2f}{export_peak:>9.1f}{os.path.getsize(path) / 1024 / 1024:>9.1f}"
+              f"{import_seconds:>10.2f}{rows / import_seconds * 60:>12,.0f}{import_peak:>9.1f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
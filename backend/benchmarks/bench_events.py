@@ -0,0 +1,106 @@
+# backend/benchmarks/bench_events.py
+#
+# /events SSE 串流的負載測試：在單一 worker 掛上數千個閒置訂閱者，
+# 確認閒置期間沒有任何 SQL 語句，並量測一個事件分送到所有訂閱者的時間與記憶體成本。
+# (httpx 的 ASGITransport 會把整個回應讀完才返回，這裡直接以 ASGI 介面呼叫 app)
+#
+# python -m benchmarks.bench_events [訂閱者數]
+
+import asyncio
+import sys
+import time
+import tracemalloc
+
+import benchmarks.common  # noqa: F401  補齊環境變數
+
+from sqlalchemy import event
+
+from app.core.db import engine
+from app.core.pubsub import board_channels, event_bus, post_channel
+from app.main import app
+
+SUBSCRIBERS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+IDLE_SECONDS = 5
+EVENTS = 20
+
+
+class Subscriber:
+    def __init__(self, path: str):
+        self.path = path
+        self.disconnected = asyncio.Event()
+        self.connected = asyncio.Event()
+        self.received = 0
+        self.last_received_at = 0.0
+
+    async def run(self):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": self.path, "raw_path": self.path.encode(), "root_path": "",
+            "query_string": b"", "headers": [], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+        }
+
+        async def receive():
+            await self.disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                self.connected.set()
+            elif message.get("body", b"").startswith(b"event: post.updated"):
+                self.received += 1
+                self.last_received_at = time.perf_counter()
+
+        await app(scope, receive, send)
+
+
+async def main():
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    subscribers = [
+        Subscriber(f"/api/v1/events/posts/{i % 100 + 1}" if i % 2 else f"/api/v1/events/boards/{i % 4 + 1}")
+        for i in range(SUBSCRIBERS)
+    ]
+    tasks = [asyncio.create_task(s.run()) for s in subscribers]
+    await asyncio.gather(*(s.connected.wait() for s in subscribers))
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"訂閱者: {event_bus.subscriber_count}，每個約 {(after - before) / SUBSCRIBERS / 1024:.1f} KiB")
+
+    await asyncio.sleep(IDLE_SECONDS)
+    print(f"閒置 {IDLE_SECONDS} 秒內的 SQL 語句數: {statements}")
+
+    # 每個事件發到一篇文章 + 所屬看板 (與 vote_post 相同)，量到最後一個訂閱者收到為止
+    latencies = []
+    for n in range(EVENTS):
+        post_id, board_id = n % 100 + 1, n % 4 + 1
+        targets = [s for s in subscribers
+                   if s.path.endswith((f"/posts/{post_id}", f"/boards/{board_id}"))]
+        start = time.perf_counter()
+        await event_bus.publish([post_channel(post_id), *board_channels(board_id)], {
+            "type": "post.updated", "post_id": post_id, "board_id": board_id,
+            "score": n, "upvotes": n, "downvotes": 0, "comment_count": 0,
+        })
+        while any(s.last_received_at < start for s in targets):
+            await asyncio.sleep(0)
+        latencies.append((max(s.last_received_at for s in targets) - start) * 1000)
+        print(f"事件 {n + 1:>2}: 分送給 {len(targets):>5} 個訂閱者 {latencies[-1]:7.2f} ms")
+
+    print(f"分送延遲中位數: {sorted(latencies)[len(latencies) // 2]:.2f} ms，期間 SQL 語句數: {statements}")
+
+    for s in subscribers:
+        s.disconnected.set()
+    await asyncio.gather(*tasks)
+    print(f"全部斷線後剩餘訂閱者: {event_bus.subscriber_count}")
+    await event_bus.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
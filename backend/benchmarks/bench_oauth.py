@@ -0,0 +1,140 @@
+# backend/benchmarks/bench_oauth.py
+#
+# 以本機的假 Google OAuth 伺服器 (keep-alive HTTP/1.1，每個請求固定延遲) 模擬登入尖峰：
+#   1. 舊的做法：每次登入開兩個新的 httpx.AsyncClient (token + userinfo)
+#   2. 共用的 http_client 連線池
+#   3. 經過 app 的 /auth/google/callback 完整登入流程
+#   4. 假伺服器故障 (回 503)：斷路器打開後登入直接回 503，不再打到對方
+# 比較耗時與假伺服器收到的 TCP 連線數 (正式環境每條新連線還要再加上 TLS 握手)。
+#
+# python -m benchmarks.bench_oauth
+
+import asyncio
+import json
+import time
+from collections import Counter
+from urllib.parse import parse_qs
+
+from benchmarks.common import create_app_tables  # 同時補齊環境變數
+
+import httpx
+
+from app.core.config import settings
+from app.core.http import http_client
+from app.main import app, lifespan
+
+LOGINS = 200
+LATENCY_SECONDS = 0.02
+OUTAGE_LOGINS = 50
+
+
+class MockOAuthServer:
+    """最小的 HTTP/1.1 伺服器：POST /token 回 access_token，GET /userinfo 依 token 回使用者"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self.failing = False
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    async def close(self):
+        self.server.close()
+
+    def reset(self):
+        self.connections = self.requests = 0
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                target = request_line.decode().split(" ")[1]
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                await asyncio.sleep(self.latency)
+                self.requests += 1
+                if target.startswith("/token"):
+                    code = parse_qs(body.decode())["code"][0]
+                    payload = {"access_token": f"token-{code}"}
+                else:
+                    user = headers["authorization"].removeprefix("Bearer token-")
+                    payload = {"email": f"{user}@example.com", "name": f"google user {user}"}
+                data = json.dumps(payload).encode()
+                status = "503 Service Unavailable" if self.failing else "200 OK"
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def per_request_clients(code: str):
+    # 改版前 google_callback 的寫法
+    async with httpx.AsyncClient() as client:
+        response = await client.post(settings.GOOGLE_TOKEN_URL, data={"code": code})
+        access_token = response.json()["access_token"]
+    async with httpx.AsyncClient() as client:
+        await client.get(settings.GOOGLE_USERINFO_URL, headers={"Authorization": f"Bearer {access_token}"})
+
+
+async def shared_client(code: str):
+    response = await http_client.post(settings.GOOGLE_TOKEN_URL, data={"code": code})
+    access_token = response.json()["access_token"]
+    await http_client.get(settings.GOOGLE_USERINFO_URL, headers={"Authorization": f"Bearer {access_token}"})
+
+
+async def burst(mock: MockOAuthServer, label: str, login, codes):
+    mock.reset()
+    start = time.perf_counter()
+    results = await asyncio.gather(*[login(code) for code in codes])
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<22}{elapsed:>7.2f}s  連線 {mock.connections:>4}  請求 {mock.requests:>4}")
+    return results
+
+
+async def main():
+    await create_app_tables()
+    mock = MockOAuthServer(LATENCY_SECONDS)
+    await mock.start()
+    settings.GOOGLE_TOKEN_URL = f"{mock.base_url}/token"
+    settings.GOOGLE_USERINFO_URL = f"{mock.base_url}/userinfo"
+
+    async with lifespan(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            async def app_login(code: str):
+                response = await client.get("/api/v1/auth/google/callback", params={"code": code})
+                return response.status_code
+
+            print(f"{LOGINS} 個同時登入 (假 OAuth 伺服器每個請求延遲 {LATENCY_SECONDS * 1000:.0f}ms)")
+            await burst(mock, "每次新建 client", per_request_clients, [f"a{i}" for i in range(LOGINS)])
+            await burst(mock, "共用 http_client", shared_client, [f"b{i}" for i in range(LOGINS)])
+            statuses = await burst(mock, "完整登入 (app)", app_login, [f"c{i}" for i in range(LOGINS)])
+            print(f"    回應狀態 {dict(Counter(statuses))}")
+
+            mock.failing = True
+            print(f"假伺服器故障後 {OUTAGE_LOGINS} 個依序登入 (斷路門檻 {settings.HTTP_CIRCUIT_FAILURE_THRESHOLD} 次)")
+            mock.reset()
+            start = time.perf_counter()
+            statuses = [await app_login(f"d{i}") for i in range(OUTAGE_LOGINS)]
+            print(f"  耗時 {time.perf_counter() - start:.2f}s  回應狀態 {dict(Counter(statuses))}  "
+                  f"打到假伺服器的請求 {mock.requests}")
+    await mock.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+# backend/benchmarks/bench_pagination.py
+#
+# 比較 read_posts 第 1000 頁在 offset 與 cursor 兩種模式下的延遲，
+# 隨著資料表成長，cursor 模式應維持平穩。
+#
+# python -m benchmarks.bench_pagination
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.common import bench_request, make_engine, timed
+
+from sqlalchemy import insert
+from sqlmodel import select
+
+from app.api.v1.posts import read_posts
+from app.core.pagination import encode_cursor
+from app.models.board import Board
+from app.models.post import Post
+from app.models.user import User
+
+PAGE_SIZE = 20
+TARGET_PAGE = 1000
+BOARD_COUNT = 4
+TABLE_SIZES = [100_000, 200_000, 400_000]
+
+
+async def seed(engine, total: int, start: int):
+    """把 posts 表補到 total 筆 (全部寫在看板 1，模擬熱門看板)"""
+    base = datetime(2024, 1, 1)
+    rng = random.Random(start)
+    rows = [
+        {
+            "title": f"post {i}",
+            "content": "x" * 200,
+            "owner_id": rng.randint(1, 100),
+            "board_id": 1 if i % 2 == 0 else rng.randint(2, BOARD_COUNT),
+            "is_spoiler": False,
+            "created_at": base + timedelta(seconds=i),
+        }
+        for i in range(start, total)
+    ]
+    async with engine.begin() as conn:
+        for offset in range(0, len(rows), 10_000):
+            await conn.execute(insert(Post), rows[offset:offset + 10_000])
+
+
+async def main():
+    engine, session_factory = await make_engine()
+    async with session_factory() as session:
+        session.add_all([Board(id=i, name=f"board {i}") for i in range(1, BOARD_COUNT + 1)])
+        session.add_all([User(id=i, username=f"user{i}", email=f"user{i}@example.com", hashed_password="x")
+                         for i in range(1, 101)])
+        await session.commit()
+
+    print(f"{'rows':>10} {'offset (ms)':>12} {'cursor (ms)':>12}")
+    seeded = 0
+    for size in TABLE_SIZES:
+        await seed(engine, size, seeded)
+        seeded = size
+
+        async with session_factory() as session:
+            # 第 1000 頁的游標 = 第 999 頁最後一筆
+            anchor = (await session.exec(
+                select(Post.created_at, Post.id)
+                .where(Post.board_id == 1)
+                .order_by(Post.created_at.desc(), Post.id.desc())
+                .offset((TARGET_PAGE - 1) * PAGE_SIZE - 1)
+                .limit(1)
+            )).one()
+            cursor = encode_cursor(anchor.created_at, anchor.id)
+
+            async def by_offset():
+                await read_posts(bench_request(), board_id=1, user_id=None, skip=(TARGET_PAGE - 1) * PAGE_SIZE,
+                                 limit=PAGE_SIZE, cursor=None, session=session)
+
+            async def by_cursor():
+                await read_posts(bench_request(), board_id=1, user_id=None, skip=0,
+                                 limit=PAGE_SIZE, cursor=cursor, session=session)
+
+            offset_ms = await timed(by_offset)
+            cursor_ms = await timed(by_cursor)
+        print(f"{size:>10} {offset_ms:>12.2f} {cursor_ms:>12.2f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
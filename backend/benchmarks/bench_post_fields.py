@@ -0,0 +1,71 @@
+# backend/benchmarks/bench_post_fields.py
+#
+# 看板第一頁 (100 篇文章) 的查詢 + 序列化：
+#   orm       舊的做法：載入 ORM 物件 (selectinload 作者) → PostRead 驗證 → json
+#   columns   欄位投影：只 SELECT 需要的欄位 (LEFT JOIN 作者) → dict → orjson，完整欄位
+#   excerpt   同上，以 excerpt 取代完整內容 (excerpt=true)
+#   minimal   同上，fields=id,title,excerpt,score,comment_count
+# 比較每頁耗時與回應大小。
+#
+# python -m benchmarks.bench_post_fields
+
+import asyncio
+import json
+
+from benchmarks.common import make_engine, timed
+from benchmarks.datagen import generate
+
+import orjson
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+
+from app.core.post_fields import parse_fields, post_items, select_posts
+from app.models.post import Post
+from app.schemas.post import PostRead
+
+POSTS = 20_000
+PAGE_SIZE = 100
+
+
+async def main():
+    engine, session_factory = await make_engine()
+    await generate(engine, posts=POSTS, users=1000, votes_per_post=0, comments_per_post=0)
+    async with engine.begin() as conn:
+        # datagen 的內文偏短，拉長成一般長文的長度
+        await conn.exec_driver_sql("UPDATE posts SET content = content || content || content || content || content")
+
+    async with session_factory() as session:
+        async def orm_page():
+            statement = select(Post).options(selectinload(Post.owner)).where(Post.board_id == 1) \
+                .order_by(Post.created_at.desc(), Post.id.desc()).limit(PAGE_SIZE)
+            posts = (await session.exec(statement)).all()
+            items = [PostRead.model_validate(post).model_dump(mode="json") for post in posts]
+            return json.dumps(items, ensure_ascii=False).encode()
+
+        def projected(fields):
+            async def page():
+                statement = select_posts(fields).where(Post.board_id == 1) \
+                    .order_by(Post.created_at.desc(), Post.id.desc()).limit(PAGE_SIZE)
+                rows = (await session.exec(statement)).all()
+                return orjson.dumps(post_items(rows, fields))
+            return page
+
+        modes = {
+            "orm": orm_page,
+            "columns": projected(parse_fields(None)),
+            "excerpt": projected(parse_fields(None, excerpt=True)),
+            "minimal": projected(parse_fields("id,title,excerpt,score,comment_count")),
+        }
+        baseline_ms = None
+        print(f"{'mode':<10}{'ms / page':>11}{'bytes':>10}{'vs orm':>10}")
+        for name, page in modes.items():
+            size = len(await page())
+            ms = await timed(page)
+            baseline_ms = baseline_ms or ms
+            print(f"{name:<10}{ms:>11.2f}{size:>10}{baseline_ms / ms:>9.1f}x")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+# backend/benchmarks/bench_ranking.py
+#
+# hot / top_day 排行一頁的讀取延遲 vs. 累積投票量 (最多 100 萬票)。
+# 投票只會更新預先排好的排行，因此讀取延遲應與投票量無關，並與 sort=new 同一量級。
+#
+# python -m benchmarks.bench_ranking
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from benchmarks.common import bench_request, make_engine, timed
+
+from sqlalchemy import insert
+
+from app.api.v1.posts import read_posts
+from app.core.config import settings
+from app.core.ranking import MemoryRankingBackend, ranking
+from app.models.board import Board
+from app.models.post import Post
+from app.models.user import User
+
+POSTS = 20_000
+PAGE_SIZE = 20
+SKIP = settings.CACHE_POSTS_MAX_SKIP + PAGE_SIZE  # 跳過列表快取，量的是實際查詢
+VOTE_CHECKPOINTS = [0, 100_000, 1_000_000]
+
+
+async def main():
+    engine, session_factory = await make_engine()
+    now = datetime.utcnow()
+    async with session_factory() as session:
+        session.add(Board(id=1, name="board 1"))
+        session.add(User(id=1, username="user1", email="user1@example.com", hashed_password="x"))
+        await session.commit()
+    async with engine.begin() as conn:
+        await conn.execute(insert(Post), [
+            {"title": f"post {i}", "content": "x" * 200, "owner_id": 1, "board_id": 1,
+             "is_spoiler": False, "created_at": now - timedelta(seconds=POSTS - i)}
+            for i in range(POSTS)
+        ])
+
+    # 改用行程內排行，避免動到設定的 Redis
+    ranking.backend = MemoryRankingBackend()
+    async with session_factory() as session:
+        await ranking.rebuild(session)
+
+    rng = random.Random(42)
+    posts = {i: SimpleNamespace(id=i, board_id=1, score=0, comment_count=0,
+                                created_at=now - timedelta(seconds=POSTS - i + 1))
+             for i in range(1, POSTS + 1)}
+
+    print(f"{'votes':>10} {'new (ms)':>10} {'hot (ms)':>10} {'top_day (ms)':>13}")
+    applied = 0
+    for checkpoint in VOTE_CHECKPOINTS:
+        while applied < checkpoint:
+            # 熱門文章集中在最新的一小段，模擬實際投票分佈
+            post = posts[POSTS - int(rng.paretovariate(1.2)) % POSTS]
+            post.score += rng.choice((1, 1, 1, -1))
+            await ranking.update_post(post)
+            applied += 1
+
+        async with session_factory() as session:
+            results = []
+            for sort in ("new", "hot", "top_day"):
+                async def page(sort=sort):
+                    await read_posts(bench_request(), board_id=1, user_id=None, skip=SKIP, limit=PAGE_SIZE,
+                                     cursor=None, sort=sort, session=session)
+                results.append(await timed(page))
+        print(f"{checkpoint:>10} {results[0]:>10.2f} {results[1]:>10.2f} {results[2]:>13.2f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,42 @@
+# backend/benchmarks/bench_rate_limit.py
+#
+# 限流本身的開銷：每個請求呼叫一次 rate_limiter.hit() 的延遲分佈。
+# 有設定 REDIS_URL 時量測 Redis Lua 腳本 (一次往返)，否則量測行程內的桶。
+#
+# python -m benchmarks.bench_rate_limit
+
+import asyncio
+import random
+import statistics
+import time
+
+import benchmarks.common  # noqa: F401  補齊環境變數
+
+from app.core.rate_limit import rate_limiter
+
+CALLS = 100_000
+IDENTITIES = 10_000
+
+
+async def main():
+    backend = type(rate_limiter.backend).__name__
+    random.seed(1)
+    identities = [f"u{random.randint(1, IDENTITIES)}" for _ in range(CALLS)]
+
+    samples = []
+    rejected = 0
+    for identity in identities:
+        start = time.perf_counter()
+        if await rate_limiter.hit("vote_post", identity) is not None:
+            rejected += 1
+        samples.append((time.perf_counter() - start) * 1_000_000)
+
+    samples.sort()
+    print(f"{backend}: {CALLS} 次呼叫，{IDENTITIES} 個使用者，被拒絕 {rejected} 次")
+    print(f"  p50 {samples[len(samples) // 2]:.1f} µs  p99 {samples[int(len(samples) * 0.99)]:.1f} µs  "
+          f"平均 {statistics.mean(samples):.1f} µs")
+    print(f"  rate_limiter.stats(): {rate_limiter.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
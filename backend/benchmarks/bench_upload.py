@@ -0,0 +1,72 @@
+# backend/benchmarks/bench_upload.py
+#
+# 以本機的假物件儲存 (每次 put_object 同步阻塞一段時間，模擬網路傳輸)
+# 平行上傳多張圖片，同時量測 event loop 的最大延遲：
+# 上傳在 threadpool 執行時，event loop 延遲應維持在毫秒等級。
+# 也驗證相同內容的第二次上傳不會再傳輸。
+#
+# python -m benchmarks.bench_upload
+
+import asyncio
+import os
+import time
+
+from benchmarks.common import StubObjectStore, create_app_tables  # 同時補齊環境變數
+
+import httpx
+
+from app.core.config import settings
+from app.core.minio import minio_handler
+from app.core.rate_limit import rate_limiter
+from app.main import app
+
+PARALLEL_UPLOADS = 20
+TRANSFER_SECONDS = 0.2
+IMAGE_BYTES = 512 * 1024
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005):
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def upload_all(client, images):
+    return await asyncio.gather(*[
+        client.post("/api/v1/upload/image", files={"file": (f"img{i}.png", image, "image/png")})
+        for i, image in enumerate(images)
+    ])
+
+
+async def main():
+    await create_app_tables()
+    rate_limiter.enabled = False  # 量的是上傳本身，不要被限流擋下
+    store = StubObjectStore(transfer_seconds=TRANSFER_SECONDS)
+    minio_handler.client = store
+    images = [os.urandom(IMAGE_BYTES) for _ in range(PARALLEL_UPLOADS)]
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(measure_loop_lag(stop))
+        start = time.perf_counter()
+        responses = await upload_all(client, images)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        worst_lag = await lag_task
+
+        assert all(r.status_code == 200 for r in responses), [r.text for r in responses]
+        print(f"{PARALLEL_UPLOADS} 張平行上傳 (每張傳輸 {TRANSFER_SECONDS}s, 併發上限 {settings.UPLOAD_MAX_CONCURRENCY})")
+        print(f"  總耗時           {elapsed:.2f}s (完全阻塞時約 {PARALLEL_UPLOADS * TRANSFER_SECONDS:.1f}s)")
+        print(f"  event loop 最大延遲 {worst_lag * 1000:.1f}ms")
+
+        puts_before = store.puts
+        start = time.perf_counter()
+        await upload_all(client, images)
+        print(f"  重複上傳          {time.perf_counter() - start:.2f}s，新傳輸 {store.puts - puts_before} 次")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+# backend/benchmarks/bench_votes.py
+#
+# 單一熱門文章被大量點擊：直接寫入 vs. write-behind 緩衝 (行程內模式)
+# 比較總耗時與實際送到資料庫的 SQL 語句數。
+#
+# python -m benchmarks.bench_votes
+
+import asyncio
+import random
+import time
+
+from benchmarks.common import create_app_tables  # 同時補齊環境變數
+
+from sqlalchemy import event, func
+from sqlmodel import select
+
+from app.core.counters import apply_vote_delta, write_vote
+from app.core.db import async_session, engine
+from app.core.vote_buffer import MemoryVoteStore, VoteBuffer
+from app.models.board import Board
+from app.models.post import Post, Vote
+from app.models.user import User
+
+USERS = 2000
+CLICKS = 10_000
+FLUSH_EVERY = 1000  # 模擬 flusher 的週期：每 N 次點擊寫回一次
+
+
+async def setup(post_id: int):
+    async with async_session() as session:
+        session.add(Post(id=post_id, title=f"hot {post_id}", content="x", owner_id=1, board_id=1))
+        await session.commit()
+
+
+async def check(post_id: int):
+    async with async_session() as session:
+        post = await session.get(Post, post_id)
+        ups = (await session.exec(select(func.count()).where(Vote.post_id == post_id, Vote.dir == 1))).one()
+        downs = (await session.exec(select(func.count()).where(Vote.post_id == post_id, Vote.dir == -1))).one()
+        return post.upvotes == ups and post.downvotes == downs
+
+
+async def main():
+    await create_app_tables()
+    async with async_session() as session:
+        session.add(Board(id=1, name="board 1"))
+        session.add_all([User(id=i, username=f"user{i}", email=f"user{i}@example.com", hashed_password="x")
+                         for i in range(1, USERS + 1)])
+        await session.commit()
+
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    random.seed(1)
+    clicks = [(random.randint(1, USERS), random.choice((1, -1))) for _ in range(CLICKS)]
+
+    await setup(1)
+    statements = 0
+    start = time.perf_counter()
+    for user_id, dir in clicks:
+        async with async_session() as session:
+            old, new = await write_vote(session, 1, user_id, dir)
+            await apply_vote_delta(session, 1, old, new)
+            await session.commit()
+    direct = time.perf_counter() - start
+    print(f"直接寫入: {CLICKS} 次點擊 {direct:.2f} s，SQL 語句 {statements}，計數正確: {await check(1)}")
+
+    await setup(2)
+    buffer = VoteBuffer(MemoryVoteStore(max_states=USERS * 2), flush_interval=0.5, batch_size=1000)
+    statements = 0
+    start = time.perf_counter()
+    for n, (user_id, dir) in enumerate(clicks, 1):
+        async with async_session() as session:
+            await buffer.vote(session, 2, user_id, dir)
+        if n % FLUSH_EVERY == 0:
+            await buffer.flush()
+    await buffer.stop()
+    buffered = time.perf_counter() - start
+    print(f"緩衝寫入: {CLICKS} 次點擊 {buffered:.2f} s，SQL 語句 {statements}，計數正確: {await check(2)}")
+    print(f"加速 {direct / buffered:.1f}x")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
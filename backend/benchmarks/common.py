@@ -0,0 +1,99 @@
+# backend/benchmarks/common.py
+#
+# 效能測試共用工具：在匯入 app 之前先補齊環境變數，並提供 SQLite 引擎、計時函式與假的物件儲存。
+# 用法 (在 backend/ 目錄下)： python -m benchmarks.bench_pagination
+
+import os
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("PROJECT_NAME", "ACG Forum Benchmark")
+os.environ.setdefault("API_V1_STR", "/api/v1")
+# 經過 app 路由的測試共用 app.core.db.engine，需要檔案資料庫 (記憶體資料庫每條連線各自獨立)
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///" + os.path.join(tempfile.mkdtemp(prefix="acg-bench-"), "app.db"))
+os.environ.setdefault("GOOGLE_CLIENT_ID", "benchmark")
+os.environ.setdefault("GOOGLE_CLIENT_SECRET", "benchmark")
+os.environ.setdefault("GOOGLE_REDIRECT_URI", "http://localhost/auth/callback")
+
+from minio.error import S3Error
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import app.models.user  # noqa: F401  註冊所有資料表
+import app.models.board  # noqa: F401
+import app.models.post  # noqa: F401
+import app.models.search  # noqa: F401
+import app.models.upload  # noqa: F401
+
+
+async def make_engine(path: str = None):
+    """建立一個乾淨的 SQLite 檔案資料庫並建好所有資料表"""
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="acg-bench-"), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    return engine, session_factory
+
+
+async def create_app_tables():
+    """在 app 使用的資料庫 (DATABASE_URL) 建好所有資料表"""
+    from app.core.db import engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+
+def bench_request():
+    """直接呼叫路由函式時用的空白 GET 請求 (沒有 If-None-Match 等標頭)"""
+    from starlette.requests import Request
+
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""})
+
+
+async def timed(fn, repeat: int = 20):
+    """執行 fn() repeat 次，回傳每次耗時的中位數 (毫秒)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+class StubObjectStore:
+    """
+    本機的假物件儲存，實作上傳 / 縮圖流程會用到的 Minio 方法
+
+    transfer_seconds > 0 時 put_object 會同步阻塞一段時間，模擬網路傳輸 (和真正的 Minio client 一樣會卡住執行緒)。
+    """
+
+    def __init__(self, transfer_seconds: float = 0.0):
+        self.transfer_seconds = transfer_seconds
+        self.objects = {}
+        self.puts = 0
+
+    def stat_object(self, bucket, name):
+        if name not in self.objects:
+            raise S3Error(code="NoSuchKey", message="not found", resource=name,
+                          request_id="stub", host_id="stub", response=None)
+        data, content_type = self.objects[name]
+        return SimpleNamespace(size=len(data), content_type=content_type)
+
+    def put_object(self, bucket, name, data, length, part_size=None, content_type=None):
+        if self.transfer_seconds:
+            time.sleep(self.transfer_seconds)
+        self.objects[name] = (data.read(), content_type)
+        self.puts += 1
+
+    def get_object(self, bucket, name):
+        data, _ = self.objects[name]
+        return SimpleNamespace(read=lambda: data, close=lambda: None, release_conn=lambda: None)
+
+    def remove_object(self, bucket, name):
+        self.objects.pop(name, None)
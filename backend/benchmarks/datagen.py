@@ -0,0 +1,187 @@
+# backend/benchmarks/datagen.py
+#
+# 可重現 (固定 seed) 的合成論壇資料：看板、使用者、文章、投票、串狀留言，欄位與 app/models 一致，
+# 反正規化計數 (score / comment_count / reply_count) 與 path 都算好，可直接給各個端點使用。
+# 以多列 INSERT 分批寫入，百萬級文章時記憶體用量也維持固定。
+#
+# 產生一份 SQLite 檔案 (之後可用 benchmarks.run --db 重複使用)：
+#   python -m benchmarks.datagen --db /tmp/acg.db --posts 1000000
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from benchmarks.common import make_engine
+
+from sqlalchemy import insert
+
+from app.core.comments import child_path
+from app.core.config import settings
+from app.core.post_fields import make_excerpt
+from app.models.board import Board
+from app.models.post import Comment, Post, Vote
+from app.models.user import User
+
+CHUNK_ROWS = 5000
+
+# 中文詞彙：以常用漢字組成 2~3 字的詞，依 Zipf 分佈抽樣
+_CHARS = [chr(c) for c in range(0x4E00, 0x4E00 + 3000)]
+
+
+class Generator:
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        words_rng = random.Random(seed)
+        self.words = ["".join(words_rng.choices(_CHARS, k=words_rng.choice((2, 3)))) for _ in range(20_000)]
+        self.cum_weights = []
+        total = 0.0
+        for rank in range(len(self.words)):
+            total += 1 / (rank + 1)
+            self.cum_weights.append(total)
+
+    def sentence(self, words: int) -> str:
+        return "".join(self.rng.choices(self.words, cum_weights=self.cum_weights, k=words))
+
+    def count(self, mean: float, cap: int) -> int:
+        """長尾分佈的數量 (少數熱門文章有大量投票 / 留言)"""
+        if mean <= 0:
+            return 0
+        return min(cap, int(self.rng.paretovariate(2.0) * mean / 2))
+
+
+class Writer:
+    """依外鍵順序分批寫入的緩衝區"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows: Dict[type, List[dict]] = {Post: [], Comment: [], Vote: []}
+
+    async def add(self, model, row: dict):
+        self.rows[model].append(row)
+        if len(self.rows[model]) >= CHUNK_ROWS:
+            await self.flush()
+
+    async def flush(self):
+        for model in (Post, Comment, Vote):
+            if self.rows[model]:
+                await self.conn.execute(insert(model), self.rows[model])
+                self.rows[model] = []
+
+
+async def generate(
+    engine,
+    seed: int = 42,
+    boards: int = 4,
+    users: int = 1000,
+    posts: int = 10_000,
+    votes_per_post: float = 10,
+    comments_per_post: float = 5,
+    span_days: int = 30,
+) -> Dict[str, int]:
+    """在 engine 上 (資料表須已建立) 產生資料，回傳各表筆數"""
+    gen = Generator(seed)
+    rng = gen.rng
+    now = datetime.utcnow()
+    step = timedelta(days=span_days) / max(posts, 1)
+    counts = {"boards": boards, "users": users, "posts": posts, "votes": 0, "comments": 0}
+
+    async with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            await conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        await conn.execute(insert(Board), [
+            {"id": i, "name": f"看板 {i}", "description": gen.sentence(5)} for i in range(1, boards + 1)
+        ])
+        for start in range(1, users + 1, CHUNK_ROWS):
+            await conn.execute(insert(User), [
+                {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "nickname": None,
+                 "hashed_password": "x", "is_active": True, "is_superuser": False, "created_at": now}
+                for i in range(start, min(start + CHUNK_ROWS, users + 1))
+            ])
+
+        writer = Writer(conn)
+        comment_id = 0
+        board_weights = [1 / (b + 1) for b in range(boards)]  # 看板熱門程度不一
+        for post_id in range(1, posts + 1):
+            created_at = now - step * (posts - post_id)
+
+            voters = rng.sample(range(1, users + 1), gen.count(votes_per_post, users))
+            upvotes = 0
+            for user_id in voters:
+                dir = 1 if rng.random() < 0.8 else -1
+                upvotes += dir == 1
+                await writer.add(Vote, {"user_id": user_id, "post_id": post_id, "dir": dir})
+            downvotes = len(voters) - upvotes
+
+            # 一半的留言回覆同一篇中較早的留言
+            thread: List[dict] = []
+            for _ in range(gen.count(comments_per_post, 2000)):
+                comment_id += 1
+                parent = rng.choice(thread) if thread and rng.random() < 0.5 else None
+                if parent is not None and parent["depth"] >= settings.COMMENT_MAX_DEPTH:
+                    parent = None
+                if parent is not None:
+                    parent["reply_count"] += 1
+                thread.append({
+                    "id": comment_id, "content": gen.sentence(12), "user_id": rng.randint(1, users),
+                    "post_id": post_id, "is_spoiler": False,
+                    "created_at": created_at + timedelta(seconds=len(thread) + 1),
+                    "parent_id": parent["id"] if parent else None,
+                    "path": child_path(parent["path"] if parent else "", comment_id),
+                    "depth": parent["depth"] + 1 if parent else 0,
+                    "reply_count": 0,
+                })
+
+            content = gen.sentence(60)
+            await writer.add(Post, {
+                "id": post_id, "title": gen.sentence(5), "content": content, "excerpt": make_excerpt(content),
+                "owner_id": rng.randint(1, users),
+                "board_id": rng.choices(range(1, boards + 1), weights=board_weights)[0],
+                "is_spoiler": rng.random() < 0.05, "created_at": created_at,
+                "score": upvotes - downvotes, "upvotes": upvotes, "downvotes": downvotes,
+                "comment_count": len(thread),
+            })
+            for comment in thread:
+                await writer.add(Comment, comment)
+            counts["votes"] += len(voters)
+            counts["comments"] += len(thread)
+        await writer.flush()
+    return counts
+
+
+async def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.datagen", description="產生合成的論壇資料")
+    parser.add_argument("--db", required=True, help="輸出的 SQLite 檔案路徑")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--boards", type=int, default=4)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--votes-per-post", type=float, default=10)
+    parser.add_argument("--comments-per-post", type=float, default=5)
+    parser.add_argument("--search", action="store_true", help="同時建立全文搜尋索引")
+    args = parser.parse_args()
+    if os.path.exists(args.db):
+        parser.error(f"{args.db} 已存在")
+
+    engine, session_factory = await make_engine(args.db)
+    start = time.perf_counter()
+    counts = await generate(
+        engine, seed=args.seed, boards=args.boards, users=args.users, posts=args.posts,
+        votes_per_post=args.votes_per_post, comments_per_post=args.comments_per_post,
+    )
+    print(f"產生 {counts}，耗時 {time.perf_counter() - start:.1f}s")
+    if args.search:
+        from app.core.search import reindex
+
+        start = time.perf_counter()
+        async with session_factory() as session:
+            documents = await reindex(session)
+        print(f"建立 {documents} 筆搜尋索引，耗時 {time.perf_counter() - start:.1f}s")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,278 @@
+# backend/benchmarks/run.py
+#
+# 情境式壓力測試：先以 benchmarks.datagen 產生資料 (或複製一份既有的 --db)，
+# 再以 httpx ASGITransport 在同一個行程內打 app/main.py 的真實路由 (含 lifespan 與所有 middleware)，
+# 物件儲存換成本機的 StubObjectStore。
+#
+# 情境 (依權重隨機抽選，每個 worker 以一位隨機使用者的身分執行)：
+#   browse_board  看板列表，有時往後翻頁或看熱門排序
+#   open_thread   開啟文章的留言 (越新的文章越常被開)
+#   vote / comment / upload / search
+#
+# 輸出每個端點的 p50/p95/p99 延遲、錯誤數與每秒請求數；
+# --save 存成 JSON，--baseline 與先前存的結果比較，超過 --tolerance 視為退步並以非 0 結束。
+#
+#   python -m benchmarks.run --posts 20000 --requests 2000 --save base.json
+#   python -m benchmarks.run --posts 20000 --requests 2000 --baseline base.json
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import benchmarks.common  # noqa: F401  補齊環境變數
+
+from PIL import Image
+
+SCENARIO_WEIGHTS = {
+    "browse_board": 40,
+    "open_thread": 30,
+    "vote": 15,
+    "comment": 6,
+    "upload": 2,
+    "search": 7,
+}
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client, endpoint: str, method: str, url: str, expected=(200,), **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.samples[endpoint].append((time.perf_counter() - start) * 1000)
+        if response.status_code not in expected:
+            self.errors[endpoint] += 1
+        return response
+
+    def summary(self, elapsed: float) -> Dict[str, dict]:
+        result = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            samples = sorted(samples)
+            result[endpoint] = {
+                "count": len(samples),
+                "errors": self.errors[endpoint],
+                "p50_ms": percentile(samples, 0.50),
+                "p95_ms": percentile(samples, 0.95),
+                "p99_ms": percentile(samples, 0.99),
+                "rps": len(samples) / elapsed,
+            }
+        return result
+
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * q))]
+
+
+class Scenarios:
+    def __init__(self, client, recorder: Recorder, rng: random.Random, args, words: List[str]):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.args = args
+        self.words = words
+        self.prefix = os.environ.get("API_V1_STR", "/api/v1")
+
+    def recent_post_id(self) -> int:
+        # 越新的文章越常被開啟
+        return max(1, self.args.posts - int(self.rng.expovariate(1 / max(self.args.posts / 20, 1))))
+
+    async def browse_board(self, headers):
+        board_id = self.rng.randint(1, self.args.boards)
+        if self.rng.random() < 0.3:
+            await self.recorder.request(self.client, "GET /posts?sort=hot", "GET",
+                                        f"{self.prefix}/posts/?board_id={board_id}&limit=20&sort=hot")
+            return
+        response = await self.recorder.request(self.client, "GET /posts", "GET",
+                                               f"{self.prefix}/posts/?board_id={board_id}&limit=20")
+        cursor = response.headers.get("x-next-cursor")
+        while cursor and self.rng.random() < 0.4:
+            response = await self.recorder.request(
+                self.client, "GET /posts?cursor", "GET", f"{self.prefix}/posts/",
+                params={"board_id": board_id, "limit": 20, "cursor": cursor},
+            )
+            cursor = response.headers.get("x-next-cursor")
+
+    async def open_thread(self, headers):
+        await self.recorder.request(self.client, "GET /posts/{id}/comments", "GET",
+                                    f"{self.prefix}/posts/{self.recent_post_id()}/comments?limit=50")
+
+    async def vote(self, headers):
+        await self.recorder.request(
+            self.client, "POST /posts/{id}/vote", "POST",
+            f"{self.prefix}/posts/{self.recent_post_id()}/vote?dir={self.rng.choice((1, 1, 1, -1))}",
+            headers=headers,
+        )
+
+    async def comment(self, headers):
+        await self.recorder.request(
+            self.client, "POST /posts/{id}/comments", "POST", f"{self.prefix}/posts/{self.recent_post_id()}/comments",
+            params={"content": "".join(self.rng.choices(self.words, k=12))}, headers=headers,
+        )
+
+    async def upload(self, headers):
+        buffer = io.BytesIO()
+        color = tuple(self.rng.randrange(256) for _ in range(3))
+        Image.new("RGB", (64, 64), color).save(buffer, format="PNG")
+        await self.recorder.request(
+            self.client, "POST /upload/image", "POST", f"{self.prefix}/upload/image",
+            files={"file": ("bench.png", buffer.getvalue(), "image/png")}, headers=headers,
+        )
+
+    async def search(self, headers):
+        await self.recorder.request(self.client, "GET /search", "GET", f"{self.prefix}/search/",
+                                    params={"q": self.rng.choice(self.words[:2000])})
+
+
+async def prepare_database(args, path: str):
+    """在 path 準備資料 (現場產生或複製 --db)，並依實際資料量更新 args 的看板 / 使用者 / 文章數"""
+    from sqlalchemy import func
+    from sqlmodel import select
+
+    from app.core.search import reindex
+    from app.models.board import Board
+    from app.models.post import Post
+    from app.models.user import User
+    from benchmarks.common import make_engine
+    from benchmarks.datagen import generate
+
+    if args.db:
+        shutil.copyfile(args.db, path)
+    engine, session_factory = await make_engine(path)
+    if not args.db:
+        start = time.perf_counter()
+        counts = await generate(
+            engine, seed=args.seed, boards=args.boards, users=args.users, posts=args.posts,
+            votes_per_post=args.votes_per_post, comments_per_post=args.comments_per_post,
+        )
+        print(f"產生 {counts}，耗時 {time.perf_counter() - start:.1f}s")
+        async with session_factory() as session:
+            await reindex(session)
+
+    async with session_factory() as session:
+        args.boards = (await session.exec(select(func.max(Board.id)))).one()
+        args.users = (await session.exec(select(func.max(User.id)))).one()
+        args.posts = (await session.exec(select(func.max(Post.id)))).one()
+    await engine.dispose()
+
+
+async def run(args) -> Dict[str, dict]:
+    # 暫存副本：跑完不影響 --db 的原檔。DATABASE_URL 必須在匯入 app 設定之前決定
+    path = os.path.join(tempfile.mkdtemp(prefix="acg-bench-"), "run.db")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    await prepare_database(args, path)
+
+    # DATABASE_URL 決定之後才能匯入 app
+    import httpx
+
+    from app.core.minio import minio_handler
+    from app.core.rate_limit import rate_limiter
+    from app.core.security import create_access_token
+    from app.main import app, lifespan
+    from benchmarks.common import StubObjectStore
+    from benchmarks.datagen import Generator
+
+    minio_handler.client = StubObjectStore()
+    rate_limiter.enabled = False  # 同一批使用者大量寫入，不要被限流擋下
+    words = Generator(args.seed).words
+    recorder = Recorder()
+    scenario_names = list(SCENARIO_WEIGHTS)
+    weights = [SCENARIO_WEIGHTS[name] for name in scenario_names]
+    remaining = args.requests
+
+    async def worker(index: int):
+        nonlocal remaining
+        rng = random.Random(args.seed * 1000 + index)
+        scenarios = Scenarios(client, recorder, rng, args, words)
+        while remaining > 0:
+            remaining -= 1
+            token = create_access_token({"sub": str(rng.randint(1, args.users))})
+            name = rng.choices(scenario_names, weights=weights)[0]
+            await getattr(scenarios, name)({"Authorization": f"Bearer {token}"})
+
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            start = time.perf_counter()
+            await asyncio.gather(*[worker(i) for i in range(args.concurrency)])
+            elapsed = time.perf_counter() - start
+
+    print(f"{args.requests} 個情境，併發 {args.concurrency}，耗時 {elapsed:.1f}s")
+    return recorder.summary(elapsed)
+
+
+def print_report(result: Dict[str, dict], baseline: Optional[Dict[str, dict]] = None):
+    print(f"{'endpoint':<28}{'count':>7}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}")
+    for endpoint, row in result.items():
+        line = (f"{endpoint:<28}{row['count']:>7}{row['errors']:>5}{row['p50_ms']:>9.1f}"
+                f"{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['rps']:>9.1f}")
+        base = (baseline or {}).get(endpoint)
+        if base:
+            line += f"   p95 {delta(row['p95_ms'], base['p95_ms'])}  req/s {delta(row['rps'], base['rps'])}"
+        print(line)
+
+
+def delta(value: float, base: float) -> str:
+    return f"{(value - base) / base * 100:+.0f}%" if base else "n/a"
+
+
+def regressions(result: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    found = []
+    for endpoint, base in baseline.items():
+        row = result.get(endpoint)
+        if row is None:
+            continue
+        if row["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            found.append(f"{endpoint}: p95 {base['p95_ms']:.1f} → {row['p95_ms']:.1f} ms")
+        if row["errors"] > base["errors"]:
+            found.append(f"{endpoint}: 錯誤 {base['errors']} → {row['errors']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="情境式壓力測試")
+    parser.add_argument("--db", help="使用既有的 SQLite 資料 (benchmarks.datagen 產生)，不指定時依下列參數現場產生")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--boards", type=int, default=4)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--votes-per-post", type=float, default=10)
+    parser.add_argument("--comments-per-post", type=float, default=5)
+    parser.add_argument("--requests", type=int, default=2000, help="要執行的情境數")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--save", help="把結果存成 JSON")
+    parser.add_argument("--baseline", help="與先前 --save 的結果比較")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="p95 允許變慢的比例")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["endpoints"]
+    print_report(result, baseline)
+
+    if args.save:
+        config = {k: v for k, v in vars(args).items() if k not in ("save", "baseline")}
+        with open(args.save, "w") as f:
+            json.dump({"config": config, "endpoints": result}, f, indent=2, ensure_ascii=False)
+    if baseline:
+        found = regressions(result, baseline, args.tolerance)
+        for line in found:
+            print(f"退步 {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()